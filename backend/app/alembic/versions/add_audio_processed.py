@@ -0,0 +1,24 @@
+"""add audio_processed to videos
+
+Revision ID: add_audio_processed
+Revises: add_claim_index
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_audio_processed'
+down_revision = 'add_claim_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('videos', sa.Column('audio_processed', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('videos', 'audio_processed')
@@ -0,0 +1,45 @@
+"""add claim embeddings, HNSW index and reuse provenance
+
+Revision ID: add_claim_index
+Revises: add_claim_occurrences
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_claim_index'
+down_revision = 'add_claim_occurrences'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('claims', sa.Column('embedding', Vector(384), nullable=True))
+    op.add_column('claims', sa.Column('reused_from_claim_id', sa.Integer(),
+                                      sa.ForeignKey('claims.id', ondelete='SET NULL'), nullable=True))
+    op.add_column('claims', sa.Column('reuse_distance', sa.Float(), nullable=True))
+    op.add_column('claims', sa.Column('reused_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_claims_reused_from_claim_id', 'claims', ['reused_from_claim_id'])
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_claims_embedding_hnsw ON claims "
+        "USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)"
+    )
+    op.add_column('evidence', sa.Column('reused_from_id', sa.Integer(),
+                                        sa.ForeignKey('evidence.id', ondelete='SET NULL'), nullable=True))
+    op.add_column('verdicts', sa.Column('reused_from_id', sa.Integer(),
+                                        sa.ForeignKey('verdicts.id', ondelete='SET NULL'), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('verdicts', 'reused_from_id')
+    op.drop_column('evidence', 'reused_from_id')
+    op.execute("DROP INDEX IF EXISTS ix_claims_embedding_hnsw")
+    op.drop_index('ix_claims_reused_from_claim_id', table_name='claims')
+    op.drop_column('claims', 'reused_at')
+    op.drop_column('claims', 'reuse_distance')
+    op.drop_column('claims', 'reused_from_claim_id')
+    op.drop_column('claims', 'embedding')
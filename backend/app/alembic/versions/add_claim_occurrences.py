@@ -0,0 +1,37 @@
+"""add claim_occurrences table
+
+Revision ID: add_claim_occurrences
+Revises: add_thumbnail_url
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_claim_occurrences'
+down_revision = 'add_thumbnail_url'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'claim_occurrences',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('claim_id', sa.Integer(), sa.ForeignKey('claims.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('segment_id', sa.Integer(), sa.ForeignKey('segments.id', ondelete='SET NULL'), nullable=True),
+        sa.Column('t_start', sa.Float(), nullable=True),
+        sa.Column('t_end', sa.Float(), nullable=True),
+        sa.Column('text', sa.Text(), nullable=True),
+        sa.Column('similarity', sa.Float(), nullable=True),
+    )
+    op.create_index('ix_claim_occurrences_claim_id', 'claim_occurrences', ['claim_id'])
+    op.create_index('ix_claim_occurrences_segment_id', 'claim_occurrences', ['segment_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_claim_occurrences_segment_id', table_name='claim_occurrences')
+    op.drop_index('ix_claim_occurrences_claim_id', table_name='claim_occurrences')
+    op.drop_table('claim_occurrences')
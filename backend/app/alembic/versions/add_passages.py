@@ -0,0 +1,42 @@
+"""add passages table for the offline evidence index
+
+Revision ID: add_passages
+Revises: add_video_source_id
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_passages'
+down_revision = 'add_video_source_id'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'passages',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('doc_id', sa.String(), nullable=False),
+        sa.Column('chunk', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(), nullable=True),
+        sa.Column('url', sa.String(), nullable=True),
+        sa.Column('text', sa.Text(), nullable=False),
+        sa.Column('embedding', Vector(384), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_passages_doc_id', 'passages', ['doc_id'])
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_passages_embedding_hnsw ON passages "
+        "USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_passages_embedding_hnsw")
+    op.drop_index('ix_passages_doc_id', table_name='passages')
+    op.drop_table('passages')
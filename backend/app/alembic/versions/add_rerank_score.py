@@ -0,0 +1,24 @@
+"""add cross-encoder rerank score to evidence
+
+Revision ID: add_rerank_score
+Revises: add_passages
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_rerank_score'
+down_revision = 'add_passages'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('evidence', sa.Column('rerank_score', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('evidence', 'rerank_score')
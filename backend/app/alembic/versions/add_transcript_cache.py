@@ -0,0 +1,43 @@
+"""add transcript_cache table
+
+Revision ID: add_transcript_cache
+Revises: add_audio_processed
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_transcript_cache'
+down_revision = 'add_audio_processed'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'transcript_cache',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('source_id', sa.String(), nullable=True),
+        sa.Column('audio_sha256', sa.String(), nullable=True),
+        sa.Column('asr_config', sa.String(), nullable=False),
+        sa.Column('title', sa.String(), nullable=True),
+        sa.Column('thumbnail_url', sa.String(), nullable=True),
+        sa.Column('duration', sa.Float(), nullable=True),
+        sa.Column('segments', sa.Text(), nullable=False),
+        sa.Column('n_segments', sa.Integer(), nullable=True),
+        sa.Column('size_bytes', sa.Integer(), nullable=True),
+        sa.Column('hits', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('last_used_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_transcript_cache_source_id', 'transcript_cache', ['source_id'])
+    op.create_index('ix_transcript_cache_audio_sha256', 'transcript_cache', ['audio_sha256'])
+    op.create_index('ix_transcript_cache_asr_config', 'transcript_cache', ['asr_config'])
+    op.create_index('ix_transcript_cache_last_used_at', 'transcript_cache', ['last_used_at'])
+
+
+def downgrade() -> None:
+    op.drop_table('transcript_cache')
@@ -0,0 +1,26 @@
+"""add source_id to videos
+
+Revision ID: add_video_source_id
+Revises: add_transcript_cache
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_video_source_id'
+down_revision = 'add_transcript_cache'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('videos', sa.Column('source_id', sa.String(), nullable=True))
+    op.create_index('ix_videos_source_id', 'videos', ['source_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_videos_source_id', table_name='videos')
+    op.drop_column('videos', 'source_id')
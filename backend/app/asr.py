@@ -1,68 +1,320 @@
-import os, tempfile
-from typing import List, Tuple
+import os, time
+import numpy as np
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, Optional, Tuple
+from sqlalchemy import func
 from faster_whisper import WhisperModel
-from .storage import download_file
+from .audio_cache import load_audio, load_s3_audio
 from .db import SessionLocal
-from . import models
+from . import models, metrics, bulk
 
 WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")  # base/small/medium/large-v3
 WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "cpu") # "cuda" if you have GPU
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
 
-_model = None
-def get_model():
-    global _model
-    if _model is None:
-        _model = WhisperModel(WHISPER_MODEL, device=WHISPER_DEVICE, compute_type="int8")
-    return _model
+NO_SPEECH = "[No speech detected]"
+
+# Incremental persistence: flush decoded segments every N segments or T seconds
+ASR_FLUSH_SEGMENTS = int(os.getenv("ASR_FLUSH_SEGMENTS", "25"))
+ASR_FLUSH_SECONDS = float(os.getenv("ASR_FLUSH_SECONDS", "10"))
+
+# Decoding strategy:
+#   single  - one WhisperModel.transcribe pass over the file (default)
+#   batched - faster-whisper's BatchedInferencePipeline (VAD split + batched decoding)
+#   chunked - VAD-split into ~ASR_CHUNK_SECONDS chunks decoded concurrently by ASR_WORKERS
+ASR_MODE = os.getenv("ASR_MODE", "single").lower()
+ASR_CHUNK_SECONDS = float(os.getenv("ASR_CHUNK_SECONDS", "120"))
+ASR_WORKERS = int(os.getenv("ASR_WORKERS", str(max(1, (os.cpu_count() or 2) // 4))))
+ASR_BATCH_SIZE = int(os.getenv("ASR_BATCH_SIZE", "8"))
+# BatchedInferencePipeline decodes clips of at most one 30 s window
+_BATCH_CLIP_S = 30
+
+# Two-pass mode: a small model produces a quick preview transcript, then the
+# WHISPER_MODEL pass re-transcribes on a low-priority queue and replaces it
+ASR_TWO_PASS = os.getenv("ASR_TWO_PASS", "off").lower() == "on"
+ASR_PREVIEW_MODEL = os.getenv("ASR_PREVIEW_MODEL", "tiny")
+ASR_PREVIEW_COMPUTE_TYPE = os.getenv("ASR_PREVIEW_COMPUTE_TYPE", "int8")
+
+SAMPLE_RATE = 16000
+
+# VAD thresholds tried (strict -> lenient) by the pre-decode speech analysis
+ASR_VAD_THRESHOLDS = [float(t) for t in os.getenv("ASR_VAD_THRESHOLDS", "0.5,0.35,0.2").split(",") if t.strip()]
+
+# Lightweight persisted-segment record handed to streaming consumers
+SegmentRow = namedtuple("SegmentRow", "id t_start t_end text")
+# Decoder output with global timestamps (same fields as faster-whisper's Segment)
+_Seg = namedtuple("_Seg", "start end text")
+
+_models = {}
+def get_model(name: Optional[str] = None, compute_type: Optional[str] = None):
+    """Loaded WhisperModel for `name` (default WHISPER_MODEL); each model is loaded once per process."""
+    key = (name or WHISPER_MODEL, compute_type or WHISPER_COMPUTE_TYPE)
+    if key not in _models:
+        if ASR_MODE == "chunked":
+            # CTranslate2 releases the GIL: num_workers lets concurrent transcribe()
+            # calls from threads run in parallel, each with its share of the cores
+            _models[key] = WhisperModel(
+                key[0], device=WHISPER_DEVICE, compute_type=key[1],
+                num_workers=ASR_WORKERS,
+                cpu_threads=max(1, (os.cpu_count() or 1) // ASR_WORKERS),
+            )
+        else:
+            _models[key] = WhisperModel(key[0], device=WHISPER_DEVICE, compute_type=key[1])
+    return _models[key]
+
+def analyze_speech(audio) -> dict:
+    """
+    One VAD pass over the decoded audio, run before decoding starts.
+
+    Tries the VAD thresholds in ASR_VAD_THRESHOLDS from strict to lenient and
+    keeps the first that finds speech. If none do, the decode runs without VAD
+    (music-heavy or very quiet audio), instead of finding out after a full
+    transcription that VAD removed everything. The decode passes reuse the
+    speech regions instead of running VAD again.
+
+    Returns:
+        {"path", "vad_filter", "vad_parameters", "speech"} where speech is the
+        list of {"start", "end"} sample regions found
+    """
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    for i, th in enumerate(ASR_VAD_THRESHOLDS):
+        speech = get_speech_timestamps(audio, VadOptions(onset=th))
+        if speech:
+            return {
+                "path": "vad" if i == 0 else "vad_relaxed",
+                "vad_filter": True,
+                "vad_parameters": {"onset": th},
+                "speech": speech,
+            }
+    return {"path": "no_vad", "vad_filter": False, "vad_parameters": None, "speech": []}
+
+def _speech_in(vad: dict, lo: int, hi: int) -> dict:
+    """`vad` with its speech regions clipped to samples [lo, hi) and made relative to lo."""
+    if vad.get("speech") is None:
+        return vad
+    speech = []
+    for r in vad["speech"]:
+        s, e = max(r["start"], lo), min(r["end"], hi)
+        if e > s:
+            speech.append({"start": s - lo, "end": e - lo})
+    return {**vad, "speech": speech}
+
+def _decode_speech(model, audio, speech: List[dict]):
+    """
+    Decode only the `speech` regions of `audio`, as faster-whisper's own VAD
+    filter would (regions concatenated, timestamps mapped back), without
+    running Silero again.
+    """
+    from faster_whisper.vad import SpeechTimestampsMap
+
+    ts = SpeechTimestampsMap(speech, SAMPLE_RATE)
+    segments, info = model.transcribe(
+        np.concatenate([audio[r["start"]:r["end"]] for r in speech]),
+        vad_filter=False, word_timestamps=False,
+    )
+    return (_Seg(ts.get_original_time(seg.start), ts.get_original_time(seg.end), seg.text) for seg in segments)
+
+def _iter_whisper(model, audio, start: float = 0.0, vad: Optional[dict] = None):
+    """
+    Lazily decode `audio` (path or 16 kHz array) from `start` seconds with the VAD
+    settings chosen by analyze_speech; the speech regions it found are reused, so
+    VAD runs once per file. The old retry-without-VAD paths remain as a
+    safety net only and are counted in the asr_vad metric.
+    """
+    vad = vad or {"vad_filter": True, "vad_parameters": None}
+    if start:
+        # resume on a slice of the samples and shift the timestamps back, like _transcribe_chunk
+        if isinstance(audio, str):
+            audio = load_audio(audio)
+        lo = int(start * SAMPLE_RATE)
+        off = lo / SAMPLE_RATE
+        for seg in _iter_whisper(model, audio[lo:], vad=_speech_in(vad, lo, len(audio))):
+            yield _Seg(seg.start + off, seg.end + off, seg.text)
+        return
+
+    speech = vad.get("speech") if vad["vad_filter"] else None
+    if speech is not None and not speech:
+        return  # no speech in this part of the file
+    try:
+        if speech:
+            segments = _decode_speech(model, audio, speech)
+        else:
+            segments, info = model.transcribe(
+                audio, vad_filter=vad["vad_filter"], vad_parameters=vad["vad_parameters"],
+                word_timestamps=False,
+            )
+    except ValueError as e:
+        if "max() arg is an empty sequence" not in str(e) or not vad["vad_filter"]:
+            raise
+        print("Language detection failed, retrying without VAD...")
+        metrics.incr("asr_vad", "fallback_langdetect")
+        segments, info = model.transcribe(audio, vad_filter=False, word_timestamps=False)
+        yield from segments
+        return
+
+    n = 0
+    for seg in segments:
+        n += 1
+        yield seg
+
+    # If VAD removed everything, try without VAD
+    if not n and vad["vad_filter"]:
+        print("VAD filter removed all content, retrying without VAD...")
+        metrics.incr("asr_vad", "fallback_empty")
+        segments, info = model.transcribe(audio, vad_filter=False, word_timestamps=False)
+        yield from segments
+
+def plan_chunks(speech: List[dict], total: int, target: int, start: int = 0) -> List[Tuple[int,int]]:
+    """
+    Cut [start, total) into contiguous chunks of roughly `target` samples.
+
+    Cuts are only placed in the middle of silences between VAD speech regions
+    (`speech` = [{"start": s, "end": e}, ...] in samples), so no word is split.
+    A single speech region longer than `target` stays in one chunk.
+    """
+    regions = [r for r in speech if r["end"] > start]
+    if not regions:
+        return []
+    cuts = []
+    chunk_start = start
+    for prev, nxt in zip(regions, regions[1:]):
+        if nxt["end"] - chunk_start > target:
+            cut = (prev["end"] + nxt["start"]) // 2
+            if cut > chunk_start:
+                cuts.append(cut)
+                chunk_start = cut
+    bounds = [start] + cuts + [total]
+    return list(zip(bounds, bounds[1:]))
+
+def _transcribe_chunk(model, audio, lo: int, hi: int, vad: Optional[dict] = None) -> List[_Seg]:
+    off = lo / SAMPLE_RATE
+    if vad is not None:
+        vad = _speech_in(vad, lo, hi)
+    return [_Seg(seg.start + off, seg.end + off, seg.text) for seg in _iter_whisper(model, audio[lo:hi], vad=vad)]
+
+def _iter_chunked(model, audio, start: float, vad: dict):
+    """Decode VAD-split chunks concurrently; yields segments in order with global timestamps."""
+    chunks = plan_chunks(vad["speech"], len(audio), int(ASR_CHUNK_SECONDS * SAMPLE_RATE), int(start * SAMPLE_RATE))
+    if not chunks:
+        # VAD found nothing: single pass without VAD
+        yield from _iter_whisper(model, audio, start, vad)
+        return
+    print(f"Chunked ASR: {len(chunks)} chunks on {ASR_WORKERS} workers")
+    with ThreadPoolExecutor(max_workers=ASR_WORKERS) as pool:
+        # map() yields in submission order, so segments stream out as soon as
+        # every earlier chunk is done
+        for segs in pool.map(lambda c: _transcribe_chunk(model, audio, *c, vad=vad), chunks):
+            yield from segs
+
+def _iter_batched(model, audio, vad: dict):
+    if not vad["vad_filter"]:
+        # the batched pipeline needs VAD clips for audio of 30 s or more
+        yield from _iter_whisper(model, audio, 0.0, vad)
+        return
+    from faster_whisper import BatchedInferencePipeline
+    from faster_whisper.vad import VadOptions, merge_segments
+
+    # the pipeline would run VAD again; hand it analyze_speech's regions as
+    # clips instead, grouped (and long regions cut) to its 30 s windows
+    step = _BATCH_CLIP_S * SAMPLE_RATE
+    pieces = [{"start": s, "end": min(s + step, r["end"])}
+              for r in vad["speech"] for s in range(r["start"], r["end"], step)]
+    segments, info = BatchedInferencePipeline(model=model).transcribe(
+        audio, batch_size=ASR_BATCH_SIZE, word_timestamps=False, vad_filter=False,
+        clip_timestamps=merge_segments(pieces, VadOptions(max_speech_duration_s=_BATCH_CLIP_S)),
+    )
+    yield from segments
+
+def iter_transcribe_audio(
+    audio,
+    start: float = 0.0,
+    mode: Optional[str] = None,
+    model_name: Optional[str] = None,
+    compute_type: Optional[str] = None,
+) -> Iterator[Tuple[float,float,str]]:
+    """
+    Yields (start,end,text) for 16 kHz float32 samples using ASR_MODE (or `mode`)
+    and WHISPER_MODEL (or `model_name`). VAD analysis and every decode pass share
+    the same array (possibly a memory-mapped cache file).
+    """
+    mode = (mode or ASR_MODE).lower()
+    model = get_model(model_name, compute_type)
+    vad = analyze_speech(audio)
+    metrics.incr("asr_vad", vad["path"])
+    if mode == "chunked":
+        it = _iter_chunked(model, audio, start, vad)
+    elif mode == "batched":
+        it = _iter_batched(model, audio, vad)
+    else:
+        it = _iter_whisper(model, audio, start, vad)
+    for seg in it:
+        if seg.text.strip() and seg.end > start:  # Only yield new, non-empty segments
+            yield (float(seg.start), float(seg.end), seg.text.strip())
+
+def iter_transcribe_file(local: str, start: float = 0.0, **kw) -> Iterator[Tuple[float,float,str]]:
+    """Yields (start,end,text) for a local audio file, decoded to 16 kHz once."""
+    yield from iter_transcribe_audio(load_audio(local), start, **kw)
+
+def iter_transcribe_s3(s3_key: str, start: float = 0.0, **model_kw) -> Iterator[Tuple[float,float,str]]:
+    """
+    Yields (start,end,text) for audio in S3 as the decoder produces them.
+    `start` resumes decoding at that offset (seconds); earlier segments are skipped.
+    The decoded samples come from the worker's memory-mapped audio cache, so a
+    retry or refinement pass does not download or decode the file again.
+    `model_kw` (model_name, compute_type) is passed to iter_transcribe_audio.
+    """
+    yield from iter_transcribe_audio(load_s3_audio(s3_key), start, **model_kw)
 
 def transcribe_s3_to_segments(s3_key: str) -> List[Tuple[float,float,str]]:
     """Downloads audio from S3, runs ASR, returns [(start,end,text), ...]."""
-    with tempfile.TemporaryDirectory() as td:
-        local = os.path.join(td, "audio.mp3")
-        download_file(s3_key, local)
-        model = get_model()
-        
-        # Try with VAD filter first, fallback without if it removes all content
-        try:
-            segments, info = model.transcribe(local, vad_filter=True, word_timestamps=False)
-            segment_list = list(segments)
-            
-            # If VAD removed everything, try without VAD
-            if not segment_list:
-                print("VAD filter removed all content, retrying without VAD...")
-                segments, info = model.transcribe(local, vad_filter=False, word_timestamps=False)
-                segment_list = list(segments)
-                
-        except ValueError as e:
-            if "max() arg is an empty sequence" in str(e):
-                print("Language detection failed, retrying without VAD...")
-                segments, info = model.transcribe(local, vad_filter=False, word_timestamps=False)
-                segment_list = list(segments)
-            else:
-                raise
-        
-        out = []
-        for seg in segment_list:
-            if seg.text.strip():  # Only add non-empty segments
-                out.append((float(seg.start), float(seg.end), seg.text.strip()))
-        
-        if not out:
-            print("Warning: No speech segments found in audio")
-            # Add a placeholder segment to avoid empty results
-            out.append((0.0, 1.0, "[No speech detected]"))
-            
-        return out
+    out = list(iter_transcribe_s3(s3_key))
+    if not out:
+        print("Warning: No speech segments found in audio")
+        # Add a placeholder segment to avoid empty results
+        out.append((0.0, 1.0, NO_SPEECH))
+    return out
+
+def persist_segment_batch(
+    video_id: int,
+    segments: List[Tuple[float,float,str]],
+    processed: Optional[float] = None,
+) -> List[SegmentRow]:
+    """
+    Insert one batch of segments in its own transaction; returns them with their ids.
+    `processed` (seconds of audio decoded so far) is written to Video.audio_processed
+    in the same transaction.
+    """
+    db = SessionLocal()
+    try:
+        ids = bulk.insert_rows(db, models.Segment, [
+            {"video_id": video_id, "t_start": s, "t_end": e, "text": t} for (s,e,t) in segments
+        ], return_ids=True)
+        if processed is not None:
+            v = db.get(models.Video, video_id)
+            if v:
+                v.audio_processed = processed
+        db.commit()
+        return [SegmentRow(i, s, e, t) for i, (s,e,t) in zip(ids, segments)]
+    except Exception as e:
+        print(f"Error persisting segments for video {video_id}: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
 
 def persist_segments(video_id: int, segments: List[Tuple[float,float,str]]):
     db = SessionLocal()
     try:
-        for (s,e,t) in segments:
-            db.add(models.Segment(video_id=video_id, t_start=s, t_end=e, text=t))
-        
+        bulk.insert_rows(db, models.Segment, [
+            {"video_id": video_id, "t_start": s, "t_end": e, "text": t} for (s,e,t) in segments
+        ])
+
         v = db.get(models.Video, video_id)
         if v:
             # Set status based on whether we found actual speech
-            if any("[No speech detected]" not in t for s,e,t in segments):
+            if any(NO_SPEECH not in t for s,e,t in segments):
                 v.status = "TRANSCRIBED"
             else:
                 v.status = "NO_SPEECH"
@@ -73,3 +325,88 @@ def persist_segments(video_id: int, segments: List[Tuple[float,float,str]]):
         raise
     finally:
         db.close()
+
+def _resume_point(db, video_id: int) -> float:
+    """End of the last persisted segment: where a retried task picks up decoding."""
+    last = (db.query(func.max(models.Segment.t_end))
+              .filter(models.Segment.video_id == video_id)
+              .filter(models.Segment.text != NO_SPEECH)
+              .scalar())
+    return float(last or 0.0)
+
+def transcribe_to_db(
+    video_id: int,
+    s3_key: str,
+    on_batch: Optional[Callable[[List[SegmentRow]], None]] = None,
+    flush_segments: int = ASR_FLUSH_SEGMENTS,
+    preview: bool = False,
+) -> int:
+    """
+    Decode `s3_key` and flush segments to the database in small batches as they are
+    produced, updating Video.audio_processed so /videos/{id}/segments serves a live
+    partial transcript. Memory stays flat, and a retried task (task_acks_late)
+    resumes after the last persisted segment instead of starting over.
+
+    Args:
+        on_batch: Called with each committed batch (e.g. a streaming claim consumer)
+        flush_segments: Max segments per batch (ASR_FLUSH_SECONDS also bounds batch age)
+        preview: Decode with ASR_PREVIEW_MODEL and finish as PREVIEW_TRANSCRIBED;
+            refine_transcript() later replaces the segments
+
+    Returns:
+        Number of speech segments persisted for the video (including resumed ones)
+    """
+    db = SessionLocal()
+    try:
+        resume = _resume_point(db, video_id)
+        existing = (db.query(models.Segment)
+                      .filter(models.Segment.video_id == video_id)
+                      .filter(models.Segment.text != NO_SPEECH)
+                      .count())
+        v = db.get(models.Video, video_id)
+        if v:
+            v.status = "TRANSCRIBING"
+            v.audio_processed = resume
+        db.commit()
+    finally:
+        db.close()
+    if resume:
+        print(f"Resuming transcription of video {video_id} at {resume:.1f}s ({existing} segments kept)")
+
+    buf: List[Tuple[float,float,str]] = []
+    n = existing
+    last_flush = time.monotonic()
+
+    def flush():
+        nonlocal buf, last_flush
+        if buf:
+            rows = persist_segment_batch(video_id, buf, processed=buf[-1][1])
+            if on_batch:
+                on_batch(rows)
+        buf, last_flush = [], time.monotonic()
+
+    model_kw = {"model_name": ASR_PREVIEW_MODEL, "compute_type": ASR_PREVIEW_COMPUTE_TYPE} if preview else {}
+    for seg in iter_transcribe_s3(s3_key, start=resume, **model_kw):
+        buf.append(seg)
+        n += 1
+        if len(buf) >= flush_segments or time.monotonic() - last_flush >= ASR_FLUSH_SECONDS:
+            flush()
+    flush()
+
+    db = SessionLocal()
+    try:
+        v = db.get(models.Video, video_id)
+        if not n:
+            print("Warning: No speech segments found in audio")
+            db.add(models.Segment(video_id=video_id, t_start=0.0, t_end=1.0, text=NO_SPEECH))
+        if v:
+            if preview:
+                v.status = "PREVIEW_TRANSCRIBED"
+            else:
+                v.status = "TRANSCRIBED" if n else "NO_SPEECH"
+            if v.duration:
+                v.audio_processed = v.duration
+        db.commit()
+    finally:
+        db.close()
+    return n
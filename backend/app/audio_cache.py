@@ -0,0 +1,163 @@
+# app/audio_cache.py
+"""
+Decoded-audio cache for ASR workers.
+
+Transcription needs 16 kHz mono float32 samples. Instead of downloading and
+decoding `media/{id}.*` on every pass, the decoded array is written once to
+AUDIO_CACHE_DIR as a float32 .npy file (keyed by S3 key + ETag) and then
+memory-mapped. VAD analysis, chunked/batched decoding, two-pass refinement
+and retries all read the same pages from the OS page cache; slicing for
+chunks is a view, not a copy.
+
+WAV (AUDIO_FORMAT=wav) files are read directly without ffmpeg/PyAV.
+The encoded object itself comes from the media cache (app.media_cache), and
+prefork children decoding the same object wait for the first one instead of
+decoding it again. The cache directory is bounded by AUDIO_CACHE_MAX_MB
+(least recently used files are removed first).
+"""
+import os
+import struct
+import tempfile
+from typing import Optional
+
+import numpy as np
+
+from . import metrics
+from .cache import digest
+from .locks import file_lock
+from .media_cache import open_media
+
+AUDIO_CACHE = os.getenv("AUDIO_CACHE", "on").lower() != "off"
+AUDIO_CACHE_DIR = os.getenv("AUDIO_CACHE_DIR", os.path.join(tempfile.gettempdir(), "adveritas_audio"))
+AUDIO_CACHE_MAX_MB = float(os.getenv("AUDIO_CACHE_MAX_MB", "4096"))  # 1 h of audio is ~230 MB
+
+SAMPLE_RATE = 16000
+
+
+def read_wav_pcm16(path: str) -> Optional[np.ndarray]:
+    """
+    Samples of a 16 kHz mono s16le WAV as float32, or None for any other file.
+    The data chunk is read to EOF because WAVs written to a pipe carry a
+    placeholder size.
+    """
+    with open(path, "rb") as f:
+        head = f.read(12)
+        if len(head) < 12 or head[:4] != b"RIFF" or head[8:12] != b"WAVE":
+            return None
+        fmt = None
+        while True:
+            hdr = f.read(8)
+            if len(hdr) < 8:
+                return None
+            cid, size = hdr[:4], struct.unpack("<I", hdr[4:])[0]
+            if cid == b"fmt ":
+                body = f.read(size + (size & 1))
+                if len(body) < 16:
+                    return None
+                fmt = struct.unpack("<HHIIHH", body[:16])  # tag, channels, rate, byte rate, align, bits
+            elif cid == b"data":
+                if not fmt or fmt[0] != 1 or fmt[1] != 1 or fmt[2] != SAMPLE_RATE or fmt[5] != 16:
+                    return None
+                data = f.read()
+                if 0 < size < len(data):
+                    data = data[:size]
+                pcm = np.frombuffer(data, dtype="<i2", count=len(data) // 2)
+                return pcm.astype(np.float32) / 32768.0
+            else:
+                f.seek(size + (size & 1), 1)
+
+
+def load_audio(path: str) -> np.ndarray:
+    """16 kHz mono float32 samples of an audio file (WAV fast path, else PyAV decode)."""
+    audio = read_wav_pcm16(path)
+    if audio is not None:
+        return audio
+    from faster_whisper.audio import decode_audio
+    return decode_audio(path, sampling_rate=SAMPLE_RATE)
+
+
+def _path(s3_key: str, etag: str) -> str:
+    return os.path.join(AUDIO_CACHE_DIR, f"{digest(s3_key, etag)}.npy")
+
+
+def _open_cached(path: str) -> Optional[np.ndarray]:
+    """
+    Memmap of a cached file, or None if it is not there. Another worker's
+    evict() can remove it at any time; once opened, the mapping survives that.
+    """
+    try:
+        audio = np.load(path, mmap_mode="c")
+    except FileNotFoundError:
+        return None
+    try:
+        os.utime(path)  # LRU order for evict()
+    except FileNotFoundError:
+        pass
+    return audio
+
+
+def load_s3_audio(s3_key: str) -> np.ndarray:
+    """
+    Decoded samples of `s3_key`, memory-mapped from the worker-local cache
+    (copy-on-write, so nothing downstream can modify the cached file).
+    """
+    from .storage import head_etag
+
+    if not AUDIO_CACHE:
+        with open_media(s3_key) as local:
+            return load_audio(local)
+
+    etag = head_etag(s3_key)
+    path = _path(s3_key, etag)
+    audio = _open_cached(path)
+    if audio is not None:
+        metrics.incr("audio_cache", "hits")
+        return audio
+
+    os.makedirs(AUDIO_CACHE_DIR, exist_ok=True)
+    with file_lock(path + ".lock"):
+        audio = _open_cached(path)  # decoded by another worker while we waited
+        if audio is not None:
+            metrics.incr("audio_cache", "hits")
+            return audio
+        metrics.incr("audio_cache", "misses")
+        with open_media(s3_key, etag=etag) as local:
+            decoded = np.ascontiguousarray(load_audio(local), dtype=np.float32)
+        with tempfile.TemporaryDirectory(dir=AUDIO_CACHE_DIR) as td:
+            tmp = os.path.join(td, "decoded.npy")
+            with open(tmp, "wb") as f:
+                np.save(f, decoded)
+            os.replace(tmp, path)  # atomic: concurrent readers never see a partial file
+        del decoded
+        audio = np.load(path, mmap_mode="c")  # mapped before anyone can evict it
+    try:
+        os.remove(path + ".lock")
+    except FileNotFoundError:
+        pass
+    evict(keep=path)
+    return audio
+
+
+def evict(max_mb: float = None, keep: Optional[str] = None) -> int:
+    """Remove least recently used .npy files beyond the size bound; returns files removed."""
+    max_bytes = (AUDIO_CACHE_MAX_MB if max_mb is None else max_mb) * 1024 * 1024
+    try:
+        entries = [e for e in os.scandir(AUDIO_CACHE_DIR) if e.name.endswith(".npy")]
+    except FileNotFoundError:
+        return 0
+    stats = sorted(((e.stat().st_mtime, e.stat().st_size, e.path) for e in entries))
+    total = sum(size for _, size, _ in stats)
+    removed = 0
+    for _, size, path in stats:
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)  # open memmaps keep their pages until closed
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    metrics.incr("audio_cache", "evicted", removed)
+    return removed
@@ -0,0 +1,137 @@
+# app/bulk.py
+"""
+Bulk row writes for the hot insert paths (segments, claims, occurrences, evidence).
+
+On PostgreSQL (psycopg 3) rows go through binary COPY: one round trip per
+batch, no SQL parsing per row, and 384-dim pgvector embeddings are sent in
+pgvector's binary format instead of as '[0.0123,...]' text. When callers
+need the new primary keys, ids are reserved from the table's sequence up
+front and written explicitly, so COPY still works.
+
+Other databases (SQLite in tests), or BULK_COPY=off, use a multi-row
+INSERT ... RETURNING via SQLAlchemy's insertmanyvalues.
+
+Writes run on the session's connection and transaction; callers commit.
+ORM objects are not created, so relationships/identity map are not updated.
+"""
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import Float, Integer, DateTime, String, Text, insert, text
+from sqlalchemy.orm import Session
+
+from pgvector.sqlalchemy import Vector
+
+BULK_COPY = os.getenv("BULK_COPY", "on").lower() != "off"
+
+
+def _pg_type(col) -> str:
+    """Postgres type name used to pick psycopg's binary dumper for a column."""
+    t = col.type
+    if isinstance(t, Vector):
+        return "vector"
+    if isinstance(t, Integer):
+        return "int4"
+    if isinstance(t, Float):
+        return "float8"
+    if isinstance(t, DateTime):
+        return "timestamptz" if t.timezone else "timestamp"
+    if isinstance(t, (String, Text)):
+        return "text"  # varchar and text share the binary wire format
+    raise TypeError(f"bulk COPY does not support column {col.table.name}.{col.name} of type {t!r}")
+
+
+def _fill_defaults(table, rows: List[Dict[str, Any]]) -> List[str]:
+    """Apply Python-side column defaults (e.g. created_at=utcnow) that COPY would skip."""
+    given = set()
+    for r in rows:
+        given.update(r)
+    cols = [c.name for c in table.columns if c.name in given]
+    for c in table.columns:
+        if c.name in given or c.default is None or c.primary_key:
+            continue
+        d = c.default
+        if d.is_scalar:
+            value = lambda: d.arg
+        elif d.is_callable:
+            value = lambda: d.arg(None)
+        else:
+            continue
+        for r in rows:
+            r[c.name] = value()
+        cols.append(c.name)
+    return cols
+
+
+def _use_copy(db: Session) -> bool:
+    bind = db.get_bind()
+    return BULK_COPY and bind.dialect.name == "postgresql" and bind.dialect.driver == "psycopg"
+
+
+def _raw_connection(db: Session):
+    """psycopg connection behind the session, with pgvector types registered once."""
+    pooled = db.connection().connection
+    if not pooled.info.get("pgvector_registered"):
+        from pgvector.psycopg import register_vector
+        register_vector(pooled.dbapi_connection)
+        pooled.info["pgvector_registered"] = True
+    return pooled.dbapi_connection
+
+
+def reserve_ids(db: Session, table, n: int) -> List[int]:
+    """Take `n` values from the table's id sequence (PostgreSQL)."""
+    seq = db.execute(text("SELECT pg_get_serial_sequence(:t, 'id')"), {"t": table.name}).scalar()
+    return list(db.execute(
+        text("SELECT nextval(CAST(:s AS regclass)) FROM generate_series(1, :n)"), {"s": seq, "n": n}
+    ).scalars())
+
+
+def copy_rows(db: Session, table, columns: Sequence[str], rows: List[Dict[str, Any]]):
+    """Binary COPY of `rows` into `table` (PostgreSQL + psycopg 3 only)."""
+    cols = [table.c[name] for name in columns]
+    vectors = {c.name for c in cols if isinstance(c.type, Vector)}
+    conn = _raw_connection(db)
+    col_sql = ", ".join(f'"{c.name}"' for c in cols)
+    with conn.cursor() as cur:
+        with cur.copy(f'COPY "{table.name}" ({col_sql}) FROM STDIN WITH (FORMAT BINARY)') as cp:
+            cp.set_types([_pg_type(c) for c in cols])
+            for r in rows:
+                cp.write_row([
+                    np.asarray(r[name], dtype=np.float32)
+                    if name in vectors and r.get(name) is not None else r.get(name)
+                    for name in columns
+                ])
+
+
+def insert_rows(db: Session, model, rows: List[Dict[str, Any]], return_ids: bool = False) -> Optional[List[int]]:
+    """
+    Insert `rows` (dicts of column -> value) into `model`'s table in one batch.
+
+    Args:
+        return_ids: Return the new primary keys, in the order of `rows`
+
+    Returns:
+        List of ids if return_ids, else None
+    """
+    if not rows:
+        return [] if return_ids else None
+    table = model.__table__
+    rows = [dict(r) for r in rows]
+
+    if _use_copy(db):
+        ids = None
+        if return_ids:
+            ids = reserve_ids(db, table, len(rows))
+            for r, i in zip(rows, ids):
+                r["id"] = i
+        columns = _fill_defaults(table, rows)
+        copy_rows(db, table, columns, rows)
+        return ids
+
+    _fill_defaults(table, rows)
+    if return_ids:
+        stmt = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+        return list(db.execute(stmt, rows).scalars())
+    db.execute(insert(table), rows)
+    return None
@@ -0,0 +1,240 @@
+# app/cache.py
+"""
+Two-tier key/value cache: in-process LRU in front of Redis.
+
+Values are JSON-serializable. Each cache has a namespace; callers fold
+anything that should invalidate entries (model name, label set, ...)
+into the namespace so a config change simply stops matching old keys,
+which then age out through the Redis TTL.
+
+Hit/miss counters are kept per process and, best effort, in a Redis hash
+so every worker contributes to the same numbers.
+"""
+import os
+import json
+import hashlib
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+# After a connection error, best-effort callers skip Redis for this long
+REDIS_RETRY_S = float(os.getenv("REDIS_RETRY_S", "30"))
+
+_redis = None
+_redis_down_until = 0.0
+def get_redis():
+    global _redis
+    if _redis is None:
+        import redis
+        _redis = redis.Redis.from_url(REDIS_URL, socket_timeout=1.0, socket_connect_timeout=1.0)
+    return _redis
+
+
+def redis_if_up():
+    """
+    Shared client for best-effort use (caches, counters), or None while a
+    recent connection error is backing off: an unreachable Redis then costs
+    one socket timeout per REDIS_RETRY_S instead of one per call.
+    """
+    if time.monotonic() < _redis_down_until:
+        return None
+    try:
+        return get_redis()
+    except Exception as e:
+        mark_redis_down(e)
+        return None
+
+
+def mark_redis_down(exc: Exception):
+    """Start the backoff window if `exc` means Redis is unreachable."""
+    global _redis_down_until
+    import redis
+    if not isinstance(exc, (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError, OSError, ImportError)):
+        return
+    if time.monotonic() >= _redis_down_until:
+        print(f"Redis unavailable ({exc}), skipping it for {REDIS_RETRY_S:.0f}s")
+    _redis_down_until = time.monotonic() + REDIS_RETRY_S
+
+
+def digest(*parts: Any) -> str:
+    """Short stable hash of `parts` for use in keys and namespaces."""
+    h = hashlib.sha1()
+    for p in parts:
+        h.update(json.dumps(p, sort_keys=True, default=str).encode("utf-8"))
+        h.update(b"\x1f")
+    return h.hexdigest()[:16]
+
+
+class LRU:
+    """Thread-safe size-bounded LRU mapping."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._d: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            if key not in self._d:
+                return default
+            self._d.move_to_end(key)
+            return self._d[key]
+
+    def set(self, key: str, value: Any):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._d[key] = value
+            self._d.move_to_end(key)
+            while len(self._d) > self.maxsize:
+                self._d.popitem(last=False)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._d
+
+    def __len__(self) -> int:
+        return len(self._d)
+
+    def clear(self):
+        with self._lock:
+            self._d.clear()
+
+
+_MISSING = object()
+
+
+class TwoTierCache:
+    """
+    LRU -> Redis cache under a namespace.
+
+    Args:
+        namespace: Key prefix; include a digest of anything that should invalidate entries
+        maxsize: Max entries held in the in-process LRU
+        ttl: Redis expiry in seconds (None = no expiry)
+        redis_client: Client to use; defaults to the shared client, skipped while Redis
+            is down (see redis_if_up). Pass False for LRU only.
+    """
+
+    def __init__(self, namespace: str, maxsize: int = 10000, ttl: Optional[int] = None, redis_client=None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.lru = LRU(maxsize)
+        self.counters = Counter()
+        self._redis = redis_client
+
+    # ---------- redis plumbing ----------
+    def _r(self):
+        if self._redis is False:
+            return None
+        if self._redis is None:
+            # shared client; None while Redis is down, so lookups stay LRU only
+            return redis_if_up()
+        return self._redis
+
+    def _failed(self, e: Exception):
+        if self._redis is None:
+            mark_redis_down(e)
+
+    def _key(self, key: str) -> str:
+        return f"cache:{self.namespace}:{key}"
+
+    @property
+    def _stats_key(self) -> str:
+        return f"cache:stats:{self.namespace}"
+
+    def _count(self, **incs: int):
+        incs = {k: v for k, v in incs.items() if v}
+        if not incs:
+            return
+        self.counters.update(incs)
+        r = self._r()
+        if r is None:
+            return
+        try:
+            pipe = r.pipeline(transaction=False)
+            for k, v in incs.items():
+                pipe.hincrby(self._stats_key, k, v)
+            pipe.execute()
+        except Exception as e:
+            self._failed(e)
+
+    # ---------- public API ----------
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Return {key: value} for every key found in either tier."""
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, Any] = {}
+        remote: List[str] = []
+        for k in keys:
+            v = self.lru.get(k, _MISSING)
+            if v is _MISSING:
+                remote.append(k)
+            else:
+                found[k] = v
+        lru_hits = len(found)
+
+        r = self._r() if remote else None
+        if r is not None:
+            try:
+                raw = r.mget([self._key(k) for k in remote])
+                for k, blob in zip(remote, raw):
+                    if blob is not None:
+                        v = json.loads(blob)
+                        found[k] = v
+                        self.lru.set(k, v)
+            except Exception as e:
+                print(f"Cache {self.namespace}: redis read failed ({e})")
+                self._failed(e)
+
+        self._count(
+            hits_lru=lru_hits,
+            hits_redis=len(found) - lru_hits,
+            misses=len(keys) - len(found),
+        )
+        return found
+
+    def get(self, key: str, default=None):
+        return self.get_many([key]).get(key, default)
+
+    def set_many(self, items: Dict[str, Any]):
+        if not items:
+            return
+        for k, v in items.items():
+            self.lru.set(k, v)
+        r = self._r()
+        if r is None:
+            return
+        try:
+            pipe = r.pipeline(transaction=False)
+            for k, v in items.items():
+                pipe.set(self._key(k), json.dumps(v), ex=self.ttl)
+            pipe.execute()
+        except Exception as e:
+            print(f"Cache {self.namespace}: redis write failed ({e})")
+            self._failed(e)
+
+    def set(self, key: str, value: Any):
+        self.set_many({key: value})
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process and (if reachable) across all workers."""
+        def with_rate(c: Dict[str, int]) -> Dict[str, Any]:
+            c = {k: int(v) for k, v in c.items()}
+            hits = c.get("hits_lru", 0) + c.get("hits_redis", 0)
+            total = hits + c.get("misses", 0)
+            c["hit_rate"] = (hits / total) if total else None
+            return c
+
+        out = {"namespace": self.namespace, "lru_size": len(self.lru), "process": with_rate(dict(self.counters))}
+        r = self._r()
+        if r is not None:
+            try:
+                raw = r.hgetall(self._stats_key)
+                out["global"] = with_rate({
+                    (k.decode() if isinstance(k, bytes) else k): int(v) for k, v in raw.items()
+                })
+            except Exception as e:
+                self._failed(e)
+        return out
@@ -0,0 +1,146 @@
+# app/claim_index.py
+"""
+Cross-video claim index.
+
+Claims carry a MiniLM embedding indexed with pgvector HNSW (cosine). Before
+fetching evidence or generating a verdict we look for an already-checked
+claim within CLAIM_REUSE_MAX_DISTANCE whose verdict is younger than
+CLAIM_REUSE_MAX_AGE_DAYS, and copy its evidence/verdict instead of paying
+for retrieval and the LLM again. A verdict is only reused from the claim
+whose evidence was copied. Copies point at their originals
+(`reused_from_id`) and the claim records which claim it reused and at what
+distance, so every reuse can be audited.
+"""
+import os
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from . import models, bulk
+
+CLAIM_REUSE = os.getenv("CLAIM_REUSE", "on").lower() != "off"
+CLAIM_REUSE_MAX_DISTANCE = float(os.getenv("CLAIM_REUSE_MAX_DISTANCE", "0.08"))  # cosine distance
+CLAIM_REUSE_MAX_AGE_DAYS = float(os.getenv("CLAIM_REUSE_MAX_AGE_DAYS", "14"))
+CLAIM_REUSE_CANDIDATES = int(os.getenv("CLAIM_REUSE_CANDIDATES", "5"))
+
+
+def ensure_embedding(db: Session, claim: models.Claim):
+    """Backfill the claim embedding (claims from before the index existed)."""
+    if claim.embedding is None:
+        from .embeddings import embed_texts
+        claim.embedding = embed_texts([claim.canonical_text or claim.claim_text])[0].tolist()
+        db.commit()
+    return claim.embedding
+
+
+def _latest_verdict(db: Session, claim_id: int) -> Optional[models.Verdict]:
+    return (db.query(models.Verdict)
+              .filter(models.Verdict.claim_id == claim_id)
+              .order_by(models.Verdict.created_at.desc())
+              .first())
+
+
+def _fresh_verdict(db: Session, claim_id: int) -> Optional[models.Verdict]:
+    """Latest verdict of the claim if younger than CLAIM_REUSE_MAX_AGE_DAYS."""
+    verdict = _latest_verdict(db, claim_id)
+    cutoff = datetime.utcnow() - timedelta(days=CLAIM_REUSE_MAX_AGE_DAYS)
+    if verdict and verdict.created_at and verdict.created_at >= cutoff:
+        return verdict
+    return None
+
+
+def _nearest(db: Session, claim: models.Claim, vec) -> List[Tuple[models.Claim, float]]:
+    """The CLAIM_REUSE_CANDIDATES other claims closest to `vec`, nearest first."""
+    dist = models.Claim.embedding.cosine_distance(vec)
+    # Plain ORDER BY distance LIMIT k so the HNSW index is used; filter afterwards
+    return (db.query(models.Claim, dist.label("distance"))
+              .filter(models.Claim.id != claim.id)
+              .filter(models.Claim.embedding.isnot(None))
+              .order_by(dist)
+              .limit(CLAIM_REUSE_CANDIDATES)
+              .all())
+
+
+def _reusable(db: Session, claim: models.Claim) -> Iterator[Tuple[models.Claim, float, models.Verdict]]:
+    """Candidates close enough to reuse, nearest first, with their fresh verdicts."""
+    if not CLAIM_REUSE:
+        return
+    vec = ensure_embedding(db, claim)
+
+    for cand, d in _nearest(db, claim, vec):
+        if d is None or d > CLAIM_REUSE_MAX_DISTANCE:
+            break
+        # never copy from a copy of ourselves
+        if cand.reused_from_claim_id == claim.id:
+            continue
+        verdict = _fresh_verdict(db, cand.id)
+        if verdict:
+            yield cand, float(d), verdict
+
+
+def find_reusable(db: Session, claim: models.Claim) -> Optional[Tuple[models.Claim, float, models.Verdict]]:
+    """
+    ANN lookup for an already-checked claim close enough to reuse.
+
+    Returns:
+        (matched claim, cosine distance, its latest verdict) or None
+    """
+    return next(_reusable(db, claim), None)
+
+
+def _mark_reused(claim: models.Claim, source: models.Claim, distance: float):
+    claim.reused_from_claim_id = source.id
+    claim.reuse_distance = distance
+    claim.reused_at = datetime.utcnow()
+
+
+def reuse_evidence(db: Session, claim: models.Claim) -> Optional[dict]:
+    """
+    Copy evidence from the nearest matching checked claim that has any;
+    returns a summary or None if no match.
+    """
+    for source, distance, _ in _reusable(db, claim):
+        evs = db.query(models.Evidence).filter(models.Evidence.claim_id == source.id).all()
+        if evs:
+            break
+    else:
+        return None
+    bulk.insert_rows(db, models.Evidence, [dict(
+        claim_id=claim.id,
+        source=e.source,
+        title=e.title,
+        url=e.url,
+        snippet=e.snippet,
+        similarity=e.similarity,
+        rerank_score=e.rerank_score,
+        embedding=e.embedding,
+        reused_from_id=e.id,
+    ) for e in evs])
+    _mark_reused(claim, source, distance)
+    db.commit()
+    return {"reused_from": source.id, "distance": distance, "stored": len(evs)}
+
+
+def reuse_verdict(db: Session, claim: models.Claim) -> Optional[models.Verdict]:
+    """
+    Copy the fresh verdict of the claim whose evidence reuse_evidence copied,
+    so the verdict and the evidence shown with it come from the same claim.
+    Returns the new Verdict or None.
+    """
+    if not CLAIM_REUSE or not claim.reused_from_claim_id:
+        return None
+    verdict = _fresh_verdict(db, claim.reused_from_claim_id)
+    if not verdict:
+        return None
+    v = models.Verdict(
+        claim_id=claim.id,
+        label=verdict.label,
+        confidence=verdict.confidence,
+        rationale=verdict.rationale,
+        sources=verdict.sources,
+        reused_from_id=verdict.id,
+    )
+    db.add(v)
+    db.commit()
+    return v
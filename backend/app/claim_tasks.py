@@ -1,9 +1,104 @@
+import os
+import time
+import queue
+import threading
+from collections import Counter
+from typing import List, Optional, Tuple
 from .celery_app import celery_app
 from .db import SessionLocal
-from . import models
-from .claims_extract import extract_claim_sentences
+from . import models, bulk
+from .claims_extract import extract_claims_for_segments
 from sqlalchemy.orm import Session
 
+# Streaming mode: segments scored per micro-batch while ASR is still running
+CLAIM_STREAM_BATCH = int(os.getenv("CLAIM_STREAM_BATCH", "16"))  # segments per scoring pass
+CLAIM_STREAM_WAIT = float(os.getenv("CLAIM_STREAM_WAIT", "2.0"))  # max seconds to wait for a fuller batch
+
+# Near-duplicate claims within a video collapse into one canonical Claim
+CLAIM_DEDUP = os.getenv("CLAIM_DEDUP", "on").lower() != "off"
+CLAIM_DEDUP_THRESHOLD = float(os.getenv("CLAIM_DEDUP_THRESHOLD", "0.88"))
+
+
+class ClaimWriter:
+    """
+    Turns scored candidates into Claim + ClaimOccurrence rows for one video.
+
+    Candidates can arrive in several batches (streaming extraction); cluster
+    leaders are kept across batches so a claim repeated an hour later still
+    folds into the first one. Candidates are embedded in one batch per call,
+    and the embedding is stored on the Claim for the cross-video index.
+    Claims and occurrences are written with bulk.insert_rows (COPY on Postgres).
+    """
+
+    def __init__(self, video_id: int, threshold: float = CLAIM_DEDUP_THRESHOLD, dedup: bool = CLAIM_DEDUP):
+        self.video_id = video_id
+        self.threshold = threshold
+        self.dedup = dedup
+        self.leader_vecs = []   # embeddings of canonical claims so far
+        self.leader_ids = []    # matching Claim ids
+        self.created = 0
+        self.mentions = 0
+
+    def seed(self, claims: List[models.Claim]):
+        """Make existing claims cluster leaders, so new candidates fold into them."""
+        from .embeddings import embed_texts
+        import numpy as np
+
+        missing = [c for c in claims if c.embedding is None]
+        if missing:
+            for c, vec in zip(missing, embed_texts([c.claim_text for c in missing])):
+                c.embedding = vec.tolist()
+        for c in claims:
+            self.leader_vecs.append(np.asarray(c.embedding, dtype=np.float32))
+            self.leader_ids.append(c.id)
+
+    def add(self, db: Session, cand: List[Tuple[int, str, float]], segs_by_id: dict) -> int:
+        """Store `cand` [(segment_id, text, score), ...]; returns number of new Claims."""
+        from .embeddings import embed_texts, cluster_by_similarity, cosine_sim
+        import numpy as np
+
+        if not cand:
+            return 0
+        X = embed_texts([text for _, text, _ in cand])
+        k = len(self.leader_vecs)
+        # previous leaders are mutually dissimilar, so they stay leaders 0..k-1
+        allX = np.vstack([np.asarray(self.leader_vecs, dtype=X.dtype), X]) if k else X
+        if self.dedup:
+            assign = cluster_by_similarity(allX, self.threshold)[k:]
+        else:
+            assign = list(range(k, k + len(cand)))
+
+        fresh = [i for i in range(len(cand)) if assign[i] == k + i]
+        ids = bulk.insert_rows(db, models.Claim, [dict(
+            video_id=self.video_id,
+            segment_id=cand[i][0],
+            claim_text=cand[i][1],
+            canonical_text=cand[i][1],  # later you'll normalize entities, dates, etc.
+            embedding=X[i],
+        ) for i in fresh], return_ids=True)
+
+        owner = dict(enumerate(self.leader_ids))  # row of allX -> Claim id
+        for i, claim_id in zip(fresh, ids):
+            owner[k + i] = claim_id
+            self.leader_vecs.append(X[i])
+            self.leader_ids.append(claim_id)
+
+        occurrences = []
+        for i, (seg_id, text, score) in enumerate(cand):
+            seg = segs_by_id.get(seg_id)
+            occurrences.append(dict(
+                claim_id=owner[assign[i]],
+                segment_id=seg_id,
+                t_start=seg.t_start if seg else None,
+                t_end=seg.t_end if seg else None,
+                text=text,
+                similarity=cosine_sim(X[i], allX[assign[i]]),
+            ))
+        bulk.insert_rows(db, models.ClaimOccurrence, occurrences)
+        self.created += len(fresh)
+        self.mentions += len(cand)
+        return len(fresh)
+
 
 @celery_app.task(name="claims.extract_for_video")
 def extract_for_video(video_id: int, overwrite: bool = False):
@@ -24,24 +119,140 @@ def extract_for_video(video_id: int, overwrite: bool = False):
             db.query(models.Claim).filter(models.Claim.video_id == video_id).delete()
             db.commit()
 
-        # 2) extract per segment to retain timestamps
-        created = 0
-        for seg in segs:
-            cand = extract_claim_sentences(seg.text)
-            for text, score in cand:
-                db.add(models.Claim(
-                    video_id=video_id,
-                    segment_id=seg.id,
-                    claim_text=text,
-                    canonical_text=text,  # later you'll normalize entities, dates, etc.
-                ))
-                created += 1
-
-        # 3) mark video status
+        # 2) score every sentence of the video in one batched pass;
+        #    segment ids come back with each claim to retain timestamps
+        stats = Counter()
+        cand = extract_claims_for_segments([(seg.id, seg.text) for seg in segs], stats=stats)
+
+        # 3) collapse repeats: one Claim per cluster, one ClaimOccurrence per mention
+        writer = ClaimWriter(video_id)
+        writer.add(db, cand, {seg.id: seg for seg in segs})
+        created = writer.created
+        stats["collapsed"] += writer.mentions - created
+
+        # 4) mark video status
         v = db.get(models.Video, video_id)
         if v:
             v.status = "CLAIMED" if created else "NO_CLAIMS"
         db.commit()
-        return {"ok": True, "created": created}
+        print(f"Claim cascade for video {video_id}: {dict(stats)}")
+        return {"ok": True, "created": created, "cascade": dict(stats)}
     finally:
         db.close()
+
+
+class StreamingClaimExtractor:
+    """
+    Background consumer that extracts claims from segments while ASR is still
+    decoding later audio.
+
+    The producer calls feed() with persisted segment rows (anything with
+    id/t_start/t_end/text) as they come out of the decoder; a worker thread
+    scores them in micro-batches of up to CLAIM_STREAM_BATCH segments and
+    writes claims immediately, so the first claims show up seconds after
+    decoding starts instead of after the full transcription.
+    """
+
+    _DONE = object()
+
+    def __init__(self, video_id: int, batch_segments: int = CLAIM_STREAM_BATCH, max_wait: float = CLAIM_STREAM_WAIT):
+        self.video_id = video_id
+        self.batch_segments = max(1, batch_segments)
+        self.max_wait = max_wait
+        self.stats = Counter()
+        self.writer = ClaimWriter(video_id)
+        self.started_at: Optional[float] = None
+        self.first_claim_after: Optional[float] = None
+        self.error: Optional[BaseException] = None
+        self._q: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f"claims-{video_id}", daemon=True)
+
+    def start(self) -> "StreamingClaimExtractor":
+        self.started_at = time.monotonic()
+        self._thread.start()
+        return self
+
+    def resume(self) -> int:
+        """
+        Pick up the claims of a retried task before start(): claims already
+        written become cluster leaders, and committed segments the previous
+        consumer never turned into claim occurrences are queued first.
+
+        Returns:
+            Number of claims the video already has
+        """
+        from .asr import NO_SPEECH, SegmentRow
+
+        db: Session = SessionLocal()
+        try:
+            claims = db.query(models.Claim).filter(models.Claim.video_id == self.video_id).all()
+            self.writer.seed(claims)
+            pending = [SegmentRow(s.id, s.t_start, s.t_end, s.text) for s in (
+                db.query(models.Segment)
+                  .outerjoin(models.ClaimOccurrence, models.ClaimOccurrence.segment_id == models.Segment.id)
+                  .filter(models.Segment.video_id == self.video_id)
+                  .filter(models.Segment.text != NO_SPEECH)
+                  .filter(models.ClaimOccurrence.id.is_(None))
+                  .order_by(models.Segment.t_start.asc())
+            )]
+            db.commit()  # embeddings backfilled by seed()
+        finally:
+            db.close()
+        self.feed(pending)
+        return len(claims)
+
+    def feed(self, segments):
+        for seg in segments:
+            self._q.put(seg)
+
+    def close(self) -> dict:
+        """Wait for all fed segments to be processed; re-raises a consumer failure."""
+        self._q.put(self._DONE)
+        self._thread.join()
+        if self.error:
+            raise self.error
+        self.stats["collapsed"] += self.writer.mentions - self.writer.created
+        return {
+            "created": self.writer.created,
+            "cascade": dict(self.stats),
+            "first_claim_after": self.first_claim_after,
+        }
+
+    def _next_batch(self):
+        """Block for one segment, then top up the batch for at most max_wait seconds."""
+        batch, done = [], False
+        item = self._q.get()
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            if item is self._DONE:
+                done = True
+                break
+            batch.append(item)
+            if len(batch) >= self.batch_segments:
+                break
+            try:
+                item = self._q.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+        return batch, done
+
+    def _run(self):
+        db: Session = SessionLocal()
+        try:
+            done = False
+            while not done:
+                batch, done = self._next_batch()
+                if not batch:
+                    continue
+                cand = extract_claims_for_segments([(s.id, s.text) for s in batch], stats=self.stats)
+                new = self.writer.add(db, cand, {s.id: s for s in batch})
+                if cand:
+                    db.commit()
+                if new and self.first_claim_after is None:
+                    self.first_claim_after = time.monotonic() - self.started_at
+                    print(f"Video {self.video_id}: first claim after {self.first_claim_after:.1f}s")
+        except BaseException as e:
+            # the queue is unbounded, so the producer never blocks on a dead consumer
+            self.error = e
+        finally:
+            db.close()
@@ -1,26 +1,60 @@
 import os
+import re
+from collections import Counter
 from typing import List, Tuple, Optional
 from transformers import pipeline
 import nltk
 from nltk.tokenize import sent_tokenize
+from .cache import TwoTierCache, digest
 
 # Ensure punkt tokenizer once per image
 nltk.download("punkt", quiet=True)
 
 _CLAIM_MODEL = os.getenv("CLAIM_ZS_MODEL", "facebook/bart-large-mnli")
 _MIN_SCORE   = float(os.getenv("CLAIM_MIN_SCORE", "0.55"))
+_BATCH_SIZE  = int(os.getenv("CLAIM_BATCH_SIZE", "16"))
+_BACKEND     = os.getenv("INFERENCE_BACKEND", "torch").lower()  # torch | onnx
+
+# Cheap first stage of the cascade; "off" sends every sentence to the model
+_PREFILTER           = os.getenv("CLAIM_PREFILTER", "rules").lower()  # rules | off
+_PREFILTER_MIN_WORDS = int(os.getenv("CLAIM_PREFILTER_MIN_WORDS", "4"))
+_PREFILTER_MIN_SCORE = float(os.getenv("CLAIM_PREFILTER_MIN_SCORE", "0.5"))
+
+# Score memo cache (LRU -> Redis), keyed by normalized sentence
+_CACHE_ENABLED  = os.getenv("CLAIM_CACHE", "on").lower() != "off"
+_CACHE_LRU_SIZE = int(os.getenv("CLAIM_CACHE_LRU_SIZE", "20000"))
+_CACHE_TTL      = int(os.getenv("CLAIM_CACHE_TTL", str(30 * 24 * 3600)))
 
 # Lazy global
 _zs = None
 def get_zs():
     global _zs
     if _zs is None:
-        _zs = pipeline("zero-shot-classification", model=_CLAIM_MODEL)
+        if _BACKEND == "onnx":
+            from .onnx_backend import load_zero_shot_pipeline
+            _zs = load_zero_shot_pipeline(_CLAIM_MODEL)
+        else:
+            _zs = pipeline("zero-shot-classification", model=_CLAIM_MODEL)
     return _zs
 
 # Labels we’ll classify each sentence into
 LABELS = ["verifiable factual claim", "opinion / rhetoric", "question", "instruction"]
 
+_score_cache = None
+def get_score_cache() -> Optional[TwoTierCache]:
+    """Score cache namespaced by model + label set, so changing either invalidates it."""
+    global _score_cache
+    if _score_cache is None and _CACHE_ENABLED:
+        _score_cache = TwoTierCache(
+            f"claimscore:{digest(_CLAIM_MODEL, LABELS)}",
+            maxsize=_CACHE_LRU_SIZE,
+            ttl=_CACHE_TTL,
+        )
+    return _score_cache
+
+def normalize_sentence(sentence: str) -> str:
+    return re.sub(r"\s+", " ", (sentence or "").strip()).casefold()
+
 def sentence_split(text: str) -> List[str]:
     # Basic cleanup then NLTK sentence split
     text = (text or "").replace("\n", " ").strip()
@@ -28,19 +62,173 @@ def sentence_split(text: str) -> List[str]:
         return []
     return [s.strip() for s in sent_tokenize(text) if s.strip()]
 
-def score_claim(sentence: str) -> float:
-    """Return the probability that a sentence is a verifiable factual claim."""
-    clf = get_zs()
-    out = clf(sentence, LABELS, multi_label=False)
+# ---------- Stage 1: rule pre-filter ----------
+# Interjections and greetings are filler only when nothing claim-like
+# follows them ("No." / "Hey guys, welcome back." but not "No, vaccines do
+# not cause autism."); calls to action are filler wherever they start the
+# sentence.
+_INTERJECTION_RE = re.compile(
+    r"^(?:hi|hello|hey|welcome(?: back)?|thanks|thank you|okay|ok|um+|uh+|yeah|yes|no|alright|bye)"
+    r"(?:\s+(?:guys|everyone|everybody|folks|all|there|so much))?\s*(?:[,.!]|$)",
+    re.I,
+)
+_CALL_TO_ACTION_RE = re.compile(
+    r"^(?:(?:please\s+)?(?:don't forget|make sure to|subscribe|like and subscribe|see you)\b"
+    r"|(?:thanks|thank you)(?: so much)? for watching\b)",
+    re.I,
+)
+_FACT_VERB_RE = re.compile(
+    r"\b(is|are|was|were|has|have|had|will|won|lost|found|shows?|caused?|increased?|"
+    r"decreased?|rose|fell|grew|killed|died|born|built|invented|discovered)\b",
+    re.I,
+)
+
+def _is_filler(sentence: str) -> bool:
+    sentence = sentence.strip()
+    if _CALL_TO_ACTION_RE.match(sentence):
+        return True
+    m = _INTERJECTION_RE.match(sentence)
+    if not m:
+        return False
+    rest = sentence[m.end():].split()
+    # same entity proxy as prefilter_features, on what follows the interjection
+    return not any(w[:1].isupper() for w in rest[1:]) and not _FACT_VERB_RE.search(" ".join(rest))
+
+def prefilter_features(sentence: str) -> dict:
+    words = sentence.split()
+    return {
+        "words": len(words),
+        "has_digit": any(ch.isdigit() for ch in sentence),
+        # capitalized tokens after the first word: a free proxy for named entities
+        "entities": sum(1 for w in words[1:] if w[:1].isupper()),
+        "question": sentence.rstrip().endswith("?"),
+        "filler": _is_filler(sentence),
+        "fact_verb": bool(_FACT_VERB_RE.search(sentence)),
+    }
+
+def prefilter_score(f: dict) -> float:
+    """Tiny linear model over prefilter_features; higher means more claim-like."""
+    return (
+        1.0 * f["has_digit"]
+        + 0.5 * min(f["entities"], 2)
+        + 0.05 * min(f["words"], 20)
+        + 0.5 * f["fact_verb"]
+    )
+
+def prefilter_reject(sentence: str) -> Optional[str]:
+    """Return the name of the rule that rejects `sentence`, or None if it survives."""
+    f = prefilter_features(sentence)
+    if f["question"]:
+        return "question"
+    if f["words"] < _PREFILTER_MIN_WORDS and not f["has_digit"]:
+        return "short"
+    if f["filler"] and not f["has_digit"] and f["words"] <= 8:
+        return "filler"
+    if prefilter_score(f) < _PREFILTER_MIN_SCORE:
+        return "low_content"
+    return None
+
+# ---------- Stage 2: zero-shot model ----------
+def _claim_prob(out: dict) -> float:
     # Normalize name match; first label is our positive class
     # HF may reorder labels by score in `out["labels"]`
     scores = dict(zip(out["labels"], out["scores"]))
     return float(scores.get("verifiable factual claim", 0.0))
 
-def extract_claim_sentences(text: str, min_score: float = _MIN_SCORE) -> List[Tuple[str,float]]:
-    claims = []
-    for s in sentence_split(text):
-        p = score_claim(s)
+def score_claim(sentence: str) -> float:
+    """Return the probability that a sentence is a verifiable factual claim."""
+    return score_claims([sentence])[0]
+
+def _score_uncached(sentences: List[str], batch_size: int) -> List[float]:
+    if not sentences:
+        return []
+    clf = get_zs()
+    outs = clf(list(sentences), LABELS, multi_label=False, batch_size=max(1, batch_size))
+    if isinstance(outs, dict):  # single input comes back unwrapped
+        outs = [outs]
+    return [_claim_prob(o) for o in outs]
+
+def score_claims(sentences: List[str], batch_size: int = _BATCH_SIZE) -> List[float]:
+    """
+    Batched score_claim: (sentence, label) pairs go through the model in padded batches.
+    Scores are memoized by normalized sentence; only cache misses reach the model.
+    """
+    if not sentences:
+        return []
+    cache = get_score_cache()
+    if cache is None:
+        return _score_uncached(sentences, batch_size)
+
+    keys = [digest(normalize_sentence(s)) for s in sentences]
+    known = cache.get_many(keys)
+
+    # score each distinct missing sentence once
+    todo: dict = {}
+    for k, s in zip(keys, sentences):
+        if k not in known and k not in todo:
+            todo[k] = s
+    fresh = dict(zip(todo.keys(), _score_uncached(list(todo.values()), batch_size)))
+    cache.set_many(fresh)
+    known.update(fresh)
+    return [float(known[k]) for k in keys]
+
+def run_cascade(
+    sentences: List[str],
+    min_score: float = _MIN_SCORE,
+    batch_size: int = _BATCH_SIZE,
+    stats: Optional[Counter] = None,
+) -> List[Tuple[int, float]]:
+    """
+    Prefilter -> zero-shot cascade. Returns [(index, score), ...] for accepted sentences.
+    If `stats` is given it is incremented with "total", "accepted" and one
+    "rejected:<stage>" key per rejecting rule ("rejected:model" for the classifier).
+    """
+    stats = stats if stats is not None else Counter()
+    stats["total"] += len(sentences)
+
+    survivors: List[int] = []
+    for i, s in enumerate(sentences):
+        reason = prefilter_reject(s) if _PREFILTER == "rules" else None
+        if reason:
+            stats[f"rejected:{reason}"] += 1
+        else:
+            survivors.append(i)
+
+    scores = score_claims([sentences[i] for i in survivors], batch_size=batch_size)
+    accepted = []
+    for i, p in zip(survivors, scores):
         if p >= min_score:
-            claims.append((s, p))
-    return claims
+            accepted.append((i, p))
+        else:
+            stats["rejected:model"] += 1
+    stats["accepted"] += len(accepted)
+    return accepted
+
+def extract_claim_sentences(
+    text: str,
+    min_score: float = _MIN_SCORE,
+    stats: Optional[Counter] = None,
+) -> List[Tuple[str,float]]:
+    sents = sentence_split(text)
+    return [(sents[i], p) for i, p in run_cascade(sents, min_score, stats=stats)]
+
+def extract_claims_for_segments(
+    segments: List[Tuple[int, str]],
+    min_score: float = _MIN_SCORE,
+    batch_size: int = _BATCH_SIZE,
+    stats: Optional[Counter] = None,
+) -> List[Tuple[int, str, float]]:
+    """
+    Video-wide claim extraction. Splits every segment into sentences, runs them
+    all through the cascade in one batched pass and maps results back:
+    [(segment_id, sentence, score), ...] in segment order.
+    """
+    owners: List[int] = []
+    sents: List[str] = []
+    for seg_id, text in segments:
+        for s in sentence_split(text):
+            owners.append(seg_id)
+            sents.append(s)
+
+    accepted = run_cascade(sents, min_score, batch_size=batch_size, stats=stats)
+    return [(owners[i], sents[i], p) for i, p in accepted]
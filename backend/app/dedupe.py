@@ -0,0 +1,99 @@
+# app/dedupe.py
+"""
+Ingest de-duplication for URL submissions.
+
+Every URL is reduced to a canonical source id (ingest.canonical_source_id)
+stored on Video.source_id. A submission for a source that already has a
+finished video returns that video; one that is still being processed is
+coalesced onto the in-flight pipeline instead of downloading and
+transcribing the same media twice. The check-then-create runs under a
+per-source Redis lock so concurrent submissions agree on one video.
+Callers can pass force=True to always start a fresh pipeline.
+"""
+import os
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from . import models, metrics
+from .cache import get_redis
+
+INGEST_DEDUPE = os.getenv("INGEST_DEDUPE", "on").lower() != "off"
+# A queued/transcribing video older than this is assumed dead (worker lost) and not reused
+INGEST_INFLIGHT_TTL_S = int(os.getenv("INGEST_INFLIGHT_TTL_S", "7200"))
+INGEST_LOCK_TIMEOUT_S = float(os.getenv("INGEST_LOCK_TIMEOUT_S", "10"))
+
+DONE_STATUSES = ("TRANSCRIBED", "PREVIEW_TRANSCRIBED", "NO_SPEECH", "CLAIMED", "NO_CLAIMS")
+INFLIGHT_STATUSES = ("QUEUED", "TRANSCRIBING")
+
+
+@contextmanager
+def source_lock(source_id: str):
+    """
+    Hold the ingest lock for `source_id` across processes. Without Redis the
+    block runs unlocked (duplicates are then possible but harmless).
+    """
+    lock = None
+    try:
+        lock = get_redis().lock(f"ingest:lock:{source_id}", timeout=INGEST_LOCK_TIMEOUT_S,
+                                blocking_timeout=INGEST_LOCK_TIMEOUT_S)
+        if not lock.acquire():
+            lock = None
+    except Exception as e:
+        print(f"Warning: ingest lock unavailable for {source_id}: {e}")
+        lock = None
+    try:
+        yield
+    finally:
+        if lock is not None:
+            try:
+                lock.release()
+            except Exception:
+                pass  # expired while held; nothing to undo
+
+
+def find_reusable(db: Session, source_id: str, now: Optional[datetime] = None) -> Optional[models.Video]:
+    """Latest finished or live in-flight video for `source_id`, or None."""
+    now = now or datetime.utcnow()
+    q = (db.query(models.Video)
+         .filter(models.Video.source_id == source_id)
+         .order_by(models.Video.id.desc()))
+    for v in q.limit(20):
+        if v.status in DONE_STATUSES:
+            return v
+        if v.status in INFLIGHT_STATUSES and v.created_at and \
+                now - v.created_at < timedelta(seconds=INGEST_INFLIGHT_TTL_S):
+            return v
+    return None
+
+
+def submit_url(db: Session, source_url: str, source_id: Optional[str], title: Optional[str] = None,
+               force: bool = False, enqueue=None) -> models.Video:
+    """
+    Video for `source_url`: an existing one for the same source unless
+    `force`, else a new QUEUED video passed to `enqueue(video_id)`.
+    """
+    if not source_id or not INGEST_DEDUPE:
+        return _create(db, source_url, source_id, title, enqueue)
+
+    with source_lock(source_id):
+        if not force:
+            v = find_reusable(db, source_id)
+            if v is not None:
+                metrics.incr("ingest_dedupe", "hits" if v.status in DONE_STATUSES else "coalesced")
+                return v
+        metrics.incr("ingest_dedupe", "forced" if force else "misses")
+        # enqueue inside the lock: a concurrent submission sees the row as in flight
+        return _create(db, source_url, source_id, title, enqueue)
+
+
+def _create(db: Session, source_url: str, source_id: Optional[str], title: Optional[str], enqueue) -> models.Video:
+    v = models.Video(source_url=source_url, source_id=source_id, title=title, status="QUEUED")
+    db.add(v)
+    db.commit()
+    db.refresh(v)
+    if enqueue is not None:
+        enqueue(v.id)
+    return v
@@ -4,12 +4,17 @@ from typing import List
 from sentence_transformers import SentenceTransformer
 
 _NAME = os.getenv("EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+_BACKEND = os.getenv("INFERENCE_BACKEND", "torch").lower()  # torch | onnx
 _model = None
 
 def get_model():
     global _model
     if _model is None:
-        _model = SentenceTransformer(_NAME)
+        if _BACKEND == "onnx":
+            from .onnx_backend import OnnxSentenceEncoder
+            _model = OnnxSentenceEncoder(_NAME)
+        else:
+            _model = SentenceTransformer(_NAME)
     return _model
 
 def embed_texts(texts: List[str]) -> np.ndarray:
@@ -20,3 +25,21 @@ def embed_texts(texts: List[str]) -> np.ndarray:
 
 def cosine_sim(a: np.ndarray, b: np.ndarray) -> float:
     return float(np.dot(a, b))  # in [-1, 1]
+
+def cluster_by_similarity(X: np.ndarray, threshold: float) -> List[int]:
+    """
+    Greedy leader clustering over normalized rows of X, in order.
+    Returns, for each row, the index of its cluster's leader (first member).
+    """
+    leaders: List[int] = []
+    assign: List[int] = []
+    for i in range(len(X)):
+        if leaders:
+            sims = X[leaders] @ X[i]
+            j = int(np.argmax(sims))
+            if sims[j] >= threshold:
+                assign.append(leaders[j])
+                continue
+        leaders.append(i)
+        assign.append(i)
+    return assign
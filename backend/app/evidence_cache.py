@@ -0,0 +1,128 @@
+# app/evidence_cache.py
+"""
+Response cache for evidence sources.
+
+Wikipedia searches, page texts and NewsAPI results are cached per source
+kind in a TwoTierCache (in-process LRU -> Redis), keyed by the normalized
+query or title. Every kind has its own freshness TTL. An entry past its
+TTL but within EVIDENCE_CACHE_STALE_S is served as is while one background
+request refreshes it (stale-while-revalidate); older entries have expired
+from Redis and are fetched again. Size is bounded by the LRU size in each
+process and by the Redis expiry.
+
+Per kind, hits / stale hits / misses and the response bytes not
+re-downloaded are counted in the `evidence_cache` metrics (see stats()).
+Fetch errors are never cached.
+"""
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from . import metrics
+from .cache import TwoTierCache, digest
+
+EVIDENCE_CACHE = os.getenv("EVIDENCE_CACHE", "on").lower() != "off"
+EVIDENCE_CACHE_LRU_SIZE = int(os.getenv("EVIDENCE_CACHE_LRU_SIZE", "2000"))
+EVIDENCE_CACHE_STALE_S = int(os.getenv("EVIDENCE_CACHE_STALE_S", "86400"))
+
+# Freshness per source kind, seconds
+TTLS = {
+    "wiki_search": int(os.getenv("WIKI_SEARCH_CACHE_TTL", "86400")),
+    "wiki_page": int(os.getenv("WIKI_PAGE_CACHE_TTL", "604800")),
+    "news": int(os.getenv("NEWS_CACHE_TTL", "3600")),  # also NewsAPI quota
+}
+
+_caches: Dict[str, TwoTierCache] = {}
+_refreshing = set()
+_lock = threading.Lock()
+_refresh_pool: Optional[ThreadPoolExecutor] = None
+
+
+def normalize_key(text: str) -> str:
+    return re.sub(r"\s+", " ", (text or "").strip()).casefold()
+
+
+def get_cache(kind: str) -> TwoTierCache:
+    if kind not in _caches:
+        with _lock:
+            if kind not in _caches:
+                _caches[kind] = TwoTierCache(
+                    f"evidence:{kind}", maxsize=EVIDENCE_CACHE_LRU_SIZE,
+                    ttl=TTLS[kind] + EVIDENCE_CACHE_STALE_S,
+                )
+    return _caches[kind]
+
+
+def _store(kind: str, key: str, value: Any):
+    get_cache(kind).set(key, {"v": value, "t": time.time()})
+
+
+def _revalidate(kind: str, key: str, fetch: Callable[[], Any]):
+    """Refresh one entry in the background; concurrent stale hits trigger one refresh."""
+    global _refresh_pool
+    with _lock:
+        if (kind, key) in _refreshing:
+            return
+        _refreshing.add((kind, key))
+        if _refresh_pool is None:
+            _refresh_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="evidence-refresh")
+
+    def run():
+        try:
+            _store(kind, key, fetch())
+            metrics.incr("evidence_cache", f"{kind}_refreshed")
+        except Exception as e:
+            print(f"Evidence cache: refresh of {kind} failed ({e}), keeping stale entry")
+        finally:
+            with _lock:
+                _refreshing.discard((kind, key))
+
+    _refresh_pool.submit(run)
+
+
+def cached(kind: str, key: str, fetch: Callable[[], Any], refetch: Optional[Callable[[], Any]] = None) -> Any:
+    """
+    Value of `fetch()` for `key` (normalized by the caller) through the
+    cache of `kind`. `refetch` is used for background refreshes (e.g. with
+    a fresh deadline instead of the caller's); defaults to `fetch`.
+    """
+    if not EVIDENCE_CACHE:
+        return fetch()
+    key = digest(key)
+    entry = get_cache(kind).get(key)
+    # Redis has dropped entries this old; the in-process LRU never does
+    if entry is not None and time.time() - entry["t"] >= TTLS[kind] + EVIDENCE_CACHE_STALE_S:
+        entry = None
+    if entry is not None:
+        age = time.time() - entry["t"]
+        saved = len(json.dumps(entry["v"]))
+        if age < TTLS[kind]:
+            metrics.incr("evidence_cache", f"{kind}_hits")
+        else:
+            metrics.incr("evidence_cache", f"{kind}_stale")
+            _revalidate(kind, key, refetch or fetch)
+        metrics.incr("evidence_cache", f"{kind}_bytes_saved", saved)
+        return entry["v"]
+
+    metrics.incr("evidence_cache", f"{kind}_misses")
+    value = fetch()
+    _store(kind, key, value)
+    return value
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    """Per kind: hits, stale, misses, hit_ratio and bytes_saved (across processes if Redis is up)."""
+    snap = metrics.snapshot("evidence_cache")
+    counters = snap.get("global", snap["process"])
+    out = {}
+    for kind in TTLS:
+        c = {f: int(counters.get(f"{kind}_{f}", 0)) for f in ("hits", "stale", "misses", "refreshed", "bytes_saved")}
+        served = c["hits"] + c["stale"]
+        total = served + c["misses"]
+        c["hit_ratio"] = (served / total) if total else None
+        out[kind] = c
+    return out
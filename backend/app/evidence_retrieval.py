@@ -1,49 +1,298 @@
 # app/evidence_retrieval.py
+"""
+Evidence sources (Wikipedia, NewsAPI) and storage.
+
+All HTTP goes through one pooled requests.Session per process. A claim's
+sources run concurrently, and so do the page fetches of a Wikipedia
+search; every source has its own deadline and gather_evidence() returns
+whatever arrived within EVIDENCE_BUDGET_S, so one slow or failing source
+costs at most the budget instead of adding its latency to the others.
+Responses are cached per source (app.evidence_cache).
+"""
 import os
-from typing import List, Dict
-import wikipedia
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List, Dict, Optional
 import requests
+from requests.adapters import HTTPAdapter
 
 from .embeddings import embed_texts, cosine_sim
 from .db import SessionLocal
-from . import models
+from . import models, bulk, metrics
+from .evidence_cache import cached, normalize_key
 
 NEWS_KEY = os.getenv("NEWSAPI_KEY")
+WIKI_API_URL = os.getenv("WIKI_API_URL", "https://en.wikipedia.org/w/api.php")
+NEWSAPI_URL = os.getenv("NEWSAPI_URL", "https://newsapi.org/v2/everything")
+
+# Overall time for one claim's evidence, and per-source deadlines within it
+EVIDENCE_BUDGET_S = float(os.getenv("EVIDENCE_BUDGET_S", "8"))
+WIKI_DEADLINE_S = float(os.getenv("WIKI_DEADLINE_S", "6"))
+NEWS_DEADLINE_S = float(os.getenv("NEWS_DEADLINE_S", "5"))
+LOCAL_WIKI_DEADLINE_S = float(os.getenv("LOCAL_WIKI_DEADLINE_S", "2"))
+# Sources queried per claim; local_wiki is the offline passage index (app.passage_index)
+EVIDENCE_SOURCES = [s.strip() for s in os.getenv("EVIDENCE_SOURCES", "wikipedia,newsapi").split(",") if s.strip()]
+# summary: first 600 chars of each page's intro (one snippet per page)
+# passages: whole page text split into overlapping passages; the claim and
+#   up to EVIDENCE_EMBED_BUDGET passages are embedded in one call and the
+#   WIKI_TOP_PASSAGES closest passages are kept
+WIKI_EVIDENCE_MODE = os.getenv("WIKI_EVIDENCE_MODE", "summary").lower()
+EVIDENCE_EMBED_BUDGET = int(os.getenv("EVIDENCE_EMBED_BUDGET", "64"))
+WIKI_TOP_PASSAGES = int(os.getenv("WIKI_TOP_PASSAGES", "3"))
+WIKI_PAGE_MAX_CHARS = int(os.getenv("WIKI_PAGE_MAX_CHARS", "60000"))
+# Concurrent requests per process (also the HTTP connection pool size)
+EVIDENCE_HTTP_WORKERS = int(os.getenv("EVIDENCE_HTTP_WORKERS", "16"))
+
+# Sources stop at their deadline and then hand back partial results; this is
+# how long gather_evidence() waits past the budget to collect them
+_COLLECT_GRACE_S = 0.1
+
+USER_AGENT = "AdVeritas/1.0 (fact-checking evidence retrieval)"
+
+_session: Optional[requests.Session] = None
+_pools: Dict[str, ThreadPoolExecutor] = {}
+_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Process-wide HTTP session (keep-alive connections are reused across claims)."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=EVIDENCE_HTTP_WORKERS)
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                s.headers["User-Agent"] = USER_AGENT
+                _session = s
+    return _session
+
+
+def _pool(name: str) -> ThreadPoolExecutor:
+    # sources and page fetches use separate pools: a source waiting on its
+    # page fetches never holds the threads those fetches need
+    if name not in _pools:
+        with _lock:
+            if name not in _pools:
+                _pools[name] = ThreadPoolExecutor(max_workers=EVIDENCE_HTTP_WORKERS,
+                                                  thread_name_prefix=f"evidence-{name}")
+    return _pools[name]
+
+
+def _remaining(deadline: float) -> float:
+    return max(0.0, deadline - time.monotonic())
 
-def get_wiki_evidence(query: str, topk: int = 3) -> List[Dict]:
-    out: List[Dict] = []
-    for title in wikipedia.search(query, results=topk):
-        try:
-            page = wikipedia.page(title, auto_suggest=False)
-            out.append({
-                "source": "wikipedia",
-                "title": title,
-                "url": page.url,
-                "snippet": (page.summary or "")[:600],
-            })
-        except Exception:
-            pass
-    return out
 
-def get_news_evidence(query: str, topk: int = 3) -> List[Dict]:
+def _get_json(url: str, params: Dict, deadline: float) -> Dict:
+    timeout = _remaining(deadline)
+    if timeout <= 0:
+        raise TimeoutError(url)
+    r = get_session().get(url, params=params, timeout=timeout)
+    r.raise_for_status()
+    return r.json()
+
+
+def wiki_search(query: str, topk: int, deadline: float) -> List[str]:
+    return cached(
+        "wiki_search", f"{normalize_key(query)}|{topk}",
+        lambda: _wiki_search(query, topk, deadline),
+        lambda: _wiki_search(query, topk, time.monotonic() + WIKI_DEADLINE_S),
+    )
+
+
+def _wiki_search(query: str, topk: int, deadline: float) -> List[str]:
+    data = _get_json(WIKI_API_URL, {
+        "action": "query", "list": "search", "srsearch": query, "srlimit": topk,
+        "srprop": "", "format": "json",
+    }, deadline)
+    return [hit["title"] for hit in data.get("query", {}).get("search", [])]
+
+
+def wiki_page(title: str, deadline: float, full: bool = False) -> Optional[Dict]:
+    """
+    Plain-text intro (or, with `full`, the whole text up to
+    WIKI_PAGE_MAX_CHARS) and URL of a page, or None if it does not exist.
+    """
+    return cached(
+        "wiki_page", f"{normalize_key(title)}|{'full' if full else 'intro'}",
+        lambda: _wiki_page(title, deadline, full),
+        lambda: _wiki_page(title, time.monotonic() + WIKI_DEADLINE_S, full),
+    )
+
+
+def _wiki_page(title: str, deadline: float, full: bool = False) -> Optional[Dict]:
+    params = {
+        "action": "query", "prop": "extracts|info", "explaintext": 1,
+        "inprop": "url", "redirects": 1, "titles": title, "format": "json",
+    }
+    if not full:
+        params["exintro"] = 1
+    data = _get_json(WIKI_API_URL, params, deadline)
+    for page in data.get("query", {}).get("pages", {}).values():
+        if "missing" not in page:
+            return {"title": page.get("title", title), "url": page.get("fullurl", ""),
+                    "text": (page.get("extract") or "")[:WIKI_PAGE_MAX_CHARS]}
+    return None
+
+
+def top_passages(query: str, pages: List[Dict], k: int, budget: int) -> List[Dict]:
+    """
+    The `k` passages of `pages` closest to `query`. Passages are taken
+    round-robin from the pages (earliest first) until `budget`, then the
+    query and all of them are embedded in one batch. Each result carries
+    its embedding and similarity so store_evidence does not embed it again.
+    """
+    from .passage_index import split_passages
+
+    per_page = [split_passages(p["text"]) for p in pages]
+    picked = []  # (page index, passage)
+    depth = 0
+    while len(picked) < budget and any(depth < len(ps) for ps in per_page):
+        for i, ps in enumerate(per_page):
+            if depth < len(ps) and len(picked) < budget:
+                picked.append((i, ps[depth]))
+        depth += 1
+    if not picked:
+        return []
+
+    X = embed_texts([query] + [t for _, t in picked])
+    sims = X[1:] @ X[0]
+    order = sims.argsort()[::-1][:k]
+    return [{
+        "title": pages[picked[j][0]]["title"],
+        "url": pages[picked[j][0]]["url"],
+        "snippet": picked[j][1],
+        "similarity": float(sims[j]),
+        "embedding": X[1 + j],
+    } for j in order]
+
+
+def get_wiki_evidence(query: str, topk: int = 3, deadline: Optional[float] = None) -> List[Dict]:
+    """
+    Search, then fetch the result pages concurrently. Pages that have not
+    arrived by `deadline` (time.monotonic()) are left out. In passages mode
+    (WIKI_EVIDENCE_MODE) the best passages of all pages are returned instead
+    of one summary per page.
+    """
+    full = WIKI_EVIDENCE_MODE == "passages"
+    deadline = deadline or time.monotonic() + WIKI_DEADLINE_S
+    try:
+        titles = wiki_search(query, topk, deadline)
+    except Exception as e:
+        metrics.incr("evidence", "wikipedia_errors")
+        print(f"Wikipedia search failed for {query!r}: {e}")
+        return []
+
+    futs = [_pool("fetch").submit(wiki_page, t, deadline, full) for t in titles]
+    wait(futs, timeout=_remaining(deadline))
+    pages: List[Dict] = []
+    for title, fut in zip(titles, futs):
+        if not fut.done():
+            metrics.incr("evidence", "wikipedia_timeouts")
+            continue
+        if fut.exception():
+            metrics.incr("evidence", "wikipedia_errors")
+            continue
+        page = fut.result()
+        if page:
+            pages.append({**page, "title": title})
+
+    if full:
+        return [{"source": "wikipedia", **p}
+                for p in top_passages(query, pages, WIKI_TOP_PASSAGES, EVIDENCE_EMBED_BUDGET)]
+    return [{
+        "source": "wikipedia",
+        "title": p["title"],
+        "url": p["url"],
+        "snippet": p["text"][:600],
+    } for p in pages]
+
+def get_news_evidence(query: str, topk: int = 3, deadline: Optional[float] = None) -> List[Dict]:
     if not NEWS_KEY:
         return []
+    deadline = deadline or time.monotonic() + NEWS_DEADLINE_S
     try:
-        r = requests.get(
-            "https://newsapi.org/v2/everything",
-            params={"q": query, "apiKey": NEWS_KEY, "pageSize": topk, "language": "en"},
-            timeout=15,
+        articles = cached(
+            "news", f"{normalize_key(query)}|{topk}",
+            lambda: news_search(query, topk, deadline),
+            lambda: news_search(query, topk, time.monotonic() + NEWS_DEADLINE_S),
         )
-        r.raise_for_status()
-        arts = r.json().get("articles", [])
-        return [{
-            "source": "newsapi",
-            "title": a.get("title") or "",
-            "url": a.get("url") or "",
-            "snippet": (a.get("description") or "")[:600],
-        } for a in arts]
-    except Exception:
+    except Exception as e:
+        metrics.incr("evidence", "newsapi_errors")
+        print(f"NewsAPI request failed for {query!r}: {e}")
+        return []
+    return [{
+        "source": "newsapi",
+        "title": a.get("title") or "",
+        "url": a.get("url") or "",
+        "snippet": (a.get("description") or "")[:600],
+    } for a in articles[:topk]]
+
+
+def news_search(query: str, topk: int, deadline: float) -> List[Dict]:
+    data = _get_json(NEWSAPI_URL, {"q": query, "apiKey": NEWS_KEY, "pageSize": topk, "language": "en"},
+                     deadline)
+    # only the fields used above, so cached entries stay small
+    return [{k: a.get(k) for k in ("title", "url", "description")} for a in data.get("articles", [])]
+
+
+def get_local_evidence(query: str, topk: int = 3, deadline: Optional[float] = None) -> List[Dict]:
+    """Nearest passages from the offline index; no network."""
+    from .passage_index import search
+    db = SessionLocal()
+    try:
+        hits = search(db, query, k=topk)
+    except Exception as e:
+        metrics.incr("evidence", "local_wiki_errors")
+        print(f"Local passage search failed for {query!r}: {e}")
         return []
+    finally:
+        db.close()
+    return [{
+        "source": "local_wiki",
+        "title": h["title"] or "",
+        "url": h["url"] or "",
+        "snippet": h["text"],
+    } for h in hits]
+
+
+# name -> (fetch function, results kept, per-source deadline in seconds)
+SOURCES = {
+    "wikipedia": (get_wiki_evidence, 3, lambda: WIKI_DEADLINE_S),
+    "local_wiki": (get_local_evidence, 3, lambda: LOCAL_WIKI_DEADLINE_S),
+    "newsapi": (get_news_evidence, 2, lambda: NEWS_DEADLINE_S),
+}
+
+
+def gather_evidence(query: str, sources: Optional[List[str]] = None, budget: Optional[float] = None) -> List[Dict]:
+    """
+    Run `sources` (default EVIDENCE_SOURCES) concurrently and return what
+    arrived within `budget` seconds (EVIDENCE_BUDGET_S), in SOURCES order.
+    """
+    sources = EVIDENCE_SOURCES if sources is None else sources
+    names = [n for n in SOURCES if n in sources]
+    start = time.monotonic()
+    overall = start + (EVIDENCE_BUDGET_S if budget is None else budget)
+    futs = {}
+    for name in names:
+        fn, topk, seconds = SOURCES[name]
+        deadline = min(overall, start + seconds())
+        futs[name] = _pool("source").submit(fn, query, topk, deadline=deadline)
+
+    wait(list(futs.values()), timeout=_remaining(overall) + _COLLECT_GRACE_S)
+    out: List[Dict] = []
+    for name, fut in futs.items():
+        if not fut.done():
+            metrics.incr("evidence", f"{name}_timeouts")
+            continue
+        if fut.exception():
+            metrics.incr("evidence", f"{name}_errors")
+            print(f"Evidence source {name} failed for {query!r}: {fut.exception()}")
+            continue
+        out.extend(fut.result())
+    return out
 
 def store_evidence(claim_id: int, items: List[Dict]) -> int:
     """Embeds claim + items, stores rows with cosine similarity; returns count."""
@@ -60,22 +309,27 @@ def store_evidence(claim_id: int, items: List[Dict]) -> int:
         q_vec = embed_texts([qtext])[0]  # normalized
 
         snippets = [(i.get("snippet") or "").strip() for i in items]
-        e_mat = embed_texts(snippets) if snippets else []
+        # passage evidence arrives already embedded (top_passages); embed the rest in one batch
+        todo = [i for i, itm in enumerate(items) if itm.get("embedding") is None]
+        e_mat = [itm.get("embedding") for itm in items]
+        if todo:
+            for i, vec in zip(todo, embed_texts([snippets[i] for i in todo])):
+                e_mat[i] = vec
 
-        created = 0
+        rows = []
         for i, itm in enumerate(items):
-            sim = cosine_sim(q_vec, e_mat[i]) if len(e_mat) > i else None
-            db.add(models.Evidence(
+            sim = cosine_sim(q_vec, e_mat[i])
+            rows.append(dict(
                 claim_id=claim_id,
                 source=itm.get("source"),
                 title=itm.get("title"),
                 url=itm.get("url"),
                 snippet=snippets[i],
                 similarity=sim,
-                embedding=e_mat[i].tolist() if len(e_mat) > i else None,
+                embedding=e_mat[i],
             ))
-            created += 1
+        bulk.insert_rows(db, models.Evidence, rows)
         db.commit()
-        return created
+        return len(rows)
     finally:
         db.close()
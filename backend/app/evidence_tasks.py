@@ -1,4 +1,8 @@
 # app/evidence_tasks.py
+from typing import List
+
+from celery import chord, group
+
 from .celery_app import celery_app
 from .db import SessionLocal
 from . import models
@@ -6,7 +10,8 @@ from . import models
 @celery_app.task(name="evidence.fetch_for_claim")
 def fetch_for_claim(claim_id: int):
     # Lazy import avoids circular import during app startup
-    from .evidence_retrieval import get_wiki_evidence, get_news_evidence, store_evidence
+    from .evidence_retrieval import gather_evidence, store_evidence
+    from .claim_index import reuse_evidence
 
     db = SessionLocal()
     try:
@@ -14,9 +19,55 @@ def fetch_for_claim(claim_id: int):
         if not claim:
             return {"ok": False, "reason": "no_claim"}
 
+        # already-checked near-identical claim? copy its evidence instead
+        reused = reuse_evidence(db, claim)
+        if reused:
+            return {"ok": True, **reused}
+
         query = claim.canonical_text or claim.claim_text
-        items = get_wiki_evidence(query, topk=3) + get_news_evidence(query, topk=2)
+        # all sources at once; whatever arrives within EVIDENCE_BUDGET_S is stored
+        items = gather_evidence(query)
         count = store_evidence(claim_id, items)
         return {"ok": True, "stored": count}
     finally:
         db.close()
+
+@celery_app.task(name="evidence.rerank_for_video")
+def rerank_for_video(video_id: int, rescore: bool = False):
+    # one batched cross-encoder pass over the evidence of all claims of the video
+    from .rerank import rerank_video
+
+    db = SessionLocal()
+    try:
+        return {"ok": True, **rerank_video(db, video_id, rescore=rescore)}
+    finally:
+        db.close()
+
+def video_check_workflow(video_id: int, claim_ids: List[int]):
+    """
+    Evidence for every claim in parallel, then (with RERANK on) one batched
+    rerank pass over the whole video, then verdicts. The chord body runs
+    once every fetch has finished, so verdicts find their evidence already
+    scored and the per-claim scoring in evidence_for_verdict is a fallback.
+    """
+    from .rerank import RERANK
+    from .verdict_tasks import generate_for_video
+
+    then = generate_for_video.si(video_id)
+    if RERANK:
+        then = rerank_for_video.si(video_id) | then
+    return chord(group(fetch_for_claim.si(cid) for cid in claim_ids), then)
+
+@celery_app.task(name="evidence.check_video")
+def check_video(video_id: int):
+    db = SessionLocal()
+    try:
+        claim_ids = [cid for (cid,) in db.query(models.Claim.id)
+                                         .filter(models.Claim.video_id == video_id)
+                                         .order_by(models.Claim.id)]
+    finally:
+        db.close()
+    if not claim_ids:
+        return {"ok": False, "reason": "no_claims"}
+    video_check_workflow(video_id, claim_ids).apply_async()
+    return {"ok": True, "claims": len(claim_ids)}
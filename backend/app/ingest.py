@@ -1,53 +1,233 @@
-import os, tempfile, subprocess, shutil, uuid, json
-from typing import Optional, Dict
-from .storage import upload_file
+import os, re, tempfile, subprocess, shutil, uuid, json, threading
+from typing import Callable, Optional, Dict, Tuple
+from urllib.parse import urlparse, parse_qs
+from .storage import upload_file, upload_stream
 
 AUDIO_CT = "audio/mpeg"
 
-def _run(cmd: list[str], capture_output=False) -> Optional[str]:
-    if capture_output:
-        result = subprocess.run(cmd, check=True, capture_output=True, text=True)
-        return result.stdout
-    subprocess.run(cmd, check=True)
-    return None
+# Stored format of ingested audio (always 16 kHz mono):
+#   mp3  - smallest, needs a full decode per transcription (default)
+#   flac - lossless, ~3-4x mp3 size, cheaper decode
+#   wav  - raw PCM s16le, ~2x flac size, no decode at all (asr.load_audio reads it directly)
+AUDIO_FORMAT = os.getenv("AUDIO_FORMAT", "mp3").lower()
+AUDIO_TYPES = {"mp3": "audio/mpeg", "flac": "audio/flac", "wav": "audio/wav"}
+if AUDIO_FORMAT not in AUDIO_TYPES:
+    raise ValueError(f"AUDIO_FORMAT must be one of {sorted(AUDIO_TYPES)}, got {AUDIO_FORMAT!r}")
+_FFMPEG_CODEC = {"mp3": ["-f", "mp3"], "flac": ["-f", "flac"], "wav": ["-f", "wav", "-c:a", "pcm_s16le"]}
+
+# Streaming ingest: yt-dlp stdout -> ffmpeg -> S3 multipart, no media on local disk
+INGEST_STREAMING = os.getenv("INGEST_STREAMING", "off").lower() == "on"
+
+# Largest accepted direct upload
+INGEST_MAX_UPLOAD_MB = float(os.getenv("INGEST_MAX_UPLOAD_MB", "500"))
+
+class UploadTooLarge(ValueError):
+    pass
+
+class _CappedReader:
+    """File wrapper that raises UploadTooLarge once more than `limit` bytes were read."""
+
+    def __init__(self, f, limit: int):
+        self.f = f
+        self.limit = limit
+        self.read_bytes = 0
+
+    def read(self, n: int = -1) -> bytes:
+        chunk = self.f.read(n)
+        self.read_bytes += len(chunk)
+        if self.read_bytes > self.limit:
+            raise UploadTooLarge(f"upload exceeds {self.limit} bytes")
+        return chunk
 
-def get_video_metadata(source_url: str) -> Dict:
-    """Extract video metadata using yt-dlp without downloading."""
+_YT_ID = re.compile(r"^[A-Za-z0-9_-]{11}$")
+
+def canonical_source_id(url: str) -> Optional[str]:
+    """
+    Stable id for the media behind `url`, e.g. "youtube:dQw4w9WgXcQ" for any
+    watch/short/embed/youtu.be form of a YouTube link. None if unknown.
+    """
     try:
-        output = _run(["yt-dlp", "--dump-json", "--no-download", source_url], capture_output=True)
-        metadata = json.loads(output)
-        return {
-            "title": metadata.get("title"),
-            "thumbnail_url": metadata.get("thumbnail"),
-            "duration": metadata.get("duration"),
-        }
-    except Exception as e:
-        print(f"Failed to extract metadata: {e}")
-        return {}
-
-def ytdlp_to_mp3(source_url: str) -> str:
-    """Download audio using yt-dlp and convert to mp3 with ffmpeg. Returns local mp3 path."""
+        u = urlparse(url.strip())
+    except Exception:
+        return None
+    host = (u.hostname or "").lower()
+    if host.startswith("www.") or host.startswith("m."):
+        host = host.split(".", 1)[1]
+    vid = None
+    if host == "youtu.be":
+        vid = u.path.lstrip("/").split("/")[0]
+    elif host in ("youtube.com", "music.youtube.com", "youtube-nocookie.com"):
+        if u.path == "/watch":
+            vid = (parse_qs(u.query).get("v") or [None])[0]
+        else:
+            parts = u.path.strip("/").split("/")
+            if len(parts) >= 2 and parts[0] in ("shorts", "embed", "live", "v"):
+                vid = parts[1]
+    if vid and _YT_ID.match(vid):
+        return f"youtube:{vid}"
+    return None
+
+def _metadata(info: Dict) -> Dict:
+    return {
+        "title": info.get("title"),
+        "thumbnail_url": info.get("thumbnail"),
+        "duration": info.get("duration"),
+    }
+
+def ytdlp_fetch_audio(
+    source_url: str,
+    on_metadata: Optional[Callable[[Dict], None]] = None,
+) -> Tuple[str, Dict]:
+    """
+    One yt-dlp run for metadata and audio: the URL is resolved once, the info
+    JSON is printed before the download starts (--dump-json --no-simulate),
+    and yt-dlp's own ffmpeg post-processor writes 16 kHz mono AUDIO_FORMAT.
+
+    Args:
+        on_metadata: Called with {"title", "thumbnail_url", "duration"} as soon
+            as the info JSON arrives, while the audio is still downloading
+
+    Returns:
+        (local audio path, metadata); the caller removes the file's directory
+    """
     tmpdir = tempfile.mkdtemp(prefix="ingest_")
     try:
-        out = os.path.join(tmpdir, "input.%(ext)s")
-        _run(["yt-dlp", "-f", "bestaudio/best", "-o", out, source_url])
-        # find downloaded file
-        files = [os.path.join(tmpdir, f) for f in os.listdir(tmpdir) if f.startswith("input.")]
-        if not files:
+        cmd = [
+            "yt-dlp", "-f", "bestaudio/best", "--no-playlist",
+            "--dump-json", "--no-simulate",
+            "-x", "--audio-format", AUDIO_FORMAT,
+            "--postprocessor-args", "ExtractAudio:-ac 1 -ar 16000",
+            "-o", os.path.join(tmpdir, "audio.%(ext)s"),
+            source_url,
+        ]
+        metadata: Dict = {}
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+        for line in proc.stdout:
+            if metadata or not line.lstrip().startswith("{"):
+                continue
+            try:
+                metadata = _metadata(json.loads(line))
+            except ValueError as e:
+                print(f"Failed to parse yt-dlp info JSON: {e}")
+                continue
+            if on_metadata:
+                try:
+                    on_metadata(metadata)
+                except Exception as e:
+                    print(f"Failed to save metadata: {e}")
+        if proc.wait() != 0:
+            raise subprocess.CalledProcessError(proc.returncode, cmd)
+
+        path = os.path.join(tmpdir, f"audio.{AUDIO_FORMAT}")
+        if not os.path.exists(path):
             raise RuntimeError("yt-dlp did not produce a file")
-        src = files[0]
-        mp3 = os.path.join(tmpdir, "audio.mp3")
-        _run(["ffmpeg", "-y", "-i", src, "-ac", "1", "-ar", "16000", mp3])
-        return mp3
+        return path, metadata
     except Exception:
         shutil.rmtree(tmpdir, ignore_errors=True)
         raise
 
-def upload_audio_from_url(video_id: int, url: str) -> str:
-    mp3 = ytdlp_to_mp3(url)
+def stream_audio_to_s3(
+    source_url: str,
+    key: str,
+    on_metadata: Optional[Callable[[Dict], None]] = None,
+) -> Dict:
+    """
+    Pipe yt-dlp (-o -) into ffmpeg (16 kHz mono AUDIO_FORMAT on stdout) and stream
+    ffmpeg's output into an S3 multipart upload. Nothing is written to local
+    disk; memory is bounded by two upload parts. The info JSON comes out of
+    the same yt-dlp run through --print-to-file on an inherited pipe.
+
+    Returns:
+        upload_stream() result: {"key", "size", "sha256", "parts"}
+    """
+    meta_r, meta_w = os.pipe()
+    ytdlp_cmd = [
+        "yt-dlp", "-f", "bestaudio/best", "--no-playlist", "--quiet", "--no-simulate",
+        "--print-to-file", "%()j", f"/dev/fd/{meta_w}",
+        "-o", "-", source_url,
+    ]
+    ffmpeg_cmd = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-i", "pipe:0", "-vn", "-ac", "1", "-ar", "16000", *_FFMPEG_CODEC[AUDIO_FORMAT], "pipe:1",
+    ]
+    def read_metadata():
+        with os.fdopen(meta_r, "r") as f:
+            for line in f:
+                if line.lstrip().startswith("{"):
+                    try:
+                        metadata = _metadata(json.loads(line))
+                        if on_metadata:
+                            on_metadata(metadata)
+                    except Exception as e:
+                        print(f"Failed to handle yt-dlp info JSON: {e}")
+                    break
+            for _ in f:  # drain so yt-dlp never blocks on the pipe
+                pass
+
+    ytdlp = ffmpeg = None
+    try:
+        try:
+            ytdlp = subprocess.Popen(ytdlp_cmd, stdout=subprocess.PIPE, pass_fds=(meta_w,))
+        finally:
+            os.close(meta_w)
+        reader = threading.Thread(target=read_metadata, daemon=True)
+        reader.start()
+        ffmpeg = subprocess.Popen(ffmpeg_cmd, stdin=ytdlp.stdout, stdout=subprocess.PIPE)
+        ytdlp.stdout.close()  # ffmpeg owns the read end; yt-dlp gets SIGPIPE if ffmpeg dies
+
+        result = upload_stream(key, ffmpeg.stdout, content_type=AUDIO_TYPES[AUDIO_FORMAT])
+        # exit codes are only known once the stream ends; a failure still fails the task
+        if ffmpeg.wait() != 0:
+            raise subprocess.CalledProcessError(ffmpeg.returncode, ffmpeg_cmd)
+        if ytdlp.wait() != 0:
+            raise subprocess.CalledProcessError(ytdlp.returncode, ytdlp_cmd)
+        reader.join(timeout=5)
+        if not result["size"]:
+            raise RuntimeError("yt-dlp/ffmpeg produced no audio")
+        return result
+    finally:
+        if ytdlp is None:
+            os.close(meta_r)
+        for proc in (ffmpeg, ytdlp):
+            if proc and proc.poll() is None:
+                proc.kill()
+                proc.wait()
+
+def upload_audio_from_url(
+    video_id: int,
+    url: str,
+    on_metadata: Optional[Callable[[Dict], None]] = None,
+) -> Tuple[str, str]:
+    """Download + convert + upload; returns (s3 key, sha256 of the uploaded audio)."""
+    from .transcript_cache import sha256_file
+
+    key = f"media/{video_id}.{AUDIO_FORMAT}"
+    if INGEST_STREAMING:
+        result = stream_audio_to_s3(url, key, on_metadata=on_metadata)
+        return key, result["sha256"]
+
+    local, _ = ytdlp_fetch_audio(url, on_metadata=on_metadata)
+    try:
+        sha = sha256_file(local)
+        upload_file(key, local, content_type=AUDIO_TYPES[AUDIO_FORMAT])
+    finally:
+        shutil.rmtree(os.path.dirname(local), ignore_errors=True)
+    return key, sha
+
+def save_upload_stream(video_id: int, fileobj, max_bytes: Optional[int] = None) -> Tuple[str, str]:
+    """
+    Stream an uploaded file object to S3 multipart in fixed-size parts.
+    Blocking: call from a worker thread. Raises UploadTooLarge past `max_bytes`
+    (the partial multipart upload is aborted).
+
+    Returns:
+        (s3 key, sha256 of the uploaded bytes)
+    """
+    if max_bytes is None:
+        max_bytes = int(INGEST_MAX_UPLOAD_MB * 1024 * 1024)
     key = f"media/{video_id}.mp3"
-    upload_file(key, mp3, content_type=AUDIO_CT)
-    return key
+    result = upload_stream(key, _CappedReader(fileobj, max_bytes), content_type=AUDIO_CT)
+    return key, result["sha256"]
 
 def save_upload_file(video_id: int, local_path: str) -> str:
     key = f"media/{video_id}.mp3"
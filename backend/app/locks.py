@@ -0,0 +1,23 @@
+# app/locks.py
+"""
+Cross-process file locks.
+
+Prefork children (and separate workers sharing a volume) coordinate
+one-time work such as downloads, decodes and model exports through an
+flock on a lock file next to the result.
+"""
+import fcntl
+import os
+from contextlib import contextmanager
+from typing import Iterator
+
+
+@contextmanager
+def file_lock(path: str, shared: bool = False) -> Iterator[int]:
+    """Hold an flock on `path` (created if missing) for the duration of the block."""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        yield fd
+    finally:
+        os.close(fd)  # releases the lock
@@ -65,6 +65,13 @@ def health_check():
     return {"ok": True, "service": "api"}
 
 
+@app.get("/metrics")
+def get_metrics():
+    """Pipeline counters (per process and across workers)."""
+    from .metrics import snapshot_all
+    return snapshot_all()
+
+
 # -----------------------------------------------------------
 # Celery task trigger example (optional)
 # -----------------------------------------------------------
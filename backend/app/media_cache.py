@@ -0,0 +1,124 @@
+# app/media_cache.py
+"""
+Worker-local disk cache of media objects from S3.
+
+ASR re-runs, two-pass refinement, retries after a lost worker
+(task_acks_late) and audio analysis all need the same `media/{id}.*`
+object. It is downloaded once per worker host into MEDIA_CACHE_DIR, keyed
+by S3 key + ETag (a rewritten object is fetched again), and read from
+there afterwards.
+
+The directory is shared by all prefork children. Each entry has a lock
+file: the first child to miss downloads while holding it exclusively
+(others wait and then hit), readers hold it shared, and eviction only
+removes entries it can lock exclusively without waiting, so a file is
+never removed while it is being read. Entries opened in the last
+_RECENT_S are not evicted either: open_media() drops its exclusive lock
+for an instant when it converts it to a shared one. Size is bounded by
+MEDIA_CACHE_MAX_MB, least recently used first.
+"""
+import fcntl
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from . import metrics
+from .cache import digest
+from .locks import file_lock
+
+MEDIA_CACHE = os.getenv("MEDIA_CACHE", "on").lower() != "off"
+MEDIA_CACHE_DIR = os.getenv("MEDIA_CACHE_DIR", os.path.join(tempfile.gettempdir(), "adveritas_media"))
+MEDIA_CACHE_MAX_MB = float(os.getenv("MEDIA_CACHE_MAX_MB", "8192"))
+
+# lock files of evicted entries are removed once this old
+_LOCK_TTL_S = 24 * 3600
+# entries opened this recently are kept by evict()
+_RECENT_S = 60
+
+
+def _path(s3_key: str, etag: str) -> str:
+    ext = os.path.splitext(s3_key)[1]
+    return os.path.join(MEDIA_CACHE_DIR, f"{digest(s3_key, etag)}{ext}")
+
+
+@contextmanager
+def open_media(s3_key: str, etag: Optional[str] = None) -> Iterator[str]:
+    """
+    Local path of `s3_key`, valid until the block exits. Pass `etag` if the
+    caller already has it, to save a HEAD request.
+    """
+    from .storage import download_file, head_etag
+
+    if not MEDIA_CACHE:
+        with tempfile.TemporaryDirectory() as td:
+            local = os.path.join(td, os.path.basename(s3_key))
+            download_file(s3_key, local)
+            yield local
+        return
+
+    os.makedirs(MEDIA_CACHE_DIR, exist_ok=True)
+    path = _path(s3_key, etag or head_etag(s3_key))
+    with file_lock(path + ".lock") as fd:
+        if os.path.exists(path):
+            metrics.incr("media_cache", "hits")
+        else:
+            metrics.incr("media_cache", "misses")
+            with tempfile.TemporaryDirectory(dir=MEDIA_CACHE_DIR) as td:
+                local = os.path.join(td, os.path.basename(s3_key))
+                download_file(s3_key, local)
+                metrics.incr("media_cache", "bytes_downloaded", os.path.getsize(local))
+                os.replace(local, path)
+        os.utime(path)  # LRU order for evict(), and keeps it through the flock conversion
+        os.utime(path + ".lock")
+        fcntl.flock(fd, fcntl.LOCK_SH)  # let other readers in while this one reads
+        evict(keep=path)
+        yield path
+
+
+def evict(max_mb: float = None, keep: Optional[str] = None) -> int:
+    """Remove least recently used entries beyond the size bound; returns entries removed."""
+    max_bytes = (MEDIA_CACHE_MAX_MB if max_mb is None else max_mb) * 1024 * 1024
+    try:
+        entries = [e for e in os.scandir(MEDIA_CACHE_DIR) if e.is_file() and not e.name.endswith(".lock")]
+    except FileNotFoundError:
+        return 0
+    stats = sorted((e.stat().st_mtime, e.stat().st_size, e.path) for e in entries)
+    total = sum(size for _, size, _ in stats)
+    removed = 0
+    for _, size, path in stats:
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        fd = os.open(path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            continue  # being read or written by another process
+        try:
+            if os.stat(path).st_mtime > time.time() - _RECENT_S:
+                continue  # just opened: its reader may be between LOCK_EX and LOCK_SH
+            os.remove(path)
+            total -= size
+            removed += 1
+        except FileNotFoundError:
+            pass
+        finally:
+            os.close(fd)
+    _remove_stale_locks()
+    metrics.incr("media_cache", "evicted", removed)
+    return removed
+
+
+def _remove_stale_locks():
+    cutoff = time.time() - _LOCK_TTL_S
+    for e in os.scandir(MEDIA_CACHE_DIR):
+        if e.name.endswith(".lock") and not os.path.exists(e.path[:-5]):
+            try:
+                if e.stat().st_mtime < cutoff:
+                    os.remove(e.path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,56 @@
+# app/metrics.py
+"""
+Tiny counter metrics.
+
+Counters are kept per process and, best effort, in a Redis hash
+`metrics:<name>` so every API/worker process adds to the same totals.
+Read them with snapshot() or GET /metrics.
+"""
+from collections import Counter, defaultdict
+from typing import Dict
+
+from .cache import redis_if_up, mark_redis_down
+
+_local: Dict[str, Counter] = defaultdict(Counter)
+
+
+def incr(name: str, field: str, n: int = 1):
+    """Add `n` to counter `field` of metric `name`."""
+    if not n:
+        return
+    _local[name][field] += n
+    r = redis_if_up()
+    if r is None:
+        return
+    try:
+        r.hincrby(f"metrics:{name}", field, n)
+    except Exception as e:
+        mark_redis_down(e)
+
+
+def snapshot(name: str) -> Dict[str, Dict[str, int]]:
+    """Counters of `name` for this process and across all processes (if Redis is reachable)."""
+    out = {"process": dict(_local.get(name, {}))}
+    r = redis_if_up()
+    if r is None:
+        return out
+    try:
+        raw = r.hgetall(f"metrics:{name}")
+        out["global"] = {
+            (k.decode() if isinstance(k, bytes) else k): int(v) for k, v in raw.items()
+        }
+    except Exception as e:
+        mark_redis_down(e)
+    return out
+
+
+def snapshot_all() -> Dict[str, Dict[str, Dict[str, int]]]:
+    names = set(_local)
+    r = redis_if_up()
+    try:
+        for key in (r.scan_iter("metrics:*") if r is not None else []):
+            key = key.decode() if isinstance(key, bytes) else key
+            names.add(key.split(":", 1)[1])
+    except Exception as e:
+        mark_redis_down(e)
+    return {name: snapshot(name) for name in sorted(names)}
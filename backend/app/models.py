@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Float, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from pgvector.sqlalchemy import Vector
@@ -9,12 +9,21 @@ class Video(Base):
     __tablename__ = "videos"
     id = Column(Integer, primary_key=True)
     source_url = Column(String)
+    source_id = Column(String, index=True)  # canonical media id, e.g. "youtube:dQw4w9WgXcQ"
     title = Column(String)
     thumbnail_url = Column(String)  # YouTube thumbnail URL
     duration = Column(Float)
+    audio_processed = Column(Float)  # seconds of audio transcribed so far
     status = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    @property
+    def progress(self):
+        """Fraction of the audio transcribed, when the duration is known."""
+        if not self.duration or self.audio_processed is None:
+            return None
+        return max(0.0, min(1.0, self.audio_processed / self.duration))
+
     segments = relationship(
         "Segment",
         back_populates="video",
@@ -53,8 +62,14 @@ class Claim(Base):
     segment_id = Column(Integer, ForeignKey("segments.id", ondelete="SET NULL"), index=True, nullable=True)
     claim_text = Column(Text, nullable=False)
     canonical_text = Column(Text)
+    embedding = Column(Vector(384))  # cross-video claim index (HNSW, cosine)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    # Provenance when evidence/verdict were reused from an already-checked claim
+    reused_from_claim_id = Column(Integer, ForeignKey("claims.id", ondelete="SET NULL"), index=True, nullable=True)
+    reuse_distance = Column(Float)
+    reused_at = Column(DateTime)
+
     # MISSING BEFORE: define the 'video' side used by Video.claims
     video = relationship("Video", back_populates="claims")
     # Match Segment.claims above (only if you keep segment_id)
@@ -62,6 +77,35 @@ class Claim(Base):
 
     evidence = relationship("Evidence", back_populates="claim", cascade="all, delete-orphan", passive_deletes=True)
     verdicts = relationship("Verdict", back_populates="claim", cascade="all, delete-orphan", passive_deletes=True)
+    occurrences = relationship(
+        "ClaimOccurrence",
+        back_populates="claim",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        order_by="ClaimOccurrence.t_start",
+    )
+
+# ---------- ClaimOccurrence ----------
+# Every place a (near-)duplicate claim was said; the Claim row holds the canonical text.
+class ClaimOccurrence(Base):
+    __tablename__ = "claim_occurrences"
+    id = Column(Integer, primary_key=True)
+    claim_id = Column(Integer, ForeignKey("claims.id", ondelete="CASCADE"), index=True, nullable=False)
+    segment_id = Column(Integer, ForeignKey("segments.id", ondelete="SET NULL"), index=True, nullable=True)
+    t_start = Column(Float)
+    t_end = Column(Float)
+    text = Column(Text)
+    similarity = Column(Float)  # cosine to the canonical claim
+
+    claim = relationship("Claim", back_populates="occurrences")
+
+Index(
+    "ix_claims_embedding_hnsw",
+    Claim.embedding,
+    postgresql_using="hnsw",
+    postgresql_with={"m": 16, "ef_construction": 64},
+    postgresql_ops={"embedding": "vector_cosine_ops"},
+)
 
 # ---------- Evidence ----------
 class Evidence(Base):
@@ -73,7 +117,9 @@ class Evidence(Base):
     url = Column(String)
     snippet = Column(Text)
     similarity = Column(Float)
+    rerank_score = Column(Float)  # cross-encoder relevance to the claim (app.rerank), None = not scored
     embedding = Column(Vector(384))
+    reused_from_id = Column(Integer, ForeignKey("evidence.id", ondelete="SET NULL"), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     claim = relationship("Claim", back_populates="evidence")
@@ -87,6 +133,47 @@ class Verdict(Base):
     confidence = Column(Float)
     rationale = Column(Text)
     sources = Column(Text)
+    reused_from_id = Column(Integer, ForeignKey("verdicts.id", ondelete="SET NULL"), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     claim = relationship("Claim", back_populates="verdicts")
+
+# ---------- TranscriptCache ----------
+# Finished transcripts keyed by source id and audio content hash, per ASR config
+class TranscriptCache(Base):
+    __tablename__ = "transcript_cache"
+    id = Column(Integer, primary_key=True)
+    source_id = Column(String, index=True)        # e.g. "youtube:dQw4w9WgXcQ"
+    audio_sha256 = Column(String, index=True)
+    asr_config = Column(String, index=True, nullable=False)  # digest of model/compute type/VAD settings
+    title = Column(String)
+    thumbnail_url = Column(String)
+    duration = Column(Float)
+    segments = Column(Text, nullable=False)       # JSON [[start, end, text], ...]
+    n_segments = Column(Integer)
+    size_bytes = Column(Integer)
+    hits = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+# ---------- Passage ----------
+# Offline evidence corpus (e.g. a Wikipedia dump) split into passages;
+# built with `python -m app.passage_index build`
+class Passage(Base):
+    __tablename__ = "passages"
+    id = Column(Integer, primary_key=True)
+    doc_id = Column(String, index=True, nullable=False)
+    chunk = Column(Integer, nullable=False)   # position of the passage in its document
+    title = Column(String)
+    url = Column(String)
+    text = Column(Text, nullable=False)
+    embedding = Column(Vector(384))
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+Index(
+    "ix_passages_embedding_hnsw",
+    Passage.embedding,
+    postgresql_using="hnsw",
+    postgresql_with={"m": 16, "ef_construction": 64},
+    postgresql_ops={"embedding": "vector_cosine_ops"},
+)
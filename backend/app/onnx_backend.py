@@ -0,0 +1,181 @@
+# app/onnx_backend.py
+"""
+ONNX Runtime inference backend (CPU, dynamic int8).
+
+Exports the HF claim classifier and the sentence embedder to ONNX once,
+quantizes the weights to int8 and caches both files under ONNX_CACHE_DIR.
+Selected with INFERENCE_BACKEND=onnx; needs the optional `onnx` extra
+(optimum[onnxruntime]).
+
+Parity against the PyTorch models:
+    python -m app.onnx_backend --check
+"""
+import os
+import re
+import sys
+import numpy as np
+from typing import List, Optional
+
+from .locks import file_lock
+
+ONNX_CACHE_DIR = os.getenv("ONNX_CACHE_DIR", os.path.expanduser("~/.cache/adveritas/onnx"))
+ONNX_THREADS   = int(os.getenv("ONNX_THREADS", "0"))  # 0 = let onnxruntime decide
+# Max |torch - onnx| allowed by the parity check
+ONNX_CLAIM_TOL = float(os.getenv("ONNX_CLAIM_TOL", "0.05"))
+ONNX_SIM_TOL   = float(os.getenv("ONNX_SIM_TOL", "0.02"))
+
+QUANTIZED_FILE = "model_quantized.onnx"
+
+PARITY_SENTENCES = [
+    "The Eiffel Tower is 330 metres tall.",
+    "Unemployment fell to 3.5 percent in 2019.",
+    "I honestly think this is the best movie ever made.",
+    "Make sure you drink plenty of water every day.",
+    "Vaccines cause autism in children.",
+    "The Great Wall of China is visible from space.",
+]
+
+
+def _export_dir(model_name: str, task: str) -> str:
+    safe = re.sub(r"[^A-Za-z0-9_.-]+", "__", model_name)
+    return os.path.join(ONNX_CACHE_DIR, task, safe)
+
+
+def _session_options():
+    import onnxruntime as ort
+    opts = ort.SessionOptions()
+    if ONNX_THREADS:
+        opts.intra_op_num_threads = ONNX_THREADS
+    return opts
+
+
+def export_quantized(model_name: str, task: str) -> str:
+    """
+    Export `model_name` to ONNX and apply dynamic int8 quantization.
+
+    Args:
+        model_name: HF hub id or local path
+        task: "sequence-classification" or "feature-extraction"
+
+    Returns:
+        Directory holding the quantized model and tokenizer (cached on disk)
+    """
+    out_dir = _export_dir(model_name, task)
+    if os.path.exists(os.path.join(out_dir, QUANTIZED_FILE)):
+        return out_dir
+
+    from transformers import AutoTokenizer
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    from optimum.onnxruntime import ORTModelForSequenceClassification, ORTModelForFeatureExtraction
+
+    os.makedirs(os.path.dirname(out_dir), exist_ok=True)
+    # Worker processes starting together export once; the others wait and reuse it
+    with file_lock(out_dir + ".lock"):
+        if os.path.exists(os.path.join(out_dir, QUANTIZED_FILE)):
+            return out_dir
+        cls = ORTModelForSequenceClassification if task == "sequence-classification" else ORTModelForFeatureExtraction
+        print(f"Exporting {model_name} ({task}) to ONNX in {out_dir}")
+        os.makedirs(out_dir, exist_ok=True)
+        cls.from_pretrained(model_name, export=True).save_pretrained(out_dir)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(out_dir)
+
+        # Write to a temp name first so a crashed export is never picked up as cached
+        tmp = os.path.join(out_dir, QUANTIZED_FILE + ".tmp")
+        quantize_dynamic(os.path.join(out_dir, "model.onnx"), tmp, weight_type=QuantType.QInt8)
+        os.replace(tmp, os.path.join(out_dir, QUANTIZED_FILE))
+    return out_dir
+
+
+def load_zero_shot_pipeline(model_name: str):
+    """Zero-shot-classification pipeline running on the int8 ONNX export of `model_name`."""
+    from transformers import AutoTokenizer
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+    from optimum.pipelines import pipeline
+
+    path = export_quantized(model_name, "sequence-classification")
+    model = ORTModelForSequenceClassification.from_pretrained(
+        path, file_name=QUANTIZED_FILE, session_options=_session_options()
+    )
+    tok = AutoTokenizer.from_pretrained(path)
+    return pipeline("zero-shot-classification", model=model, tokenizer=tok, accelerator="ort")
+
+
+class OnnxSentenceEncoder:
+    """
+    Drop-in for SentenceTransformer.encode on the int8 ONNX export.
+
+    Uses mean pooling over the attention mask, which is what the
+    all-MiniLM / all-mpnet family of sentence-transformers models use.
+    """
+
+    def __init__(self, model_name: str, max_length: int = 256):
+        from transformers import AutoTokenizer
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+
+        path = export_quantized(model_name, "feature-extraction")
+        self.model = ORTModelForFeatureExtraction.from_pretrained(
+            path, file_name=QUANTIZED_FILE, session_options=_session_options()
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(path)
+        self.max_length = max_length
+
+    def encode(self, texts: List[str], batch_size: int = 32, normalize_embeddings: bool = False, **_) -> np.ndarray:
+        if isinstance(texts, str):
+            texts = [texts]
+        out = []
+        for i in range(0, len(texts), batch_size):
+            enc = self.tokenizer(
+                texts[i:i + batch_size], padding=True, truncation=True,
+                max_length=self.max_length, return_tensors="np",
+            )
+            hidden = self.model(**enc).last_hidden_state
+            hidden = np.asarray(hidden, dtype=np.float32)
+            mask = enc["attention_mask"][..., None].astype(np.float32)
+            emb = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if normalize_embeddings:
+                emb /= np.clip(np.linalg.norm(emb, axis=1, keepdims=True), 1e-12, None)
+            out.append(emb)
+        if not out:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.concatenate(out, axis=0)
+
+
+def parity_check(sentences: Optional[List[str]] = None) -> dict:
+    """
+    Compare ONNX int8 outputs against the PyTorch models on `sentences`.
+
+    Returns:
+        Max absolute deviations and whether they are within ONNX_CLAIM_TOL / ONNX_SIM_TOL
+    """
+    from transformers import pipeline
+    from sentence_transformers import SentenceTransformer
+    from .claims_extract import LABELS, _CLAIM_MODEL, _claim_prob
+    from .embeddings import _NAME as EMBED_MODEL
+
+    sentences = sentences or PARITY_SENTENCES
+
+    torch_zs = pipeline("zero-shot-classification", model=_CLAIM_MODEL)
+    onnx_zs = load_zero_shot_pipeline(_CLAIM_MODEL)
+    p_torch = np.array([_claim_prob(o) for o in torch_zs(sentences, LABELS, multi_label=False)])
+    p_onnx = np.array([_claim_prob(o) for o in onnx_zs(sentences, LABELS, multi_label=False)])
+    claim_dev = float(np.max(np.abs(p_torch - p_onnx)))
+
+    e_torch = np.asarray(SentenceTransformer(EMBED_MODEL).encode(sentences, normalize_embeddings=True))
+    e_onnx = OnnxSentenceEncoder(EMBED_MODEL).encode(sentences, normalize_embeddings=True)
+    # compare the pairwise cosine matrices, i.e. the similarity scores we store
+    sim_dev = float(np.max(np.abs(e_torch @ e_torch.T - e_onnx @ e_onnx.T)))
+
+    return {
+        "claim_max_abs_diff": claim_dev,
+        "similarity_max_abs_diff": sim_dev,
+        "claim_ok": claim_dev <= ONNX_CLAIM_TOL,
+        "similarity_ok": sim_dev <= ONNX_SIM_TOL,
+    }
+
+
+if __name__ == "__main__":
+    if "--check" in sys.argv:
+        res = parity_check()
+        print(res)
+        sys.exit(0 if res["claim_ok"] and res["similarity_ok"] else 1)
+    print("usage: python -m app.onnx_backend --check")
@@ -0,0 +1,213 @@
+# app/passage_index.py
+"""
+Offline passage index: a local evidence source that needs no network.
+
+A corpus is split into overlapping passages of PASSAGE_WORDS words,
+embedded with the claim embedder and stored in `passages` (pgvector HNSW,
+cosine). Claims are then answered by an ANN query in milliseconds.
+
+Corpus format is JSONL (optionally .gz/.bz2), one document per line with
+"title", "text" and optionally "id" and "url". For Wikipedia, convert the
+pages-articles dump with WikiExtractor (`wikiextractor --json`), whose
+output is exactly that.
+
+    python -m app.passage_index build wiki.jsonl.bz2 --workers 4
+    python -m app.passage_index search "The Eiffel Tower is in Berlin"
+
+Builds are resumable: each batch of documents is committed with all of its
+passages, and documents already in the table are skipped, so an
+interrupted build is simply run again. With --workers N, embedding runs in
+N processes while the parent reads, chunks and writes.
+"""
+import argparse
+import bz2
+import gzip
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from . import models, bulk
+from .embeddings import embed_texts
+
+PASSAGE_WORDS = int(os.getenv("PASSAGE_WORDS", "120"))
+PASSAGE_OVERLAP = int(os.getenv("PASSAGE_OVERLAP", "30"))
+# Passages farther than this (cosine distance) from the claim are not evidence
+PASSAGE_MAX_DISTANCE = float(os.getenv("PASSAGE_MAX_DISTANCE", "0.6"))
+PASSAGE_EF_SEARCH = int(os.getenv("PASSAGE_EF_SEARCH", "40"))
+
+
+def split_passages(text: str, words: Optional[int] = None, overlap: Optional[int] = None) -> List[str]:
+    """Overlapping windows of `words` words (the last window may be shorter)."""
+    words = words or PASSAGE_WORDS
+    overlap = PASSAGE_OVERLAP if overlap is None else overlap
+    toks = (text or "").split()
+    if not toks:
+        return []
+    step = max(1, words - overlap)
+    out = []
+    for start in range(0, len(toks), step):
+        out.append(" ".join(toks[start:start + words]))
+        if start + words >= len(toks):
+            break
+    return out
+
+
+def _open(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def iter_corpus(path: str) -> Iterator[Dict]:
+    """Documents of a JSONL corpus as {"doc_id", "title", "url", "text"}; blank or bad lines are skipped."""
+    with _open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not rec.get("text"):
+                continue
+            doc_id = str(rec.get("id") or rec.get("url") or rec.get("title"))
+            yield {"doc_id": doc_id, "title": rec.get("title"), "url": rec.get("url"), "text": rec["text"]}
+
+
+def _batches(items: Iterable, n: int) -> Iterator[List]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= n:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _embed_rows(rows: List[Dict]) -> List[Dict]:
+    vecs = embed_texts([r["text"] for r in rows])
+    for r, v in zip(rows, vecs):
+        r["embedding"] = v
+    return rows
+
+
+def build(db: Session, path: str, workers: int = 1, batch_docs: int = 64,
+          limit: Optional[int] = None, log_every: int = 1000) -> Dict[str, int]:
+    """
+    Add the documents of `path` that are not indexed yet.
+
+    Returns:
+        {"docs", "skipped", "passages"}
+    """
+    stats = {"docs": 0, "skipped": 0, "passages": 0}
+    docs = iter_corpus(path)
+    if limit is not None:
+        docs = itertools.islice(docs, limit)
+
+    def pending_rows() -> Iterator[List[Dict]]:
+        for batch in _batches(docs, batch_docs):
+            ids = [d["doc_id"] for d in batch]
+            done = {r[0] for r in db.query(models.Passage.doc_id)
+                                     .filter(models.Passage.doc_id.in_(ids)).distinct()}
+            stats["skipped"] += len(done)
+            rows = [
+                {"doc_id": d["doc_id"], "chunk": i, "title": d["title"], "url": d["url"], "text": t}
+                for d in batch if d["doc_id"] not in done
+                for i, t in enumerate(split_passages(d["text"]))
+            ]
+            if rows:
+                yield rows
+
+    def write(rows: List[Dict]):
+        # one commit per document batch: an interrupted build never leaves a partial document
+        bulk.insert_rows(db, models.Passage, rows)
+        db.commit()
+        before = stats["docs"]
+        stats["docs"] += len({r["doc_id"] for r in rows})
+        stats["passages"] += len(rows)
+        if log_every and stats["docs"] // log_every > before // log_every:
+            print(f"passage index: {stats['docs']} docs, {stats['passages']} passages, "
+                  f"{stats['skipped']} skipped")
+
+    if workers <= 1:
+        for rows in pending_rows():
+            write(_embed_rows(rows))
+        return stats
+
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    # fork: children inherit the (not yet loaded) embedder config; at most
+    # 2 batches per worker in flight so memory stays bounded on huge dumps
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork")) as pool:
+        inflight = deque()
+        for rows in pending_rows():
+            inflight.append(pool.submit(_embed_rows, rows))
+            if len(inflight) >= 2 * workers:
+                write(inflight.popleft().result())
+        while inflight:
+            write(inflight.popleft().result())
+    return stats
+
+
+def search(db: Session, query: str, k: int = 3, max_distance: Optional[float] = None) -> List[Dict]:
+    """Nearest passages to `query` within `max_distance`, closest first."""
+    max_distance = PASSAGE_MAX_DISTANCE if max_distance is None else max_distance
+    vec = embed_texts([query])[0].tolist()
+    if db.bind.dialect.name == "postgresql":
+        db.execute(text(f"SET LOCAL hnsw.ef_search = {int(max(PASSAGE_EF_SEARCH, k))}"))
+    dist = models.Passage.embedding.cosine_distance(vec)
+    # plain ORDER BY distance LIMIT k so the HNSW index is used; filter afterwards
+    rows = (db.query(models.Passage, dist.label("distance"))
+              .order_by(dist)
+              .limit(k)
+              .all())
+    return [
+        {"doc_id": p.doc_id, "chunk": p.chunk, "title": p.title, "url": p.url, "text": p.text,
+         "distance": float(d)}
+        for p, d in rows if d is not None and d <= max_distance
+    ]
+
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="index a JSONL corpus (resumable)")
+    b.add_argument("corpus")
+    b.add_argument("--workers", type=int, default=1)
+    b.add_argument("--batch-docs", type=int, default=64)
+    b.add_argument("--limit", type=int, default=None, help="only the first N documents")
+    s = sub.add_parser("search", help="query the index")
+    s.add_argument("query")
+    s.add_argument("-k", type=int, default=5)
+    args = ap.parse_args(argv)
+
+    from .db import SessionLocal
+    db = SessionLocal()
+    try:
+        if args.cmd == "build":
+            t0 = time.perf_counter()
+            stats = build(db, args.corpus, workers=args.workers, batch_docs=args.batch_docs, limit=args.limit)
+            print(f"{stats} in {time.perf_counter() - t0:.1f}s")
+        else:
+            t0 = time.perf_counter()
+            hits = search(db, args.query, k=args.k, max_distance=2.0)
+            print(f"{len(hits)} passages in {(time.perf_counter() - t0) * 1000:.1f} ms")
+            for h in hits:
+                print(f"{h['distance']:.3f}  {h['title']} [{h['chunk']}]  {h['text'][:160]}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,109 @@
+# app/refine.py
+"""
+Second pass of two-pass ASR (ASR_TWO_PASS=on).
+
+The preview transcript from ASR_PREVIEW_MODEL is replaced by the
+WHISPER_MODEL transcript in one transaction. Claims extracted from the
+preview survive when their sentence is still in the refined transcript:
+they are re-pointed at the new segment (keeping their evidence and
+verdicts) instead of being deleted and extracted again. Only sentences that
+are new in the refined transcript go through claim extraction.
+"""
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from . import models, bulk
+from .asr import SegmentRow
+from .claims_extract import sentence_split
+
+
+def sentence_key(sentence: str) -> str:
+    """Comparison key that ignores case, spacing and punctuation (models differ most there)."""
+    return " ".join(re.findall(r"\w+", (sentence or "").casefold()))
+
+
+def _closest(segs: List[SegmentRow], t: float) -> SegmentRow:
+    return min(segs, key=lambda s: abs((s.t_start or 0.0) - (t or 0.0)))
+
+
+def replace_transcript(db: Session, video_id: int, segments: List[Tuple[float, float, str]]) -> dict:
+    """
+    Swap the video's segments for `segments`, keeping claims whose sentence is unchanged.
+
+    Does not commit. Returns:
+        {"segments", "kept_claims", "dropped_claims", "new_segments": [SegmentRow],
+         "covered": set of sentence keys already represented by kept claims}
+    """
+    old_ids = [sid for (sid,) in db.query(models.Segment.id).filter(models.Segment.video_id == video_id)]
+    old_start = dict(db.query(models.Segment.id, models.Segment.t_start).filter(models.Segment.id.in_(old_ids))) if old_ids else {}
+
+    ids = bulk.insert_rows(db, models.Segment, [
+        {"video_id": video_id, "t_start": s, "t_end": e, "text": t} for s, e, t in segments
+    ], return_ids=True)
+    new_segs = [SegmentRow(i, s, e, t) for i, (s, e, t) in zip(ids, segments)]
+
+    by_key: Dict[str, List[SegmentRow]] = defaultdict(list)
+    for seg in new_segs:
+        for sent in sentence_split(seg.text):
+            by_key[sentence_key(sent)].append(seg)
+
+    kept, dropped = 0, 0
+    covered: Set[str] = set()
+    claims = db.query(models.Claim).filter(models.Claim.video_id == video_id).all()
+    for claim in claims:
+        for occ in list(claim.occurrences):
+            matches = by_key.get(sentence_key(occ.text))
+            if matches:
+                seg = _closest(matches, occ.t_start)
+                occ.segment_id, occ.t_start, occ.t_end = seg.id, seg.t_start, seg.t_end
+                covered.add(sentence_key(occ.text))
+            else:
+                claim.occurrences.remove(occ)
+
+        matches = by_key.get(sentence_key(claim.claim_text))
+        if matches:
+            claim.segment_id = _closest(matches, old_start.get(claim.segment_id)).id
+            covered.add(sentence_key(claim.claim_text))
+        elif claim.occurrences:
+            # the canonical wording changed but a repeat of it survived
+            claim.segment_id = claim.occurrences[0].segment_id
+        else:
+            db.delete(claim)
+            dropped += 1
+            continue
+        kept += 1
+
+    db.flush()
+    if old_ids:
+        db.query(models.Segment).filter(models.Segment.id.in_(old_ids)).delete(synchronize_session=False)
+
+    return {
+        "segments": len(new_segs),
+        "kept_claims": kept,
+        "dropped_claims": dropped,
+        "new_segments": new_segs,
+        "covered": covered,
+    }
+
+
+def extract_new_claims(db: Session, video_id: int, new_segments: List[SegmentRow], covered: Set[str]) -> dict:
+    """
+    Run claim extraction over the refined segments, skipping sentences in
+    `covered`. New claims dedup against the kept ones. Does not commit.
+    """
+    from .claim_tasks import ClaimWriter
+    from .claims_extract import extract_claims_for_segments
+
+    stats = Counter()
+    cand = extract_claims_for_segments([(s.id, s.text) for s in new_segments], stats=stats)
+    cand = [c for c in cand if sentence_key(c[1]) not in covered]
+    stats["kept_from_preview"] = len(covered)
+
+    writer = ClaimWriter(video_id)
+    writer.seed(db.query(models.Claim).filter(models.Claim.video_id == video_id).all())
+    writer.add(db, cand, {s.id: s for s in new_segments})
+    stats["collapsed"] += writer.mentions - writer.created
+    return {"created": writer.created, "cascade": dict(stats)}
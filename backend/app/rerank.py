@@ -0,0 +1,99 @@
+# app/rerank.py
+"""
+Cross-encoder reranking of evidence.
+
+The bi-encoder cosine stored as Evidence.similarity compares the claim and
+a snippet embedded separately. A cross-encoder reads each (claim, snippet)
+pair together and is a much better relevance signal, at the cost of one
+forward pass per pair. Pairs of all claims of a video are scored together
+in RERANK_BATCH_SIZE batches, and the score is stored next to similarity
+as Evidence.rerank_score.
+
+With RERANK=on, verdicts are generated from the RERANK_TOPK best evidence
+rows by rerank score instead of the top 10 by similarity: a shorter prompt
+with better snippets. evidence.check_video runs the rerank pass for a video
+between evidence fetching and verdicts.
+"""
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from . import models, metrics
+
+RERANK = os.getenv("RERANK", "off").lower() == "on"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "32"))
+RERANK_MAX_LENGTH = int(os.getenv("RERANK_MAX_LENGTH", "256"))  # tokens per pair; snippets are short
+RERANK_TOPK = int(os.getenv("RERANK_TOPK", "3"))
+# Evidence rows sent to the verdict model without reranking (by similarity)
+VERDICT_EVIDENCE_LIMIT = 10
+
+_model = None
+
+
+def get_model():
+    global _model
+    if _model is None:
+        from sentence_transformers import CrossEncoder
+        _model = CrossEncoder(RERANK_MODEL, max_length=RERANK_MAX_LENGTH)
+    return _model
+
+
+def score_pairs(pairs: Sequence[Tuple[str, str]], batch_size: Optional[int] = None) -> np.ndarray:
+    """Relevance in [0, 1] of each (claim, snippet) pair."""
+    if not pairs:
+        return np.zeros(0, dtype=np.float32)
+    # single-label cross-encoders apply a sigmoid by default
+    scores = get_model().predict(list(pairs), batch_size=batch_size or RERANK_BATCH_SIZE,
+                                 show_progress_bar=False)
+    return np.asarray(scores, dtype=np.float32).reshape(-1)
+
+
+def rerank_claims(db: Session, claim_ids: List[int], rescore: bool = False) -> int:
+    """
+    Score the evidence of `claim_ids` that has no rerank score yet (all of
+    it with `rescore`) in one batched pass; returns rows scored.
+    """
+    if not claim_ids:
+        return 0
+    q = (db.query(models.Evidence.id, models.Evidence.snippet, models.Claim.canonical_text, models.Claim.claim_text)
+           .join(models.Claim, models.Claim.id == models.Evidence.claim_id)
+           .filter(models.Evidence.claim_id.in_(claim_ids)))
+    if not rescore:
+        q = q.filter(models.Evidence.rerank_score.is_(None))
+    rows = q.order_by(models.Evidence.id).all()
+    if not rows:
+        return 0
+
+    scores = score_pairs([(canon or text or "", snippet or "") for _, snippet, canon, text in rows])
+    db.execute(update(models.Evidence), [
+        {"id": ev_id, "rerank_score": float(s)} for (ev_id, *_), s in zip(rows, scores)
+    ])
+    db.commit()
+    metrics.incr("rerank", "pairs", len(rows))
+    return len(rows)
+
+
+def rerank_video(db: Session, video_id: int, rescore: bool = False) -> Dict[str, int]:
+    """Score the evidence of every claim of a video together."""
+    claim_ids = [cid for (cid,) in db.query(models.Claim.id).filter(models.Claim.video_id == video_id)]
+    return {"claims": len(claim_ids), "scored": rerank_claims(db, claim_ids, rescore=rescore)}
+
+
+def evidence_for_verdict(db: Session, claim_id: int) -> List[models.Evidence]:
+    """
+    Evidence rows to show the verdict model: RERANK_TOPK by rerank score
+    with RERANK on, else the top VERDICT_EVIDENCE_LIMIT by similarity.
+    evidence.check_video scores a whole video before its verdicts; rows
+    still unscored here (claims checked one at a time) are scored first.
+    """
+    q = db.query(models.Evidence).filter(models.Evidence.claim_id == claim_id)
+    if not RERANK:
+        return q.order_by(models.Evidence.similarity.desc().nullslast()).limit(VERDICT_EVIDENCE_LIMIT).all()
+    rerank_claims(db, [claim_id])
+    return (q.order_by(models.Evidence.rerank_score.desc().nullslast(),
+                       models.Evidence.similarity.desc().nullslast())
+             .limit(RERANK_TOPK).all())
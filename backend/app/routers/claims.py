@@ -4,10 +4,11 @@ Claims Router
 Handles extraction and retrieval of factual claims from video transcripts.
 """
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from ..db import SessionLocal
 from .. import models, schemas
 from ..claim_tasks import extract_for_video
+from ..claims_extract import get_score_cache
 
 router = APIRouter()
 
@@ -42,6 +43,19 @@ def trigger_extract(video_id: int, overwrite: bool = False, db: Session = Depend
     extract_for_video.delay(video_id, overwrite)
     return {"ok": True, "queued": True, "video_id": video_id}
     
+@router.get("/cache/stats")
+def claim_cache_stats():
+    """
+    Hit/miss metrics for the claim-score memo cache.
+    
+    Returns:
+        Counters for this API process and, when Redis is reachable, across all workers
+    """
+    cache = get_score_cache()
+    if cache is None:
+        return {"ok": False, "reason": "cache_disabled"}
+    return {"ok": True, **cache.stats()}
+
 @router.get("/video/{video_id}", response_model=list[schemas.ClaimOut])
 def list_claims(video_id: int, db: Session = Depends(get_db)):
     """
@@ -54,5 +68,8 @@ def list_claims(video_id: int, db: Session = Depends(get_db)):
     Returns:
         List of claims with metadata
     """
-    claims = db.query(models.Claim).filter(models.Claim.video_id == video_id).all()
+    claims = (db.query(models.Claim)
+                .options(selectinload(models.Claim.occurrences))
+                .filter(models.Claim.video_id == video_id)
+                .all())
     return claims
@@ -7,7 +7,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from ..db import SessionLocal
 from .. import models
-from ..evidence_tasks import fetch_for_claim
+from ..evidence_tasks import fetch_for_claim, rerank_for_video, check_video
 
 router = APIRouter()
 
@@ -40,18 +40,20 @@ def trigger_evidence(claim_id: int, db: Session = Depends(get_db)):
 @router.get("/claim/{claim_id}")
 def list_evidence(claim_id: int, db: Session = Depends(get_db)):
     """
-    List all evidence items for a claim, ordered by similarity score.
+    List all evidence items for a claim, ordered by rerank score (when
+    scored) and then similarity.
     
     Args:
         claim_id: ID of the claim
         db: Database session
         
     Returns:
-        List of evidence items with sources, snippets, and similarity scores
+        List of evidence items with sources, snippets, similarity and rerank scores
     """
     rows = (db.query(models.Evidence)
               .filter(models.Evidence.claim_id == claim_id)
-              .order_by(models.Evidence.similarity.desc().nullslast())
+              .order_by(models.Evidence.rerank_score.desc().nullslast(),
+                        models.Evidence.similarity.desc().nullslast())
               .all())
     return [
         {
@@ -61,6 +63,60 @@ def list_evidence(claim_id: int, db: Session = Depends(get_db)):
             "url": r.url,
             "snippet": r.snippet,
             "similarity": r.similarity,
+            "rerank_score": r.rerank_score,
         }
         for r in rows
     ]
+
+@router.get("/cache/stats")
+def evidence_cache_stats():
+    """
+    Evidence source cache effectiveness per source kind.
+    
+    Returns:
+        {kind: {hits, stale, misses, refreshed, hit_ratio, bytes_saved}}
+    """
+    from ..evidence_cache import stats
+    return stats()
+
+@router.post("/video/{video_id}/rerank")
+def trigger_rerank(video_id: int, rescore: bool = False, db: Session = Depends(get_db)):
+    """
+    Trigger async cross-encoder reranking of the evidence of every claim of a video.
+    
+    Args:
+        video_id: ID of the video
+        rescore: Also re-score evidence that already has a rerank score
+        db: Database session
+        
+    Returns:
+        Status response with queue confirmation
+        
+    Raises:
+        HTTPException: 404 if video not found
+    """
+    if not db.get(models.Video, video_id):
+        raise HTTPException(404, "Video not found")
+    rerank_for_video.delay(video_id, rescore)
+    return {"ok": True, "queued": True}
+
+@router.post("/video/{video_id}/check")
+def trigger_video_check(video_id: int, db: Session = Depends(get_db)):
+    """
+    Trigger evidence retrieval for every claim of a video, then one batched
+    rerank pass (RERANK=on), then verdict generation.
+    
+    Args:
+        video_id: ID of the video
+        db: Database session
+        
+    Returns:
+        Status response with queue confirmation
+        
+    Raises:
+        HTTPException: 404 if video not found
+    """
+    if not db.get(models.Video, video_id):
+        raise HTTPException(404, "Video not found")
+    check_video.delay(video_id)
+    return {"ok": True, "queued": True}
@@ -4,7 +4,9 @@ Videos Router
 Handles video ingestion from YouTube URLs or direct file uploads,
 and provides endpoints to retrieve video metadata and transcription segments.
 """
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+import os
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File, Form
 from sqlalchemy.orm import Session
 from typing import Optional
 from pydantic import BaseModel
@@ -12,14 +14,21 @@ from ..db import SessionLocal
 from .. import models, schemas
 from ..storage import upload_file
 from ..tasks import pipeline_from_url, pipeline_from_uploaded
-from ..ingest import upload_audio_from_url, save_upload_file
+from ..ingest import upload_audio_from_url, save_upload_stream, canonical_source_id, UploadTooLarge, INGEST_MAX_UPLOAD_MB
+from ..dedupe import submit_url
 
 router = APIRouter()
 
+# Uploads to S3 run on their own thread limiter, so a burst of large uploads
+# queues behind each other instead of starving the threads used by sync routes
+INGEST_UPLOAD_THREADS = int(os.getenv("INGEST_UPLOAD_THREADS", "8"))
+_upload_limiter = anyio.CapacityLimiter(INGEST_UPLOAD_THREADS)
+
 class VideoUrlRequest(BaseModel):
     """Request model for URL-based video ingestion."""
     source_url: str
     title: Optional[str] = None
+    force: bool = False
 
 def get_db():
     """Database session dependency for request handlers."""
@@ -31,9 +40,11 @@ def get_db():
 
 @router.post("/ingest", response_model=schemas.VideoOut)
 async def ingest_video(
+    request: Request,
     source_url: Optional[str] = Form(None),
     title: Optional[str] = Form(None),
     file: UploadFile | None = File(None),
+    force: bool = Form(False),
     db: Session = Depends(get_db)
 ):
     """
@@ -43,31 +54,44 @@ async def ingest_video(
         source_url: YouTube or direct video URL
         title: Optional title for the video
         file: Optional direct audio file upload
+        force: Re-process a URL even if the same source was ingested before
         db: Database session
         
     Returns:
-        Created video record with QUEUED status
+        Created video record with QUEUED status, or the existing video for
+        the same source (see app.dedupe)
         
     Raises:
-        HTTPException: 400 if neither source_url nor file is provided
+        HTTPException: 400 if neither source_url nor file is provided,
+            413 if the upload is larger than INGEST_MAX_UPLOAD_MB
     """
     if not source_url and not file:
         raise HTTPException(400, "Provide either source_url or file")
+    max_bytes = int(INGEST_MAX_UPLOAD_MB * 1024 * 1024)
+    if file and int(request.headers.get("content-length") or 0) > max_bytes + 1024 * 1024:
+        raise HTTPException(413, f"Upload larger than {INGEST_MAX_UPLOAD_MB:g} MB")
+
+    if source_url:
+        # may wait on the per-source ingest lock: keep it off the event loop
+        return await anyio.to_thread.run_sync(_submit_url, db, source_url, title, force)
 
     v = models.Video(source_url=source_url, title=title, status="QUEUED")
     db.add(v); db.commit(); db.refresh(v)
 
-    if source_url:
-        pipeline_from_url.delay(v.id, source_url)
-    else:
-        # save upload to temp and push to S3
-        data = await file.read()
-        import tempfile, os
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as tmp:
-            tmp.write(data)
-            tmp.flush()
-            s3key = save_upload_file(v.id, tmp.name)
-        pipeline_from_uploaded.delay(v.id, s3key)
+    # stream the upload to S3 in parts from a worker thread: constant
+    # memory per request, and the event loop keeps serving other requests
+    try:
+        s3key, sha = await anyio.to_thread.run_sync(
+            save_upload_stream, v.id, file.file, max_bytes, limiter=_upload_limiter,
+        )
+    except UploadTooLarge:
+        v.status = "FAILED"
+        db.commit()
+        raise HTTPException(413, f"Upload larger than {INGEST_MAX_UPLOAD_MB:g} MB")
+    finally:
+        await file.close()
+    # content hash lets the worker reuse a cached transcript of identical audio
+    pipeline_from_uploaded.delay(v.id, s3key, sha)
 
     return v
 
@@ -81,17 +105,17 @@ def ingest_video_url(request: VideoUrlRequest, db: Session = Depends(get_db)):
         db: Database session
         
     Returns:
-        Created video record with QUEUED status
+        Created video record with QUEUED status, or the existing video for
+        the same source unless `force` is set
     """
-    v = models.Video(source_url=request.source_url, title=request.title, status="QUEUED")
-    db.add(v)
-    db.commit()
-    db.refresh(v)
-    
-    # Start the processing pipeline
-    pipeline_from_url.delay(v.id, request.source_url)
-    
-    return v
+    return _submit_url(db, request.source_url, request.title, request.force)
+
+def _submit_url(db: Session, source_url: str, title: Optional[str], force: bool):
+    """Reuse or coalesce onto a video of the same source, else start the pipeline."""
+    return submit_url(
+        db, source_url, canonical_source_id(source_url), title=title, force=force,
+        enqueue=lambda video_id: pipeline_from_url.delay(video_id, source_url, force),
+    )
 
 @router.get("/{video_id}", response_model=schemas.VideoOut)
 def get_video(video_id: int, db: Session = Depends(get_db)):
@@ -113,18 +137,25 @@ def get_video(video_id: int, db: Session = Depends(get_db)):
     return v
 
 @router.get("/{video_id}/segments")
-def list_segments(video_id: int, db: Session = Depends(get_db)):
+def list_segments(video_id: int, after: Optional[float] = None, db: Session = Depends(get_db)):
     """
-    List all transcription segments for a video.
+    List transcription segments for a video.
+    
+    Segments are written in small batches while ASR runs, so this returns the
+    partial transcript during processing (see `progress` on /videos/{id}).
     
     Args:
         video_id: ID of the video
+        after: Only return segments starting after this time (for live polling)
         db: Database session
         
     Returns:
         List of segments with timestamps and transcribed text
     """
-    segs = db.query(models.Segment).filter(models.Segment.video_id == video_id).order_by(models.Segment.t_start).all()
+    q = db.query(models.Segment).filter(models.Segment.video_id == video_id)
+    if after is not None:
+        q = q.filter(models.Segment.t_start > after)
+    segs = q.order_by(models.Segment.t_start).all()
     return [
         {"id": s.id, "t_start": s.t_start, "t_end": s.t_end, "text": s.text}
         for s in segs
@@ -15,19 +15,31 @@ class VideoCreate(BaseModel):
 class VideoOut(BaseModel):
     id: int
     source_url: Optional[str] = None
+    source_id: Optional[str] = None
     title: Optional[str] = None
     thumbnail_url: Optional[str] = None
     duration: Optional[float] = None
+    audio_processed: Optional[float] = None
+    progress: Optional[float] = None
     status: str
     created_at: datetime
     class Config: from_attributes = True
 
+class ClaimOccurrenceOut(BaseModel):
+    segment_id: Optional[int] = None
+    t_start: Optional[float] = None
+    t_end: Optional[float] = None
+    text: Optional[str] = None
+    similarity: Optional[float] = None
+    class Config: from_attributes = True
+
 class ClaimOut(BaseModel):
     id: int
     video_id: int
     segment_id: int
     claim_text: str
     canonical_text: Optional[str] = None
+    occurrences: List[ClaimOccurrenceOut] = []
     class Config: from_attributes = True
 
 class VerdictOut(BaseModel):
@@ -1,6 +1,11 @@
-import os, io, uuid
+import os, io, uuid, hashlib, shutil, threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Dict
+from urllib.parse import quote
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.client import Config
+from botocore.exceptions import ClientError
 
 S3_ENDPOINT = os.getenv("MINIO_ENDPOINT", "http://minio:9000")
 S3_BUCKET   = os.getenv("MINIO_BUCKET", "adveritas")
@@ -8,36 +13,244 @@ S3_KEY      = os.getenv("MINIO_ACCESS_KEY", "minioadmin")
 S3_SECRET   = os.getenv("MINIO_SECRET_KEY", "minioadmin")
 REGION      = os.getenv("AWS_REGION", "us-east-1")
 
-_session = boto3.session.Session()
-s3 = _session.client(
-    "s3",
-    endpoint_url=S3_ENDPOINT,
-    aws_access_key_id=S3_KEY,
-    aws_secret_access_key=S3_SECRET,
-    config=Config(signature_version="s3v4"),
-    region_name=REGION
+# Streaming uploads: parts held in memory = the one being read + the one uploading
+S3_PART_SIZE = max(5, int(os.getenv("S3_PART_SIZE_MB", "8"))) * 1024 * 1024  # S3 minimum is 5 MB
+
+# upload_file/download_file: files above the threshold move in S3_PART_SIZE
+# parts, S3_MAX_CONCURRENCY at a time. The connection pool must cover every
+# thread that talks to S3 at once (transfer threads + API upload threads).
+S3_MULTIPART_THRESHOLD = max(5, int(os.getenv("S3_MULTIPART_THRESHOLD_MB", "16"))) * 1024 * 1024
+S3_MAX_CONCURRENCY = int(os.getenv("S3_MAX_CONCURRENCY", "8"))
+S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "32"))
+
+# s3 (MinIO/AWS) or local (a directory; for tests and single-node deployments)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "s3").lower()
+STORAGE_LOCAL_DIR = os.getenv("STORAGE_LOCAL_DIR", "./data/storage")
+
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=S3_MULTIPART_THRESHOLD,
+    multipart_chunksize=S3_PART_SIZE,
+    max_concurrency=S3_MAX_CONCURRENCY,
+    use_threads=S3_MAX_CONCURRENCY > 1,
 )
 
-def ensure_bucket():
-    buckets = [b["Name"] for b in s3.list_buckets().get("Buckets", [])]
-    if S3_BUCKET not in buckets:
+
+class LocalS3:
+    """
+    The subset of the boto3 S3 client used by this module, backed by
+    `root/<bucket>/<key>` files. Writes go to a temp file and are renamed
+    into place, so readers never see partial objects.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self._uploads = os.path.join(self.root, ".multipart")
+
+    def _path(self, Bucket: str, Key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, Bucket, Key))
+        if not path.startswith(os.path.join(self.root, Bucket) + os.sep):
+            raise ValueError(f"invalid key {Key!r}")
+        return path
+
+    def _missing(self, op: str, code: str = "404"):
+        return ClientError({"Error": {"Code": code, "Message": "Not Found"}}, op)
+
+    def _write(self, path: str, write):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{uuid.uuid4().hex}.part"
         try:
-            s3.create_bucket(Bucket=S3_BUCKET)
-        except Exception:
-            pass
+            with open(tmp, "wb") as f:
+                write(f)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
 
-def upload_bytes(key: str, data: bytes, content_type: str):
+    def head_bucket(self, Bucket: str):
+        if not os.path.isdir(os.path.join(self.root, Bucket)):
+            raise self._missing("HeadBucket")
+        return {}
+
+    def create_bucket(self, Bucket: str):
+        os.makedirs(os.path.join(self.root, Bucket), exist_ok=True)
+        return {}
+
+    def put_object(self, Bucket: str, Key: str, Body, **kw):
+        data = Body if isinstance(Body, (bytes, bytearray)) else Body.read()
+        self._write(self._path(Bucket, Key), lambda f: f.write(data))
+        return {"ETag": self.head_object(Bucket=Bucket, Key=Key)["ETag"]}
+
+    def upload_file(self, Filename: str, Bucket: str, Key: str, **kw):
+        with open(Filename, "rb") as src:
+            self._write(self._path(Bucket, Key), lambda f: shutil.copyfileobj(src, f, 1024 * 1024))
+
+    def download_file(self, Bucket: str, Key: str, Filename: str, **kw):
+        path = self._path(Bucket, Key)
+        if not os.path.exists(path):
+            raise self._missing("GetObject")
+        shutil.copyfile(path, Filename)
+
+    def head_object(self, Bucket: str, Key: str):
+        try:
+            st = os.stat(self._path(Bucket, Key))
+        except FileNotFoundError:
+            raise self._missing("HeadObject")
+        # changes whenever the object is rewritten, like a real ETag
+        return {"ETag": f'"{st.st_mtime_ns:x}-{st.st_size:x}"', "ContentLength": st.st_size}
+
+    def create_multipart_upload(self, Bucket: str, Key: str, **kw):
+        upload_id = uuid.uuid4().hex
+        os.makedirs(os.path.join(self._uploads, upload_id))
+        return {"UploadId": upload_id}
+
+    def upload_part(self, UploadId: str, PartNumber: int, Body, **kw):
+        with open(os.path.join(self._uploads, UploadId, str(PartNumber)), "wb") as f:
+            f.write(Body)
+        return {"ETag": f'"{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket: str, Key: str, UploadId: str, MultipartUpload: Dict, **kw):
+        def concat(f):
+            for part in MultipartUpload["Parts"]:
+                with open(os.path.join(self._uploads, UploadId, str(part["PartNumber"])), "rb") as p:
+                    shutil.copyfileobj(p, f, 1024 * 1024)
+        self._write(self._path(Bucket, Key), concat)
+        shutil.rmtree(os.path.join(self._uploads, UploadId), ignore_errors=True)
+        return {}
+
+    def abort_multipart_upload(self, UploadId: str, **kw):
+        shutil.rmtree(os.path.join(self._uploads, UploadId), ignore_errors=True)
+        return {}
+
+    def generate_presigned_url(self, ClientMethod: str, Params: Dict, ExpiresIn: int = 3600):
+        return "file://" + quote(self._path(Params["Bucket"], Params["Key"]))
+
+
+def _client():
+    if STORAGE_BACKEND == "local":
+        return LocalS3(STORAGE_LOCAL_DIR)
+    if STORAGE_BACKEND != "s3":
+        raise ValueError(f"STORAGE_BACKEND must be s3 or local, got {STORAGE_BACKEND!r}")
+    session = boto3.session.Session()
+    return session.client(
+        "s3",
+        endpoint_url=S3_ENDPOINT,
+        aws_access_key_id=S3_KEY,
+        aws_secret_access_key=S3_SECRET,
+        config=Config(signature_version="s3v4", max_pool_connections=S3_MAX_POOL_CONNECTIONS),
+        region_name=REGION
+    )
+
+s3 = _client()
+
+# Buckets known to exist in this process; checked once instead of per upload
+_buckets_ready = set()
+_buckets_lock = threading.Lock()
+
+def ensure_bucket(refresh: bool = False):
+    if S3_BUCKET in _buckets_ready and not refresh:
+        return
+    with _buckets_lock:
+        if S3_BUCKET in _buckets_ready and not refresh:
+            return
+        try:
+            s3.head_bucket(Bucket=S3_BUCKET)
+        except ClientError:
+            try:
+                s3.create_bucket(Bucket=S3_BUCKET)
+            except Exception:
+                pass  # created concurrently by another process
+        _buckets_ready.add(S3_BUCKET)
+
+def _no_bucket(e: Exception) -> bool:
+    return isinstance(e, ClientError) and e.response.get("Error", {}).get("Code") == "NoSuchBucket"
+
+def _with_bucket(fn):
+    """Run an upload; if the bucket vanished since it was cached, recreate it and retry once."""
     ensure_bucket()
-    s3.put_object(Bucket=S3_BUCKET, Key=key, Body=data, ContentType=content_type)
+    try:
+        return fn()
+    except ClientError as e:
+        if not _no_bucket(e):
+            raise
+        _buckets_ready.discard(S3_BUCKET)
+        ensure_bucket(refresh=True)
+        return fn()
+
+def upload_bytes(key: str, data: bytes, content_type: str):
+    _with_bucket(lambda: s3.put_object(Bucket=S3_BUCKET, Key=key, Body=data, ContentType=content_type))
     return key
 
 def upload_file(key: str, local_path: str, content_type: str="application/octet-stream"):
-    ensure_bucket()
-    s3.upload_file(local_path, S3_BUCKET, key, ExtraArgs={"ContentType": content_type})
+    _with_bucket(lambda: s3.upload_file(
+        local_path, S3_BUCKET, key, ExtraArgs={"ContentType": content_type}, Config=TRANSFER_CONFIG,
+    ))
     return key
 
+def _read_part(stream: BinaryIO, size: int) -> bytes:
+    """Read up to `size` bytes, looping over short reads from pipes."""
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = stream.read(size - len(buf))
+        if not chunk:
+            break
+        buf += chunk
+    return bytes(buf)
+
+def upload_stream(key: str, stream: BinaryIO, content_type: str = "application/octet-stream",
+                  part_size: int = S3_PART_SIZE) -> Dict:
+    """
+    Multipart-upload a non-seekable stream (e.g. a subprocess pipe) without
+    touching local disk. At most two parts are buffered: the next one is read
+    while the previous one uploads. The upload is aborted on any error.
+
+    Returns:
+        {"key", "size", "sha256", "parts"}
+    """
+    mpu = _with_bucket(lambda: s3.create_multipart_upload(Bucket=S3_BUCKET, Key=key, ContentType=content_type))
+    upload_id = mpu["UploadId"]
+    h = hashlib.sha256()
+    size = 0
+    parts = []
+
+    def put(number: int, body: bytes):
+        r = s3.upload_part(Bucket=S3_BUCKET, Key=key, UploadId=upload_id, PartNumber=number, Body=body)
+        return {"ETag": r["ETag"], "PartNumber": number}
+
+    try:
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            pending = None
+            number = 0
+            while True:
+                body = _read_part(stream, part_size)
+                if not body and number:
+                    break
+                number += 1
+                h.update(body)
+                size += len(body)
+                if pending:
+                    parts.append(pending.result())
+                pending = pool.submit(put, number, body)
+                if len(body) < part_size:
+                    break
+            parts.append(pending.result())
+        s3.complete_multipart_upload(
+            Bucket=S3_BUCKET, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts},
+        )
+    except BaseException:
+        try:
+            s3.abort_multipart_upload(Bucket=S3_BUCKET, Key=key, UploadId=upload_id)
+        except Exception as e:
+            print(f"Failed to abort multipart upload of {key}: {e}")
+        raise
+    return {"key": key, "size": size, "sha256": h.hexdigest(), "parts": len(parts)}
+
+def head_etag(key: str) -> str:
+    """ETag of an object (changes whenever the object is rewritten)."""
+    return s3.head_object(Bucket=S3_BUCKET, Key=key)["ETag"].strip('"')
+
 def download_file(key: str, local_path: str):
-    s3.download_file(S3_BUCKET, key, local_path)
+    s3.download_file(S3_BUCKET, key, local_path, Config=TRANSFER_CONFIG)
     return local_path
 
 def presign(key: str, expires=3600):
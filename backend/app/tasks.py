@@ -1,9 +1,9 @@
 import os
 from celery import Celery
-from .ingest import upload_audio_from_url, save_upload_file, get_video_metadata
-from .asr import transcribe_s3_to_segments, persist_segments
+from .ingest import upload_audio_from_url, canonical_source_id
+from .asr import transcribe_to_db, iter_transcribe_s3, ASR_TWO_PASS
 from .db import SessionLocal
-from . import models
+from . import models, transcript_cache
 from .celery_app import celery_app
 
 # Configure Celery
@@ -15,12 +15,27 @@ celery_app.conf.update(
     enable_utc=True,
 )
 
-@celery_app.task(name="pipeline.from_url")
-def pipeline_from_url(video_id: int, url: str):
-    # Extract and save video metadata
+# Streaming mode: persist segments as they are decoded and extract claims concurrently
+PIPELINE_STREAMING = os.getenv("PIPELINE_STREAMING", "off").lower() == "on"
+STREAM_FLUSH_SEGMENTS = int(os.getenv("STREAM_FLUSH_SEGMENTS", "8"))
+
+# Two-pass ASR: the refinement pass runs on its own queue, consumed by its own
+# worker (-Q asr_refine), so previews of new videos never wait behind it
+ASR_REFINE_QUEUE = os.getenv("ASR_REFINE_QUEUE", "asr_refine")
+
+def _set_status(video_id: int, status: str):
+    db = SessionLocal()
+    try:
+        v = db.get(models.Video, video_id)
+        if v:
+            v.status = status
+            db.commit()
+    finally:
+        db.close()
+
+def _save_metadata(video_id: int, metadata: dict):
     db = SessionLocal()
     try:
-        metadata = get_video_metadata(url)
         video = db.get(models.Video, video_id)
         if video:
             if metadata.get("title") and not video.title:
@@ -32,12 +47,152 @@ def pipeline_from_url(video_id: int, url: str):
             db.commit()
     finally:
         db.close()
-    
-    key = upload_audio_from_url(video_id, url)
-    segs = transcribe_s3_to_segments(key)
-    persist_segments(video_id, segs)
+
+def _from_cache(video_id: int, source_id: str = None, audio_sha: str = None, record_source_id: str = None,
+                count_miss: bool = True):
+    """
+    Copy a cached transcript to the video; returns a task result or None on a miss.
+    `record_source_id` is saved on an entry found by audio hash; `count_miss`
+    is passed to transcript_cache.lookup.
+    """
+    db = SessionLocal()
+    try:
+        entry = transcript_cache.lookup(db, source_id=source_id, audio_sha=audio_sha, count_miss=count_miss)
+        if not entry:
+            return None
+        n = transcript_cache.copy_to_video(db, entry, video_id, source_id=record_source_id)
+        print(f"Video {video_id}: transcript reused from cache entry {entry.id} ({n} segments)")
+    finally:
+        db.close()
+    if n and PIPELINE_STREAMING:
+        # the streaming path extracts claims during ASR; with no ASR, queue it instead
+        from .claim_tasks import extract_for_video
+        extract_for_video.delay(video_id)
+    return {"segments": n, "cached": True}
+
+def _store_in_cache(video_id: int, source_id: str = None, audio_sha: str = None):
+    db = SessionLocal()
+    try:
+        transcript_cache.store(db, video_id, source_id=source_id, audio_sha=audio_sha)
+    except Exception as e:
+        # the transcript itself is safe; only the cache entry is lost
+        print(f"Video {video_id}: failed to store transcript cache entry: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+def transcribe_and_extract_streaming(video_id: int, s3_key: str, preview: bool = False) -> dict:
+    """
+    Overlap ASR with claim extraction: every STREAM_FLUSH_SEGMENTS decoded
+    segments are committed and handed to a StreamingClaimExtractor.
+    """
+    from .claim_tasks import StreamingClaimExtractor
+
+    consumer = StreamingClaimExtractor(video_id)
+    # a retried task: claims of the segments kept from the failed attempt
+    existing = consumer.resume()
+    consumer.start()
+    try:
+        n = transcribe_to_db(video_id, s3_key, on_batch=consumer.feed,
+                             flush_segments=STREAM_FLUSH_SEGMENTS, preview=preview)
+    except Exception:
+        # stop the consumer, but report the ASR failure rather than a close() error
+        try:
+            consumer.close()
+        except Exception as e:
+            print(f"Video {video_id}: claim extractor failed to close after ASR error: {e}")
+        raise
+    result = consumer.close()
+
+    if n:
+        _set_status(video_id, "CLAIMED" if result["created"] or existing else "NO_CLAIMS")
+    print(f"Streaming pipeline for video {video_id}: {n} segments, {result}")
+    return {"segments": n, **result}
+
+def transcribe(video_id: int, s3_key: str, source_id: str = None, audio_sha: str = None):
+    """
+    Transcribe and cache the result. With ASR_TWO_PASS the preview model runs
+    here and refine_transcript is queued; the cache only stores final transcripts.
+    """
+    if PIPELINE_STREAMING:
+        result = transcribe_and_extract_streaming(video_id, s3_key, preview=ASR_TWO_PASS)
+    else:
+        # segments are flushed in small batches; /videos/{id}/segments shows them live
+        result = {"segments": transcribe_to_db(video_id, s3_key, preview=ASR_TWO_PASS)}
+
+    if ASR_TWO_PASS:
+        refine_transcript.apply_async(
+            (video_id, s3_key, source_id, audio_sha), queue=ASR_REFINE_QUEUE,
+        )
+    else:
+        _store_in_cache(video_id, source_id=source_id, audio_sha=audio_sha)
+    return result
+
+@celery_app.task(name="pipeline.refine_transcript")
+def refine_transcript(video_id: int, s3_key: str, source_id: str = None, audio_sha: str = None):
+    """
+    Second ASR pass with WHISPER_MODEL. The refined transcript replaces the
+    preview in one transaction; claims whose sentence did not change are kept
+    along with their evidence and verdicts.
+    """
+    from . import refine
+    from .asr import NO_SPEECH
+
+    segments = list(iter_transcribe_s3(s3_key)) or [(0.0, 1.0, NO_SPEECH)]
+    speech = sum(1 for *_, t in segments if t != NO_SPEECH)
+
+    db = SessionLocal()
+    try:
+        v = db.get(models.Video, video_id)
+        if not v:
+            return {"ok": False, "reason": "no_video"}
+        extracted = v.status in ("CLAIMED", "NO_CLAIMS") or (
+            db.query(models.Claim.id).filter(models.Claim.video_id == video_id).first() is not None
+        )
+        result = refine.replace_transcript(db, video_id, segments)
+        new_segments, covered = result.pop("new_segments"), result.pop("covered")
+        if extracted and speech:
+            result.update(refine.extract_new_claims(db, video_id, new_segments, covered))
+            has_claims = db.query(models.Claim.id).filter(models.Claim.video_id == video_id).first() is not None
+            v.status = "CLAIMED" if has_claims else "NO_CLAIMS"
+        else:
+            v.status = "TRANSCRIBED" if speech else "NO_SPEECH"
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    print(f"Refined transcript of video {video_id}: {result}")
+    _store_in_cache(video_id, source_id=source_id, audio_sha=audio_sha)
+    return {"ok": True, **result}
+
+@celery_app.task(name="pipeline.from_url")
+def pipeline_from_url(video_id: int, url: str, force: bool = False):
+    # FAILED (rather than stuck in QUEUED) lets the next submission of this source start over
+    try:
+        source_id = canonical_source_id(url)
+        # Same source transcribed before with this ASR config: skip download and ASR
+        # a miss here is only counted if the audio-hash lookup below misses too
+        cached = None if force else _from_cache(video_id, source_id=source_id, count_miss=False)
+        if cached:
+            return cached
+
+        # One yt-dlp run: metadata is saved as soon as it arrives, while the audio downloads
+        key, audio_sha = upload_audio_from_url(video_id, url, on_metadata=lambda m: _save_metadata(video_id, m))
+        # Same audio under another URL (or uploaded): skip ASR
+        cached = None if force else _from_cache(video_id, audio_sha=audio_sha, record_source_id=source_id)
+        if cached:
+            return cached
+        return transcribe(video_id, key, source_id=source_id, audio_sha=audio_sha)
+    except Exception:
+        _set_status(video_id, "FAILED")
+        raise
 
 @celery_app.task(name="pipeline.from_uploaded")
-def pipeline_from_uploaded(video_id: int, s3_key: str):
-    segs = transcribe_s3_to_segments(s3_key)
-    persist_segments(video_id, segs)
\ No newline at end of file
+def pipeline_from_uploaded(video_id: int, s3_key: str, audio_sha: str = None):
+    cached = _from_cache(video_id, audio_sha=audio_sha) if audio_sha else None
+    if cached:
+        return cached
+    return transcribe(video_id, s3_key, audio_sha=audio_sha)
@@ -0,0 +1,172 @@
+# app/transcript_cache.py
+"""
+Content-addressed transcript cache.
+
+Finished transcripts are stored once per (source, ASR config) in the
+`transcript_cache` table. Two keys can find an entry:
+
+- the canonical source id (e.g. "youtube:<id>"), checked before anything is
+  downloaded, so a re-ingested video skips yt-dlp, ffmpeg and Whisper;
+- the sha256 of the stored audio, checked after download/upload, which
+  catches the same audio reached through a different URL or a file upload.
+
+Both are scoped by asr_config_key(), a digest of the Whisper model, compute
+type, decoding mode, chunk length and VAD thresholds, so changing any of them stops
+matching old entries. The table is bounded by TRANSCRIPT_CACHE_MAX_ENTRIES
+and TRANSCRIPT_CACHE_MAX_MB; evict() drops least recently used entries.
+"""
+import os
+import json
+import hashlib
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import models, metrics, bulk
+from .cache import digest
+
+TRANSCRIPT_CACHE = os.getenv("TRANSCRIPT_CACHE", "on").lower() != "off"
+TRANSCRIPT_CACHE_MAX_ENTRIES = int(os.getenv("TRANSCRIPT_CACHE_MAX_ENTRIES", "5000"))
+TRANSCRIPT_CACHE_MAX_MB = float(os.getenv("TRANSCRIPT_CACHE_MAX_MB", "512"))
+
+
+def asr_config_key() -> str:
+    """Digest of every ASR setting that changes the transcript."""
+    from . import asr
+    return digest(asr.WHISPER_MODEL, asr.WHISPER_COMPUTE_TYPE, asr.ASR_MODE, asr.ASR_CHUNK_SECONDS,
+                  asr.ASR_VAD_THRESHOLDS)
+
+
+def sha256_file(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def lookup(db: Session, source_id: Optional[str] = None, audio_sha: Optional[str] = None,
+           count_miss: bool = True) -> Optional[models.TranscriptCache]:
+    """
+    Newest entry for this ASR config matching `source_id` or `audio_sha` (source id wins).
+    Pass count_miss=False when a miss is followed by another lookup for the
+    same video (source id before the download, audio hash after), so the
+    chain counts one miss.
+    """
+    if not TRANSCRIPT_CACHE:
+        return None
+    cfg = asr_config_key()
+    for col, val in ((models.TranscriptCache.source_id, source_id),
+                     (models.TranscriptCache.audio_sha256, audio_sha)):
+        if not val:
+            continue
+        entry = (db.query(models.TranscriptCache)
+                   .filter(col == val, models.TranscriptCache.asr_config == cfg)
+                   .order_by(models.TranscriptCache.created_at.desc())
+                   .first())
+        if entry:
+            return entry
+    if count_miss:
+        metrics.incr("transcript_cache", "misses")
+    return None
+
+
+def copy_to_video(db: Session, entry: models.TranscriptCache, video_id: int,
+                  source_id: Optional[str] = None) -> int:
+    """
+    Write the cached segments to `video_id` and mark it transcribed.
+
+    `source_id` is the source the video came from. When the entry was found
+    by audio hash and has no source id yet, it is recorded on the entry so
+    the next request for that source is a hit before downloading.
+
+    Returns:
+        Number of speech segments copied (0 for a cached no-speech result)
+    """
+    from .asr import NO_SPEECH
+
+    segments = json.loads(entry.segments)
+    db.query(models.Segment).filter(models.Segment.video_id == video_id).delete()
+    bulk.insert_rows(db, models.Segment, [
+        {"video_id": video_id, "t_start": s, "t_end": e, "text": t} for s, e, t in segments
+    ])
+    n = sum(1 for _, _, t in segments if t != NO_SPEECH)
+
+    v = db.get(models.Video, video_id)
+    if v:
+        if entry.title and not v.title:
+            v.title = entry.title
+        if entry.thumbnail_url and not v.thumbnail_url:
+            v.thumbnail_url = entry.thumbnail_url
+        if entry.duration and not v.duration:
+            v.duration = entry.duration
+        v.audio_processed = v.duration
+        v.status = "TRANSCRIBED" if n else "NO_SPEECH"
+
+    if source_id and not entry.source_id:
+        entry.source_id = source_id
+    entry.hits = (entry.hits or 0) + 1
+    entry.last_used_at = datetime.utcnow()
+    db.commit()
+    metrics.incr("transcript_cache", "hits")
+    metrics.incr("transcript_cache", "segments_reused", len(segments))
+    return n
+
+
+def store(db: Session, video_id: int, source_id: Optional[str] = None, audio_sha: Optional[str] = None) -> Optional[models.TranscriptCache]:
+    """Save the finished transcript of `video_id` under its source id / audio hash, then evict."""
+    if not TRANSCRIPT_CACHE or not (source_id or audio_sha):
+        return None
+    segs: List[Tuple[float, float, str]] = [
+        (s.t_start, s.t_end, s.text)
+        for s in (db.query(models.Segment)
+                    .filter(models.Segment.video_id == video_id)
+                    .order_by(models.Segment.t_start.asc()))
+    ]
+    if not segs:
+        return None
+    blob = json.dumps(segs)
+    v = db.get(models.Video, video_id)
+    entry = models.TranscriptCache(
+        source_id=source_id,
+        audio_sha256=audio_sha,
+        asr_config=asr_config_key(),
+        title=v.title if v else None,
+        thumbnail_url=v.thumbnail_url if v else None,
+        duration=v.duration if v else None,
+        segments=blob,
+        n_segments=len(segs),
+        size_bytes=len(blob.encode("utf-8")),
+        hits=0,
+    )
+    db.add(entry)
+    db.commit()
+    evict(db)
+    return entry
+
+
+def evict(db: Session, max_entries: int = None, max_mb: float = None) -> int:
+    """Delete least recently used entries beyond the count/size bounds; returns rows removed."""
+    max_entries = TRANSCRIPT_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+    max_bytes = (TRANSCRIPT_CACHE_MAX_MB if max_mb is None else max_mb) * 1024 * 1024
+
+    count, size = db.query(func.count(models.TranscriptCache.id),
+                           func.coalesce(func.sum(models.TranscriptCache.size_bytes), 0)).one()
+    if count <= max_entries and size <= max_bytes:
+        return 0
+
+    doomed = []
+    rows = (db.query(models.TranscriptCache.id, models.TranscriptCache.size_bytes)
+              .order_by(models.TranscriptCache.last_used_at.asc(), models.TranscriptCache.id.asc()))
+    for entry_id, nbytes in rows:
+        if count <= max_entries and size <= max_bytes:
+            break
+        doomed.append(entry_id)
+        count -= 1
+        size -= nbytes or 0
+    db.query(models.TranscriptCache).filter(models.TranscriptCache.id.in_(doomed)).delete(synchronize_session=False)
+    db.commit()
+    metrics.incr("transcript_cache", "evicted", len(doomed))
+    return len(doomed)
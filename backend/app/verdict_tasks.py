@@ -3,6 +3,8 @@ from .celery_app import celery_app
 from .db import SessionLocal
 from . import models
 from .verdicts import generate_verdict
+from .claim_index import reuse_verdict
+from .rerank import evidence_for_verdict
 
 @celery_app.task(name="verdicts.generate_for_claim")
 def generate_for_claim(claim_id: int):
@@ -11,11 +13,14 @@ def generate_for_claim(claim_id: int):
         claim = db.get(models.Claim, claim_id)
         if not claim:
             return {"ok": False, "reason": "no_claim"}
-        # fetch top evidence already sorted by similarity desc (nulls last)
-        evs = (db.query(models.Evidence)
-                 .filter(models.Evidence.claim_id == claim_id)
-                 .order_by(models.Evidence.similarity.desc().nullslast())
-                 .limit(10).all())
+        # evidence copied from a near-identical claim? reuse its fresh verdict too
+        v = reuse_verdict(db, claim)
+        if v:
+            return {"ok": True, "label": v.label, "confidence": v.confidence,
+                    "reused_from": claim.reused_from_claim_id}
+        # top evidence by similarity, or the few best by cross-encoder score with RERANK=on
+        # (scored per video by evidence.check_video; unscored rows are scored here)
+        evs = evidence_for_verdict(db, claim_id)
         rows = [{"title": e.title or "", "url": e.url or "", "snippet": e.snippet or ""} for e in evs]
         out = generate_verdict(claim.canonical_text or claim.claim_text, rows)
         v = models.Verdict(
@@ -29,3 +34,15 @@ def generate_for_claim(claim_id: int):
         return {"ok": True, "label": v.label, "confidence": v.confidence}
     finally:
         db.close()
+
+@celery_app.task(name="verdicts.generate_for_video")
+def generate_for_video(video_id: int):
+    # one verdict task per claim, queued once the video's evidence is in
+    db = SessionLocal()
+    try:
+        claim_ids = [cid for (cid,) in db.query(models.Claim.id).filter(models.Claim.video_id == video_id)]
+    finally:
+        db.close()
+    for cid in claim_ids:
+        generate_for_claim.delay(cid)
+    return {"ok": True, "queued": len(claim_ids)}
@@ -0,0 +1,5 @@
+"""
+Benchmarks for AdVeritas backend hot paths.
+
+Run from backend/ with `python -m benchmarks.<name> --help`.
+"""
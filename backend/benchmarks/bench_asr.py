@@ -0,0 +1,79 @@
+"""
+ASR benchmark: wall-clock and word error rate of each ASR_MODE.
+
+    python -m benchmarks.bench_asr audio.mp3 [--reference ref.txt] [--modes single,batched,chunked]
+                                             [--preview-model tiny]
+
+Without --reference, the single-pass transcript is the reference, so the
+WER column shows how much chunking/batching changes the output.
+--preview-model adds a row for the first pass of ASR_TWO_PASS (time to a
+usable preview transcript, and its WER against the full model).
+"""
+import argparse
+import os
+import re
+import time
+from typing import List
+
+
+def words(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+
+def wer(ref: List[str], hyp: List[str]) -> float:
+    """Word error rate via Levenshtein distance over words."""
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        cur = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (r != h))
+        prev = cur
+    return prev[-1] / len(ref)
+
+
+def run(path: str, mode: str, model_name: str = None):
+    from app import asr
+
+    # each mode needs its own model configuration (num_workers for chunked)
+    asr.ASR_MODE = mode
+    asr._models.clear()
+    asr.get_model(model_name)
+
+    t0 = time.perf_counter()
+    segs = list(asr.iter_transcribe_file(path, mode=mode, model_name=model_name))
+    return time.perf_counter() - t0, " ".join(t for _, _, t in segs), len(segs)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("audio")
+    ap.add_argument("--reference", help="text file with the reference transcript")
+    ap.add_argument("--modes", default="single,batched,chunked")
+    ap.add_argument("--preview-model", help="also time this model in single mode (e.g. tiny)")
+    args = ap.parse_args()
+
+    ref = None
+    if args.reference:
+        with open(args.reference) as f:
+            ref = words(f.read())
+
+    print(f"cpu_count={os.cpu_count()}  model={os.getenv('WHISPER_MODEL', 'base')}")
+    print(f"{'mode':<10}{'seconds':>10}{'speedup':>10}{'segments':>10}{'WER':>8}")
+    base = None
+    for mode in args.modes.split(","):
+        secs, text, n = run(args.audio, mode)
+        if base is None:
+            base = secs
+            if ref is None:
+                ref = words(text)
+        print(f"{mode:<10}{secs:>10.1f}{base / secs:>10.2f}{n:>10}{wer(ref, words(text)):>8.3f}")
+    if args.preview_model:
+        secs, text, n = run(args.audio, "single", args.preview_model)
+        label = f"preview:{args.preview_model}"
+        print(f"{label:<10}{secs:>10.1f}{base / secs:>10.2f}{n:>10}{wer(ref, words(text)):>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
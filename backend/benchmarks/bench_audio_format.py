@@ -0,0 +1,68 @@
+"""
+Stored-audio format benchmark: size and time-to-samples of mp3 / flac / wav,
+and of the memory-mapped .npy decode cache.
+
+    python -m benchmarks.bench_audio_format audio_file [--repeat 3]
+
+The input is converted to 16 kHz mono in each format with ffmpeg (as ingest
+does), then each file is loaded the way ASR workers load it
+(audio_cache.load_audio). The npy row is the cost of a cache hit: opening
+the memory map and touching every page.
+"""
+import argparse
+import os
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+
+CODECS = {
+    "mp3": ["-f", "mp3"],
+    "flac": ["-f", "flac"],
+    "wav": ["-f", "wav", "-c:a", "pcm_s16le"],
+}
+
+
+def best_of(repeat: int, fn):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("audio")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    from app.audio_cache import load_audio, SAMPLE_RATE
+
+    with tempfile.TemporaryDirectory() as td:
+        rows = []
+        for fmt, codec in CODECS.items():
+            path = os.path.join(td, f"audio.{fmt}")
+            subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-i", args.audio,
+                            "-ac", "1", "-ar", str(SAMPLE_RATE), *codec, path], check=True)
+            secs, audio = best_of(args.repeat, lambda: load_audio(path))
+            rows.append((fmt, os.path.getsize(path), secs, len(audio)))
+
+        npy = os.path.join(td, "audio.npy")
+        np.save(npy, np.asarray(audio, dtype=np.float32))
+        secs, _ = best_of(args.repeat, lambda: float(np.load(npy, mmap_mode="c").sum()))
+        rows.append(("npy(mmap)", os.path.getsize(npy), secs, len(audio)))
+
+        minutes = rows[0][3] / SAMPLE_RATE / 60
+        base = rows[0][2]
+        print(f"audio={minutes:.1f} min  repeat={args.repeat}  best run shown")
+        print(f"{'format':<11}{'MB':>9}{'MB/min':>9}{'load s':>9}{'vs mp3':>9}")
+        for fmt, size, secs, _ in rows:
+            mb = size / 1024 / 1024
+            print(f"{fmt:<11}{mb:>9.1f}{mb / minutes:>9.2f}{secs:>9.3f}{base / secs:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
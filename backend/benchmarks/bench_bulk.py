@@ -0,0 +1,95 @@
+"""
+Bulk write benchmark: rows/sec of the ORM path vs multi-row INSERT vs binary COPY.
+
+    DATABASE_URL=postgresql+psycopg://... python -m benchmarks.bench_bulk [--rows 5000] [--repeat 3]
+
+Writes segments, claims (with 384-dim embeddings) and evidence (with
+embeddings) for a scratch video inside a transaction that is rolled back,
+so the database is left unchanged. COPY is skipped on non-PostgreSQL URLs.
+"""
+import argparse
+import time
+
+import numpy as np
+
+
+def orm_write(db, model, rows):
+    db.add_all([model(**r) for r in rows])
+    db.flush()
+
+
+def insert_write(db, model, rows):
+    from app import bulk
+    bulk.BULK_COPY = False
+    try:
+        bulk.insert_rows(db, model, rows, return_ids=True)
+    finally:
+        bulk.BULK_COPY = True
+
+
+def copy_write(db, model, rows):
+    from app import bulk
+    bulk.insert_rows(db, model, rows, return_ids=True)
+
+
+def make_rows(n: int, video_id: int, claim_id: int):
+    rng = np.random.default_rng(0)
+    vecs = rng.random((n, 384), dtype=np.float32)
+    return {
+        "segments": [dict(video_id=video_id, t_start=float(i), t_end=float(i + 1),
+                          text=f"segment number {i} of the benchmark transcript") for i in range(n)],
+        "claims": [dict(video_id=video_id, claim_text=f"claim {i}", canonical_text=f"claim {i}",
+                        embedding=vecs[i]) for i in range(n)],
+        "evidence": [dict(claim_id=claim_id, source="wikipedia", title=f"t{i}", url=f"https://x/{i}",
+                          snippet="lorem ipsum " * 40, similarity=0.5, embedding=vecs[i]) for i in range(n)],
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=5000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    from app.db import SessionLocal
+    from app import bulk, models
+
+    db = SessionLocal()
+    try:
+        v = models.Video(source_url="bench://bulk", status="BENCH")
+        db.add(v)
+        db.flush()
+        c = models.Claim(video_id=v.id, claim_text="bench")
+        db.add(c)
+        db.flush()
+
+        methods = [("orm", orm_write), ("insert", insert_write)]
+        if bulk._use_copy(db):
+            methods.append(("copy", copy_write))
+        tables = {"segments": models.Segment, "claims": models.Claim, "evidence": models.Evidence}
+
+        print(f"rows={args.rows}  repeat={args.repeat}  best run shown")
+        print(f"{'table':<10}{'method':<8}{'rows/sec':>12}{'speedup':>10}")
+        for name, model in tables.items():
+            base = None
+            for label, fn in methods:
+                best = float("inf")
+                for _ in range(args.repeat):
+                    rows = make_rows(args.rows, v.id, c.id)[name]
+                    if label == "orm":
+                        for r in rows:
+                            if "embedding" in r:
+                                r["embedding"] = r["embedding"].tolist()
+                    t0 = time.perf_counter()
+                    fn(db, model, rows)
+                    best = min(best, time.perf_counter() - t0)
+                rate = args.rows / best
+                base = base or rate
+                print(f"{name:<10}{label:<8}{rate:>12,.0f}{rate / base:>10.2f}")
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Reranker throughput benchmark: (claim, snippet) pairs/sec of the
+cross-encoder per batch size, next to the bi-encoder it complements.
+
+    python -m benchmarks.bench_rerank [--claims 50] [--per-claim 10] [--batch-sizes 8,32,64] [--repeat 3]
+
+A video's evidence is simulated as --claims claims with --per-claim
+snippets each (~80 words, like summaries and passages), scored in one
+batched pass as rerank_video does. The bi-encoder row embeds the same
+claims and snippets (store_evidence's cost). The last lines show the
+evidence characters per verdict prompt before (top 10 by similarity) and
+after (RERANK_TOPK by rerank score).
+"""
+import argparse
+import random
+import time
+
+WORDS = ("the city river bridge tower population government election president minister "
+         "company revenue percent million billion year built opened founded capital country "
+         "war treaty law court report study data climate energy oil price market").split()
+
+
+def sentence(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+
+def best_of(repeat: int, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--claims", type=int, default=50)
+    ap.add_argument("--per-claim", type=int, default=10)
+    ap.add_argument("--batch-sizes", default="8,32,64")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    from app import rerank
+    from app.embeddings import embed_texts
+
+    rng = random.Random(0)
+    claims = [sentence(rng, 14) for _ in range(args.claims)]
+    snippets = [[sentence(rng, 80) for _ in range(args.per_claim)] for _ in claims]
+    pairs = [(c, s) for c, ss in zip(claims, snippets) for s in ss]
+
+    rerank.score_pairs(pairs[:8])  # load the model outside the timings
+    embed_texts(claims[:2])
+
+    print(f"model={rerank.RERANK_MODEL}  max_length={rerank.RERANK_MAX_LENGTH}  "
+          f"pairs={len(pairs)}  repeat={args.repeat}  best run shown")
+    print(f"{'stage':<22}{'batch':>7}{'secs':>9}{'pairs/s':>10}{'ms/claim':>10}")
+    for bs in (int(x) for x in args.batch_sizes.split(",")):
+        secs = best_of(args.repeat, lambda: rerank.score_pairs(pairs, batch_size=bs))
+        print(f"{'cross-encoder':<22}{bs:>7}{secs:>9.2f}{len(pairs) / secs:>10.0f}"
+              f"{secs / args.claims * 1000:>10.1f}")
+
+    texts = claims + [s for ss in snippets for s in ss]
+    secs = best_of(args.repeat, lambda: embed_texts(texts))
+    print(f"{'bi-encoder (embed)':<22}{'-':>7}{secs:>9.2f}{len(pairs) / secs:>10.0f}"
+          f"{secs / args.claims * 1000:>10.1f}")
+
+    before = sum(len(s) for ss in snippets for s in ss[:rerank.VERDICT_EVIDENCE_LIMIT]) / args.claims
+    after = sum(len(s) for ss in snippets for s in ss[:rerank.RERANK_TOPK]) / args.claims
+    print(f"evidence chars per verdict prompt: {before:.0f} -> {after:.0f} (RERANK_TOPK={rerank.RERANK_TOPK})")
+
+
+if __name__ == "__main__":
+    main()
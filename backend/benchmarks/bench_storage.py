@@ -0,0 +1,82 @@
+"""
+Storage throughput benchmark: large media upload/download against the
+configured backend (MinIO by default, STORAGE_BACKEND=local for a directory).
+
+    docker compose up -d minio
+    MINIO_ENDPOINT=http://localhost:9000 python -m benchmarks.bench_storage --size-mb 256 --concurrency 1,4,8
+
+For each S3_MAX_CONCURRENCY value, one --size-mb file of random bytes is
+sent with upload_file (TransferConfig multipart), read back with
+download_file, and sent again with upload_stream (sequential parts, as
+streaming ingest does). The last line times --small small uploads, which is
+where the per-process bucket check used to cost a list_buckets round trip
+per call. Objects are written under bench/ and deleted afterwards.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from boto3.s3.transfer import TransferConfig
+
+from app import storage
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def delete(keys):
+    for key in keys:
+        try:
+            if isinstance(storage.s3, storage.LocalS3):
+                os.remove(storage.s3._path(storage.S3_BUCKET, key))
+            else:
+                storage.s3.delete_object(Bucket=storage.S3_BUCKET, Key=key)
+        except Exception:
+            pass
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--size-mb", type=float, default=256)
+    ap.add_argument("--concurrency", default="1,4,8")
+    ap.add_argument("--small", type=int, default=200)
+    args = ap.parse_args()
+
+    size = int(args.size_mb * 1024 * 1024)
+    mb = size / 1024 / 1024
+    keys = ["bench/file.bin", "bench/stream.bin"] + [f"bench/small/{i}" for i in range(args.small)]
+    print(f"backend={storage.STORAGE_BACKEND}  size={mb:g} MB  part={storage.S3_PART_SIZE // 1024 // 1024} MB  "
+          f"pool={storage.S3_MAX_POOL_CONNECTIONS}")
+    print(f"{'conc':>6}{'upload MB/s':>14}{'download MB/s':>15}{'stream MB/s':>13}")
+
+    with tempfile.TemporaryDirectory() as td:
+        src, dst = os.path.join(td, "src.bin"), os.path.join(td, "dst.bin")
+        with open(src, "wb") as f:
+            for _ in range(0, size, 1024 * 1024):
+                f.write(os.urandom(min(1024 * 1024, size - f.tell())))
+        try:
+            for c in (int(x) for x in args.concurrency.split(",")):
+                storage.TRANSFER_CONFIG = TransferConfig(
+                    multipart_threshold=storage.S3_MULTIPART_THRESHOLD,
+                    multipart_chunksize=storage.S3_PART_SIZE,
+                    max_concurrency=c, use_threads=c > 1,
+                )
+                up = timed(lambda: storage.upload_file("bench/file.bin", src))
+                down = timed(lambda: storage.download_file("bench/file.bin", dst))
+                assert os.path.getsize(dst) == size
+                with open(src, "rb") as f:
+                    stream = timed(lambda: storage.upload_stream("bench/stream.bin", f))
+                print(f"{c:>6}{mb / up:>14.1f}{mb / down:>15.1f}{mb / stream:>13.1f}")
+
+            secs = timed(lambda: [storage.upload_bytes(k, b"x", "text/plain") for k in keys[2:]])
+            print(f"small uploads: {args.small / secs:.0f}/s ({secs / max(args.small, 1) * 1000:.1f} ms each)")
+        finally:
+            delete(keys)
+
+
+if __name__ == "__main__":
+    main()
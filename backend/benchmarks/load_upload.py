@@ -0,0 +1,106 @@
+"""
+Upload load test: concurrent large file uploads against one API process,
+while a prober measures /health latency (event-loop responsiveness).
+
+    uvicorn app.main:app --workers 1 &
+    python -m benchmarks.load_upload --url http://localhost:8000 --concurrency 1,4,16,32 --size-mb 100
+
+For each concurrency level, `concurrency` clients upload a random
+--size-mb file to POST /videos/ingest at the same time. Reported: upload
+throughput, per-upload latency, and p50/p99 of /health pings sent every
+50 ms during the uploads. Watch the API's RSS (e.g. `ps -o rss`) alongside:
+with streaming uploads it stays flat as concurrency grows.
+
+Every upload creates a Video row and queues a pipeline task; point it at a
+scratch deployment.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+
+class RandomBody:
+    """Async iterator of `size` random bytes in 1 MB chunks (nothing held in memory)."""
+
+    def __init__(self, size: int):
+        self.size = size
+
+    async def __aiter__(self):
+        left = self.size
+        while left > 0:
+            n = min(left, 1024 * 1024)
+            left -= n
+            yield os.urandom(n)
+
+
+async def upload(client, url: str, size: int) -> float:
+    boundary = "loadtestboundary"
+    head = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"load.mp3\"\r\n"
+            f"Content-Type: audio/mpeg\r\n\r\n").encode()
+    tail = f"\r\n--{boundary}--\r\n".encode()
+
+    async def body():
+        yield head
+        async for chunk in RandomBody(size):
+            yield chunk
+        yield tail
+
+    t0 = time.perf_counter()
+    r = await client.post(
+        f"{url}/videos/ingest", content=body(),
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}",
+                 "Content-Length": str(len(head) + size + len(tail))},
+    )
+    r.raise_for_status()
+    return time.perf_counter() - t0
+
+
+async def probe(client, url: str, stop: asyncio.Event, out: list):
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        try:
+            await client.get(f"{url}/health")
+            out.append(time.perf_counter() - t0)
+        except Exception:
+            out.append(float("inf"))
+        await asyncio.sleep(0.05)
+
+
+async def run_level(url: str, concurrency: int, size: int):
+    import httpx
+
+    timeout = httpx.Timeout(None)
+    async with httpx.AsyncClient(timeout=timeout) as uploader, httpx.AsyncClient(timeout=timeout) as prober:
+        stop, pings = asyncio.Event(), []
+        probe_task = asyncio.create_task(probe(prober, url, stop, pings))
+        t0 = time.perf_counter()
+        durations = await asyncio.gather(*[upload(uploader, url, size) for _ in range(concurrency)])
+        wall = time.perf_counter() - t0
+        stop.set()
+        await probe_task
+
+    pings.sort()
+    p = lambda q: pings[min(len(pings) - 1, int(q * len(pings)))] * 1000 if pings else float("nan")
+    mb = concurrency * size / 1024 / 1024
+    print(f"{concurrency:>6}{mb / wall:>12.1f}{statistics.mean(durations):>12.1f}{max(durations):>10.1f}"
+          f"{p(0.5):>12.1f}{p(0.99):>12.1f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--url", default="http://localhost:8000")
+    ap.add_argument("--concurrency", default="1,4,16")
+    ap.add_argument("--size-mb", type=float, default=100)
+    args = ap.parse_args()
+
+    size = int(args.size_mb * 1024 * 1024)
+    print(f"upload size={args.size_mb:g} MB")
+    print(f"{'conc':>6}{'MB/s':>12}{'mean s':>12}{'max s':>10}{'health p50':>12}{'health p99':>12}")
+    for c in (int(x) for x in args.concurrency.split(",")):
+        asyncio.run(run_level(args.url, c, size))
+
+
+if __name__ == "__main__":
+    main()
@@ -36,6 +36,22 @@ def db_session(db_engine):
     session.close()
 
 
+@pytest.fixture
+def db(db_engine):
+    """
+    Database session for code under test that commits.
+    
+    Committed rows outlive a rollback, so every table is emptied afterwards.
+    """
+    session = sessionmaker(bind=db_engine)()
+    yield session
+    session.rollback()
+    for table in reversed(Base.metadata.sorted_tables):
+        session.execute(table.delete())
+    session.commit()
+    session.close()
+
+
 @pytest.fixture
 def sample_video(db_session):
     """Create a sample video for testing."""
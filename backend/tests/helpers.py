@@ -0,0 +1,54 @@
+"""
+Fakes shared by several test modules.
+"""
+import zlib
+
+import numpy as np
+
+TOPICS = ["tower", "bridge", "river"]
+
+
+def fake_embed(texts):
+    """One axis per topic word, so sentences about the same thing are identical vectors."""
+    X = np.zeros((len(texts), 384), dtype=np.float32)
+    for i, t in enumerate(texts):
+        hits = [j for j, w in enumerate(TOPICS) if w in t.lower()] or [len(TOPICS) + i]
+        X[i, hits[0]] = 1.0
+    return X
+
+
+def hashed_embed(texts):
+    """Deterministic bag-of-words embedding (no model download)."""
+    X = np.zeros((len(texts), 384), dtype=np.float32)
+    for i, t in enumerate(texts):
+        for w in t.lower().replace(",", " ").replace(".", " ").split():
+            X[i, zlib.crc32(w.encode()) % 384] += 1
+    return X / np.maximum(np.linalg.norm(X, axis=1, keepdims=True), 1e-9)
+
+
+class FakeS3:
+    """In-memory stand-in for the multipart upload calls of the S3 client."""
+
+    def __init__(self, fail_on_part=None):
+        self.parts = {}
+        self.completed = None
+        self.aborted = False
+        self.fail_on_part = fail_on_part
+
+    def head_bucket(self, **kw):
+        return {}
+
+    def create_multipart_upload(self, **kw):
+        return {"UploadId": "u1"}
+
+    def upload_part(self, PartNumber, Body, **kw):
+        if PartNumber == self.fail_on_part:
+            raise IOError("network down")
+        self.parts[PartNumber] = Body
+        return {"ETag": f"e{PartNumber}"}
+
+    def complete_multipart_upload(self, MultipartUpload, **kw):
+        self.completed = MultipartUpload["Parts"]
+
+    def abort_multipart_upload(self, **kw):
+        self.aborted = True
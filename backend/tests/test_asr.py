@@ -0,0 +1,291 @@
+"""
+Tests for incremental transcript persistence.
+"""
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import asr, models
+
+
+@pytest.fixture
+def Session(db_engine, monkeypatch):
+    Session = sessionmaker(bind=db_engine)
+    monkeypatch.setattr(asr, "SessionLocal", Session)
+    return Session
+
+
+@pytest.fixture
+def video(Session):
+    db = Session()
+    v = models.Video(source_url="u", status="QUEUED", duration=10.0)
+    db.add(v)
+    db.commit()
+    yield v.id
+    db.query(models.Segment).filter(models.Segment.video_id == v.id).delete()
+    db.query(models.Video).filter(models.Video.id == v.id).delete()
+    db.commit()
+    db.close()
+
+
+def fake_decoder(segments, seen):
+    def iter_transcribe_s3(s3_key, start=0.0, **model_kw):
+        seen.append(start)
+        for seg in segments:
+            if seg[1] > start:
+                yield seg
+    return iter_transcribe_s3
+
+
+class TestTranscribeToDb:
+    """Tests for batched segment flushing while ASR runs."""
+
+    def test_flushes_in_batches_with_progress(self, Session, video, monkeypatch):
+        """Test segments are committed batch by batch with audio_processed advancing."""
+        segs = [(float(i), float(i + 1), f"s{i}") for i in range(5)]
+        monkeypatch.setattr(asr, "iter_transcribe_s3", fake_decoder(segs, []))
+
+        progress = []
+        def on_batch(rows):
+            db = Session()
+            progress.append((len(rows), db.get(models.Video, video).audio_processed))
+            db.close()
+
+        n = asr.transcribe_to_db(video, "k", on_batch=on_batch, flush_segments=2)
+        assert n == 5
+        assert progress == [(2, 2.0), (2, 4.0), (1, 5.0)]
+
+        db = Session()
+        v = db.get(models.Video, video)
+        assert v.status == "TRANSCRIBED"
+        assert v.progress == 1.0
+        db.close()
+
+    def test_resumes_after_last_segment(self, Session, video, monkeypatch):
+        """Test a retried task continues from the last persisted segment."""
+        db = Session()
+        db.add(models.Segment(video_id=video, t_start=0.0, t_end=1.0, text="s0"))
+        db.commit()
+        db.close()
+
+        seen = []
+        segs = [(0.0, 1.0, "s0"), (1.0, 2.0, "s1")]
+        monkeypatch.setattr(asr, "iter_transcribe_s3", fake_decoder(segs, seen))
+
+        assert asr.transcribe_to_db(video, "k") == 2
+        assert seen == [1.0]
+        db = Session()
+        texts = [s.text for s in db.query(models.Segment).filter_by(video_id=video).order_by(models.Segment.t_start)]
+        assert texts == ["s0", "s1"]
+        db.close()
+
+    def test_preview_pass(self, Session, video, monkeypatch):
+        """Test the preview pass decodes with the preview model and its own status."""
+        kw = []
+        def decoder(s3_key, start=0.0, **model_kw):
+            kw.append(model_kw)
+            yield (0.0, 1.0, "s0")
+        monkeypatch.setattr(asr, "iter_transcribe_s3", decoder)
+
+        assert asr.transcribe_to_db(video, "k", preview=True) == 1
+        assert kw == [{"model_name": asr.ASR_PREVIEW_MODEL, "compute_type": asr.ASR_PREVIEW_COMPUTE_TYPE}]
+        db = Session()
+        assert db.get(models.Video, video).status == "PREVIEW_TRANSCRIBED"
+        db.close()
+
+    def test_no_speech(self, Session, video, monkeypatch):
+        """Test empty audio stores the placeholder and NO_SPEECH status."""
+        monkeypatch.setattr(asr, "iter_transcribe_s3", fake_decoder([], []))
+        assert asr.transcribe_to_db(video, "k") == 0
+        db = Session()
+        assert db.get(models.Video, video).status == "NO_SPEECH"
+        db.close()
+
+
+class TestPlanChunks:
+    """Tests for VAD-aligned chunk planning."""
+
+    def test_cuts_in_silence_midpoints(self):
+        """Test chunks are contiguous and cut halfway through silences."""
+        speech = [{"start": 0, "end": 40}, {"start": 50, "end": 90}, {"start": 110, "end": 150}]
+        assert asr.plan_chunks(speech, total=160, target=60) == [(0, 45), (45, 100), (100, 160)]
+
+    def test_merges_short_regions(self):
+        """Test regions are grouped until the target length is reached."""
+        speech = [{"start": 0, "end": 10}, {"start": 20, "end": 30}, {"start": 40, "end": 50}]
+        assert asr.plan_chunks(speech, total=60, target=100) == [(0, 60)]
+
+    def test_long_region_not_split(self):
+        """Test a speech region longer than the target stays whole."""
+        speech = [{"start": 0, "end": 500}, {"start": 510, "end": 520}]
+        assert asr.plan_chunks(speech, total=600, target=100) == [(0, 505), (505, 600)]
+
+    def test_resume_offset(self):
+        """Test planning starts at the resume offset and skips earlier speech."""
+        speech = [{"start": 0, "end": 40}, {"start": 50, "end": 90}, {"start": 110, "end": 150}]
+        assert asr.plan_chunks(speech, total=160, target=60, start=95) == [(95, 160)]
+
+    def test_no_speech(self):
+        """Test no chunks are planned when VAD finds nothing."""
+        assert asr.plan_chunks([], total=100, target=10) == []
+
+
+class TestTranscribeChunk:
+    """Tests for stitching chunk-local timestamps back to global time."""
+
+    def test_offsets_segments_by_chunk_start(self):
+        """Test segment times are shifted by the chunk offset."""
+        class FakeModel:
+            def transcribe(self, audio, **kwargs):
+                assert len(audio) == asr.SAMPLE_RATE * 2
+                return iter([asr._Seg(0.5, 1.5, " hi")]), None
+
+        audio = [0.0] * (asr.SAMPLE_RATE * 10)
+        lo = asr.SAMPLE_RATE * 4
+        segs = asr._transcribe_chunk(FakeModel(), audio, lo, lo + asr.SAMPLE_RATE * 2)
+        assert segs == [asr._Seg(4.5, 5.5, " hi")]
+
+
+class TestResume:
+    """Tests for decoding from a resume offset."""
+
+    def test_resume_slices_audio_and_keeps_vad(self):
+        """Test a resumed decode runs VAD on the remaining samples with global timestamps."""
+        class FakeModel:
+            def __init__(self):
+                self.calls = []
+
+            def transcribe(self, audio, **kw):
+                self.calls.append((len(audio), kw))
+                return iter([asr._Seg(0.5, 1.5, " hi")]), None
+
+        model = FakeModel()
+        audio = [0.0] * (asr.SAMPLE_RATE * 10)
+        vad = {"vad_filter": True, "vad_parameters": {"onset": 0.5}}
+        segs = list(asr._iter_whisper(model, audio, start=4.0, vad=vad))
+        assert segs == [asr._Seg(4.5, 5.5, " hi")]
+        n, kw = model.calls[0]
+        assert n == asr.SAMPLE_RATE * 6
+        assert kw["vad_filter"] is True and "clip_timestamps" not in kw
+
+
+class TestReuseSpeechRegions:
+    """Tests for decoding the regions found by analyze_speech without a second VAD pass."""
+
+    class FakeModel:
+        def __init__(self, segs):
+            self.segs = segs
+            self.calls = []
+
+        def transcribe(self, audio, **kw):
+            self.calls.append((len(audio), kw))
+            return iter(self.segs), None
+
+    def vad(self, *regions):
+        sr = asr.SAMPLE_RATE
+        return {"path": "vad", "vad_filter": True, "vad_parameters": {"onset": 0.5},
+                "speech": [{"start": int(a * sr), "end": int(b * sr)} for a, b in regions]}
+
+    def test_decodes_speech_only(self):
+        """Test only the speech samples are decoded, without VAD, at their original times."""
+        model = self.FakeModel([asr._Seg(0.5, 1.0, " a"), asr._Seg(2.2, 2.8, " b")])
+        audio = [0.0] * (asr.SAMPLE_RATE * 10)
+        segs = list(asr._iter_whisper(model, audio, vad=self.vad((2, 4), (6, 7))))
+        assert segs == [asr._Seg(2.5, 3.0, " a"), asr._Seg(6.2, 6.8, " b")]
+        n, kw = model.calls[0]
+        assert n == asr.SAMPLE_RATE * 3
+        assert kw["vad_filter"] is False
+
+    def test_resume_and_chunks_clip_regions(self):
+        """Test a resumed decode and a chunk only see the regions inside them."""
+        model = self.FakeModel([asr._Seg(0.5, 0.9, " b")])
+        audio = [0.0] * (asr.SAMPLE_RATE * 10)
+        vad = self.vad((2, 4), (6, 7))
+        assert list(asr._iter_whisper(model, audio, start=5.0, vad=vad)) == [asr._Seg(6.5, 6.9, " b")]
+        assert model.calls[0][0] == asr.SAMPLE_RATE
+
+        sr = asr.SAMPLE_RATE
+        assert asr._transcribe_chunk(model, audio, 3 * sr, 8 * sr, vad) == [asr._Seg(3.5, 3.9, " b")]
+        assert model.calls[1][0] == asr.SAMPLE_RATE * 2
+
+    def test_no_speech_left(self):
+        """Test a resume past the last speech region decodes nothing."""
+        model = self.FakeModel([asr._Seg(0.0, 1.0, " la")])
+        audio = [0.0] * (asr.SAMPLE_RATE * 10)
+        assert list(asr._iter_whisper(model, audio, start=8.0, vad=self.vad((2, 4)))) == []
+        assert model.calls == []
+
+    def test_batched_gets_clips(self, monkeypatch):
+        """Test the batched pipeline is given the regions as clips of at most 30 s."""
+        import faster_whisper
+        calls = []
+
+        class Pipeline:
+            def __init__(self, model):
+                pass
+
+            def transcribe(self, audio, **kw):
+                calls.append(kw)
+                return iter([]), None
+        monkeypatch.setattr(faster_whisper, "BatchedInferencePipeline", Pipeline, raising=False)
+        audio = [0.0] * (asr.SAMPLE_RATE * 100)
+        list(asr._iter_batched(None, audio, self.vad((0, 5), (6, 10), (20, 90))))
+        clips = calls[0]["clip_timestamps"]
+        assert calls[0]["vad_filter"] is False
+        assert all(c["end"] - c["start"] <= 30 * asr.SAMPLE_RATE for c in clips)
+        assert clips[0]["start"] == 0 and clips[-1]["end"] == 90 * asr.SAMPLE_RATE
+
+
+class TestAnalyzeSpeech:
+    """Tests for the pre-decode VAD decision."""
+
+    @pytest.fixture
+    def vad_calls(self, monkeypatch):
+        import faster_whisper.vad as vad
+        calls = []
+        def fake(audio, options):
+            calls.append(options.onset)
+            return [{"start": 0, "end": 100}] if options.onset <= audio["speech_at"] else []
+        monkeypatch.setattr(vad, "get_speech_timestamps", fake)
+        monkeypatch.setattr(asr, "ASR_VAD_THRESHOLDS", [0.5, 0.35, 0.2])
+        return calls
+
+    def test_default_threshold(self, vad_calls):
+        """Test clear speech keeps the default VAD settings."""
+        out = asr.analyze_speech({"speech_at": 0.9})
+        assert out["path"] == "vad"
+        assert out["vad_parameters"] == {"onset": 0.5}
+        assert vad_calls == [0.5]
+
+    def test_relaxed_threshold(self, vad_calls):
+        """Test quiet speech lowers the threshold instead of dropping VAD."""
+        out = asr.analyze_speech({"speech_at": 0.3})
+        assert out["path"] == "vad_relaxed"
+        assert out["vad_parameters"] == {"onset": 0.2}
+
+    def test_no_vad(self, vad_calls):
+        """Test audio where VAD never fires is decoded without VAD, once."""
+        out = asr.analyze_speech({"speech_at": 0.0})
+        assert out["path"] == "no_vad"
+        assert out["vad_filter"] is False
+        assert vad_calls == [0.5, 0.35, 0.2]
+
+    def test_batched_no_vad_uses_sequential_decode(self, monkeypatch):
+        """Test batched mode decodes no-VAD audio without the batched pipeline."""
+        import faster_whisper
+
+        class FakeModel:
+            def __init__(self):
+                self.calls = []
+
+            def transcribe(self, audio, **kw):
+                self.calls.append(kw)
+                return iter([asr._Seg(0.0, 1.0, " la")]), None
+
+        def pipeline(model):
+            raise AssertionError("batched pipeline used without clip timestamps")
+        monkeypatch.setattr(faster_whisper, "BatchedInferencePipeline", pipeline, raising=False)
+        model = FakeModel()
+        vad = {"path": "no_vad", "vad_filter": False, "vad_parameters": None, "speech": []}
+        segs = list(asr._iter_batched(model, [0.0] * (asr.SAMPLE_RATE * 40), vad))
+        assert segs == [asr._Seg(0.0, 1.0, " la")]
+        assert model.calls[0]["vad_filter"] is False
@@ -0,0 +1,118 @@
+"""
+Tests for the decoded-audio cache.
+"""
+import os
+import struct
+import wave
+
+import numpy as np
+import pytest
+
+from app import audio_cache, media_cache, storage
+
+
+def write_wav(path, samples, rate=16000, streamed=False):
+    pcm = (np.asarray(samples) * 32767).astype("<i2").tobytes()
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(pcm)
+    if streamed:
+        # ffmpeg writing to a pipe cannot seek back to fill in the sizes
+        with open(path, "r+b") as f:
+            f.seek(4)
+            f.write(struct.pack("<I", 0xFFFFFFFF))
+            f.seek(40)
+            f.write(struct.pack("<I", 0xFFFFFFFF))
+
+
+class TestReadWav:
+    """Tests for the WAV fast path."""
+
+    @pytest.mark.parametrize("streamed", [False, True])
+    def test_reads_pcm16(self, tmp_path, streamed):
+        """Test 16 kHz mono PCM is read as float32, with or without real chunk sizes."""
+        samples = np.linspace(-0.5, 0.5, 1600)
+        write_wav(tmp_path / "a.wav", samples, streamed=streamed)
+        audio = audio_cache.read_wav_pcm16(str(tmp_path / "a.wav"))
+        assert audio.dtype == np.float32 and len(audio) == 1600
+        np.testing.assert_allclose(audio, samples, atol=1e-4)
+
+    def test_other_formats_fall_through(self, tmp_path):
+        """Test non-16 kHz WAVs and non-WAV files are left to the generic decoder."""
+        write_wav(tmp_path / "b.wav", np.zeros(100), rate=44100)
+        (tmp_path / "c.mp3").write_bytes(b"ID3 not a wav")
+        assert audio_cache.read_wav_pcm16(str(tmp_path / "b.wav")) is None
+        assert audio_cache.read_wav_pcm16(str(tmp_path / "c.mp3")) is None
+
+
+class TestLoadS3Audio:
+    """Tests for the memory-mapped decode cache."""
+
+    @pytest.fixture
+    def s3(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(audio_cache, "AUDIO_CACHE_DIR", str(tmp_path / "cache"))
+        monkeypatch.setattr(media_cache, "MEDIA_CACHE_DIR", str(tmp_path / "media"))
+        objects = {"media/1.wav": (np.linspace(-0.1, 0.1, 3200), "etag1")}
+        downloads = []
+
+        def download_file(key, local):
+            downloads.append(key)
+            write_wav(local, objects[key][0])
+        monkeypatch.setattr(storage, "download_file", download_file)
+        monkeypatch.setattr(storage, "head_etag", lambda key: objects[key][1])
+        return objects, downloads
+
+    def test_decodes_once_then_maps(self, s3):
+        """Test the second load reuses the cached file without downloading."""
+        objects, downloads = s3
+        first = audio_cache.load_s3_audio("media/1.wav")
+        second = audio_cache.load_s3_audio("media/1.wav")
+        assert downloads == ["media/1.wav"]
+        assert isinstance(second, np.memmap)
+        np.testing.assert_array_equal(first, second)
+
+        # copy-on-write: writing to the array never touches the cache file
+        second[:10] = 1.0
+        third = audio_cache.load_s3_audio("media/1.wav")
+        assert third[0] != 1.0
+
+    def test_new_etag_misses(self, s3):
+        """Test a rewritten object is decoded again."""
+        objects, downloads = s3
+        audio_cache.load_s3_audio("media/1.wav")
+        objects["media/1.wav"] = (np.zeros(1600), "etag2")
+        assert len(audio_cache.load_s3_audio("media/1.wav")) == 1600
+        assert downloads == ["media/1.wav", "media/1.wav"]
+
+    def test_evicted_between_check_and_load(self, s3, monkeypatch):
+        """Test a file removed by another worker's evict is decoded again, not an error."""
+        objects, downloads = s3
+        first = audio_cache.load_s3_audio("media/1.wav")
+        path = audio_cache._path("media/1.wav", "etag1")
+        load = np.load
+        evicted = []
+
+        def evicted_load(p, **kw):
+            if p == path and not evicted:
+                evicted.append(p)
+                os.remove(p)
+            return load(p, **kw)
+        monkeypatch.setattr(audio_cache.np, "load", evicted_load)
+        np.testing.assert_array_equal(audio_cache.load_s3_audio("media/1.wav"), first)
+        assert evicted and os.path.exists(path)  # decoded again from the cached media
+        assert downloads == ["media/1.wav"]
+
+    def test_evicts_least_recently_used(self, tmp_path, monkeypatch):
+        """Test eviction removes the oldest files first."""
+        d = tmp_path / "cache"
+        d.mkdir()
+        monkeypatch.setattr(audio_cache, "AUDIO_CACHE_DIR", str(d))
+        for i, name in enumerate(["old", "mid", "new"]):
+            p = d / f"{name}.npy"
+            np.save(p, np.zeros(1000, dtype=np.float32))
+            os.utime(p, (1000 + i, 1000 + i))
+        size = os.path.getsize(d / "new.npy")
+        assert audio_cache.evict(max_mb=2.5 * size / (1024 * 1024)) == 1
+        assert sorted(os.listdir(d)) == ["mid.npy", "new.npy"]
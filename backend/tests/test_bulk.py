@@ -0,0 +1,79 @@
+"""
+Tests for bulk row writes.
+
+The COPY path needs PostgreSQL with pgvector: set TEST_DATABASE_URL
+(postgresql+psycopg://...) to run it; otherwise only the INSERT path runs.
+"""
+import os
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import bulk, models
+
+
+def _video(db):
+    v = models.Video(source_url="u", status="QUEUED")
+    db.add(v)
+    db.flush()
+    return v.id
+
+
+class TestInsertRows:
+    """Tests for the multi-row INSERT path."""
+
+    def test_returns_ids_in_row_order(self, db):
+        """Test ids line up with the input rows."""
+        vid = _video(db)
+        rows = [{"video_id": vid, "t_start": float(i), "t_end": float(i + 1), "text": f"s{i}"} for i in range(50)]
+        ids = bulk.insert_rows(db, models.Segment, rows, return_ids=True)
+        assert len(ids) == 50
+        got = {s.id: s.text for s in db.query(models.Segment).filter(models.Segment.id.in_(ids))}
+        assert [got[i] for i in ids] == [r["text"] for r in rows]
+
+    def test_applies_python_defaults(self, db):
+        """Test created_at and friends are filled like the ORM would."""
+        vid = _video(db)
+        (cid,) = bulk.insert_rows(db, models.Claim, [{
+            "video_id": vid, "claim_text": "c", "embedding": np.ones(384, dtype=np.float32),
+        }], return_ids=True)
+        claim = db.get(models.Claim, cid)
+        assert claim.created_at is not None
+        assert len(claim.embedding) == 384
+
+    def test_empty(self, db):
+        """Test empty input writes nothing."""
+        assert bulk.insert_rows(db, models.Segment, [], return_ids=True) == []
+        assert bulk.insert_rows(db, models.Segment, []) is None
+
+
+@pytest.mark.skipif(not os.getenv("TEST_DATABASE_URL"), reason="needs TEST_DATABASE_URL (PostgreSQL + pgvector)")
+class TestCopyRows:
+    """Tests for binary COPY against a real PostgreSQL."""
+
+    @pytest.fixture
+    def pg(self):
+        engine = create_engine(os.environ["TEST_DATABASE_URL"])
+        db = sessionmaker(bind=engine)()
+        assert bulk._use_copy(db)
+        yield db
+        db.rollback()
+        db.close()
+        engine.dispose()
+
+    def test_copy_with_vectors_and_ids(self, pg):
+        """Test COPY reserves ids in order and round-trips embeddings."""
+        vid = _video(pg)
+        vecs = np.random.default_rng(0).random((20, 384), dtype=np.float32)
+        ids = bulk.insert_rows(pg, models.Claim, [
+            {"video_id": vid, "claim_text": f"c{i}", "embedding": vecs[i]} for i in range(20)
+        ], return_ids=True)
+        bulk.insert_rows(pg, models.Evidence, [{"claim_id": ids[0], "snippet": "e", "embedding": vecs[0]}])
+
+        claims = {c.id: c for c in pg.query(models.Claim).filter(models.Claim.id.in_(ids))}
+        assert [claims[i].claim_text for i in ids] == [f"c{i}" for i in range(20)]
+        np.testing.assert_allclose(claims[ids[3]].embedding, vecs[3])
+        assert claims[ids[0]].created_at is not None
+        assert pg.query(models.Evidence).filter_by(claim_id=ids[0]).count() == 1
@@ -0,0 +1,144 @@
+"""
+Unit tests for the two-tier (LRU -> Redis) cache.
+"""
+import pytest
+import redis
+from app import cache as cache_mod, metrics
+from app.cache import LRU, TwoTierCache, digest
+
+
+class FakeRedis:
+    """Minimal in-memory stand-in for the redis client calls the cache makes."""
+
+    def __init__(self):
+        self.kv = {}
+        self.hashes = {}
+
+    def mget(self, keys):
+        return [self.kv.get(k) for k in keys]
+
+    def set(self, key, value, ex=None):
+        self.kv[key] = value.encode() if isinstance(value, str) else value
+
+    def hincrby(self, name, key, amount):
+        h = self.hashes.setdefault(name, {})
+        h[key] = h.get(key, 0) + amount
+
+    def hgetall(self, name):
+        return dict(self.hashes.get(name, {}))
+
+    def pipeline(self, transaction=False):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, r):
+        self.r = r
+        self.ops = []
+
+    def __getattr__(self, name):
+        return lambda *a, **k: self.ops.append((name, a, k))
+
+    def execute(self):
+        return [getattr(self.r, name)(*a, **k) for name, a, k in self.ops]
+
+
+class TestLRU:
+    """Tests for the in-process LRU."""
+
+    def test_evicts_least_recently_used(self):
+        """Test the oldest untouched key is evicted first."""
+        lru = LRU(2)
+        lru.set("a", 1)
+        lru.set("b", 2)
+        lru.get("a")
+        lru.set("c", 3)
+        assert "a" in lru and "c" in lru
+        assert "b" not in lru
+
+
+class TestTwoTierCache:
+    """Tests for the LRU -> Redis cache."""
+
+    def test_redis_hit_populates_lru(self):
+        """Test values from Redis are promoted into the LRU."""
+        r = FakeRedis()
+        TwoTierCache("ns", redis_client=r).set("k", {"x": 1})
+        fresh = TwoTierCache("ns", redis_client=r)
+        assert fresh.get("k") == {"x": 1}
+        assert "k" in fresh.lru
+        assert fresh.counters["hits_redis"] == 1
+
+    def test_namespace_isolation(self):
+        """Test a different namespace (e.g. new model) does not see old entries."""
+        r = FakeRedis()
+        TwoTierCache(f"claims:{digest('model-a')}", redis_client=r).set("k", 1)
+        other = TwoTierCache(f"claims:{digest('model-b')}", redis_client=r)
+        assert other.get("k") is None
+        assert other.counters["misses"] == 1
+
+    def test_stats_hit_rate(self):
+        """Test hit rate is reported per process and globally."""
+        cache = TwoTierCache("ns", redis_client=FakeRedis())
+        cache.set("a", 1)
+        cache.get_many(["a", "b"])
+        stats = cache.stats()
+        assert stats["process"]["hit_rate"] == pytest.approx(0.5)
+        assert stats["global"]["misses"] == 1
+
+    def test_lru_only(self):
+        """Test the cache works without Redis."""
+        cache = TwoTierCache("ns", redis_client=False)
+        cache.set("a", [1, 2])
+        assert cache.get("a") == [1, 2]
+        assert "global" not in cache.stats()
+
+
+class DownRedis:
+    """Client whose every call fails like an unreachable server."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __getattr__(self, name):
+        def fail(*a, **k):
+            self.calls += 1
+            raise redis.exceptions.ConnectionError("unreachable")
+        return fail
+
+
+class TestRedisBackoff:
+    """Tests for skipping the shared client after a connection error."""
+
+    @pytest.fixture
+    def down(self, monkeypatch):
+        client = DownRedis()
+        monkeypatch.setattr(cache_mod, "get_redis", lambda: client)
+        monkeypatch.setattr(cache_mod, "_redis_down_until", 0.0)
+        return client
+
+    def test_cache_skips_redis_while_down(self, down):
+        """Test one failed lookup stops the cache from trying Redis again."""
+        cache = TwoTierCache("ns")
+        assert cache.get("a") is None
+        n = down.calls
+        assert n >= 1
+        cache.set("a", 1)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert down.calls == n
+
+    def test_metrics_skip_redis_while_down(self, down):
+        """Test counters stay local and Redis is tried once while it is down."""
+        metrics.incr("backoff_test", "hits")
+        metrics.incr("backoff_test", "hits")
+        assert down.calls == 1
+        assert metrics.snapshot("backoff_test")["process"]["hits"] >= 2
+        assert down.calls == 1
+
+    def test_retries_after_window(self, down, monkeypatch):
+        """Test Redis is tried again once the backoff window has passed."""
+        metrics.incr("backoff_test", "hits")
+        monkeypatch.setattr(cache_mod, "_redis_down_until", 0.0)
+        metrics.incr("backoff_test", "hits")
+        assert down.calls == 2
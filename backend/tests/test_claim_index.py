@@ -0,0 +1,122 @@
+"""
+Tests for cross-video claim reuse.
+
+The ANN query needs PostgreSQL with pgvector; here the candidate lookup is
+replaced by an exact cosine distance over the claims in SQLite.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app import claim_index, models
+
+
+@pytest.fixture(autouse=True)
+def exact_distance(monkeypatch):
+    def nearest(db, claim, vec):
+        q = np.asarray(vec, dtype=np.float32)
+        rows = []
+        for c in db.query(models.Claim).filter(models.Claim.id != claim.id, models.Claim.embedding.isnot(None)):
+            e = np.asarray(c.embedding, dtype=np.float32)
+            rows.append((c, float(1 - q @ e / (np.linalg.norm(q) * np.linalg.norm(e)))))
+        return sorted(rows, key=lambda r: r[1])[:claim_index.CLAIM_REUSE_CANDIDATES]
+    monkeypatch.setattr(claim_index, "_nearest", nearest)
+    monkeypatch.setattr(claim_index, "CLAIM_REUSE", True)
+
+
+def direction(i, tilt=0.0):
+    """Unit vector along axis i, tilted towards axis i + 1."""
+    v = np.zeros(384, dtype=np.float32)
+    v[i], v[i + 1] = 1.0, tilt
+    return (v / np.linalg.norm(v)).tolist()
+
+
+def add_claim(db, embedding, verdict_age_days=None, evidence=()):
+    v = models.Video(source_url="u", status="CLAIMED")
+    db.add(v)
+    db.flush()
+    c = models.Claim(video_id=v.id, claim_text="c", embedding=embedding)
+    db.add(c)
+    db.flush()
+    db.add_all([models.Evidence(claim_id=c.id, snippet=s, similarity=0.5) for s in evidence])
+    if verdict_age_days is not None:
+        db.add(models.Verdict(claim_id=c.id, label="TRUE", confidence=0.9, rationale="r", sources="[]",
+                              created_at=datetime.utcnow() - timedelta(days=verdict_age_days)))
+    db.commit()
+    return c
+
+
+class TestFindReusable:
+    """Tests for choosing a claim to reuse."""
+
+    def test_nearest_fresh_match(self, db):
+        """Test the closest claim with a fresh verdict is returned with its distance."""
+        src = add_claim(db, direction(0, 0.1), verdict_age_days=1)
+        add_claim(db, direction(0, 0.3), verdict_age_days=1)
+        new = add_claim(db, direction(0))
+        cand, distance, verdict = claim_index.find_reusable(db, new)
+        assert cand.id == src.id
+        assert 0 < distance < claim_index.CLAIM_REUSE_MAX_DISTANCE
+        assert verdict.claim_id == src.id
+
+    def test_too_far_stale_or_unchecked(self, db):
+        """Test distant claims, stale verdicts and claims without verdicts are not reused."""
+        add_claim(db, direction(2), verdict_age_days=1)
+        add_claim(db, direction(0, 0.05), verdict_age_days=claim_index.CLAIM_REUSE_MAX_AGE_DAYS + 1)
+        add_claim(db, direction(0, 0.05))
+        assert claim_index.find_reusable(db, add_claim(db, direction(0))) is None
+
+    def test_skips_own_copies(self, db):
+        """Test a claim never reuses a claim that was copied from it."""
+        new = add_claim(db, direction(0))
+        copy = add_claim(db, direction(0, 0.05), verdict_age_days=1)
+        copy.reused_from_claim_id = new.id
+        db.commit()
+        assert claim_index.find_reusable(db, new) is None
+
+
+class TestReuse:
+    """Tests for copying evidence and verdicts."""
+
+    def test_evidence_then_verdict_from_same_claim(self, db):
+        """Test evidence is copied with provenance and the verdict comes from the same claim."""
+        src = add_claim(db, direction(0, 0.1), verdict_age_days=1, evidence=["a", "b"])
+        new = add_claim(db, direction(0))
+        out = claim_index.reuse_evidence(db, new)
+        assert out["reused_from"] == src.id and out["stored"] == 2
+        copied = db.query(models.Evidence).filter_by(claim_id=new.id).all()
+        assert sorted(e.snippet for e in copied) == ["a", "b"]
+        assert all(e.reused_from_id is not None for e in copied)
+        assert new.reused_from_claim_id == src.id and new.reuse_distance == out["distance"]
+
+        # a closer checked claim appearing later does not change the verdict's source
+        closer = add_claim(db, direction(0, 0.01), verdict_age_days=0, evidence=["c"])
+        v = claim_index.reuse_verdict(db, new)
+        src_verdict = db.query(models.Verdict).filter_by(claim_id=src.id).one()
+        assert v.claim_id == new.id and v.reused_from_id == src_verdict.id
+        assert new.reused_from_claim_id == src.id != closer.id
+
+    def test_no_verdict_without_copied_evidence(self, db):
+        """Test a claim with its own evidence gets no reused verdict."""
+        add_claim(db, direction(0, 0.1), verdict_age_days=1, evidence=["a"])
+        new = add_claim(db, direction(0))
+        assert claim_index.reuse_verdict(db, new) is None
+        assert db.query(models.Verdict).filter_by(claim_id=new.id).count() == 0
+
+    def test_skips_match_without_evidence(self, db):
+        """Test evidence comes from the nearest match that has any."""
+        add_claim(db, direction(0, 0.05), verdict_age_days=1)
+        src = add_claim(db, direction(0, 0.1), verdict_age_days=1, evidence=["a"])
+        new = add_claim(db, direction(0))
+        out = claim_index.reuse_evidence(db, new)
+        assert out["reused_from"] == src.id and out["stored"] == 1
+        assert claim_index.reuse_verdict(db, new).claim_id == new.id
+        assert new.reused_from_claim_id == src.id
+
+    def test_match_without_evidence(self, db):
+        """Test a match with nothing to copy is not marked as reused."""
+        add_claim(db, direction(0, 0.1), verdict_age_days=1)
+        new = add_claim(db, direction(0))
+        assert claim_index.reuse_evidence(db, new) is None
+        assert new.reused_from_claim_id is None
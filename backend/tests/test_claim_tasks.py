@@ -0,0 +1,142 @@
+"""
+Tests for claim persistence: near-duplicate collapsing and streaming extraction.
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db import Base
+from app import models, embeddings, claim_tasks
+from app.asr import SegmentRow
+from tests.helpers import fake_embed
+
+
+@pytest.fixture
+def Session(monkeypatch):
+    # StaticPool: the consumer thread must see the same in-memory database
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    monkeypatch.setattr(claim_tasks, "SessionLocal", Session)
+    monkeypatch.setattr(embeddings, "embed_texts", fake_embed)
+    # every sentence is a claim
+    monkeypatch.setattr(
+        claim_tasks, "extract_claims_for_segments",
+        lambda segs, stats=None: [(sid, text, 0.9) for sid, text in segs],
+    )
+    yield Session
+    engine.dispose()
+
+
+def _segments(db, video_id, texts, start=0):
+    rows = []
+    for i, t in enumerate(texts, start=start):
+        seg = models.Segment(video_id=video_id, t_start=float(i), t_end=float(i + 1), text=t)
+        db.add(seg)
+        db.flush()
+        rows.append(SegmentRow(seg.id, seg.t_start, seg.t_end, seg.text))
+    db.commit()
+    return rows
+
+
+class TestStreamingClaimExtractor:
+    """Tests for claim extraction overlapping with ASR."""
+
+    def test_collapses_repeats_across_batches(self, Session):
+        """Test a claim repeated in a later batch becomes an occurrence of the first."""
+        db = Session()
+        v = models.Video(source_url="u", status="TRANSCRIBING")
+        db.add(v)
+        db.commit()
+
+        first = _segments(db, v.id, ["The tower is tall.", "The bridge is long."])
+        later = _segments(db, v.id, ["Again, the tower is tall.", "The river is wide."], start=2)
+
+        consumer = claim_tasks.StreamingClaimExtractor(v.id, batch_segments=2, max_wait=0.01).start()
+        consumer.feed(first)
+        consumer.feed(later)
+        result = consumer.close()
+
+        assert result["created"] == 3
+        assert result["first_claim_after"] is not None
+        claims = db.query(models.Claim).order_by(models.Claim.id).all()
+        assert [c.claim_text for c in claims] == [
+            "The tower is tall.", "The bridge is long.", "The river is wide.",
+        ]
+        tower = claims[0]
+        assert [o.t_start for o in tower.occurrences] == [0.0, 2.0]
+        db.close()
+
+    def test_resume_after_retry(self, Session):
+        """Test a retried task extracts the kept segments and folds repeats into old claims."""
+        db = Session()
+        v = models.Video(source_url="u", status="TRANSCRIBING")
+        db.add(v)
+        db.commit()
+
+        # first attempt: one batch extracted, the next one committed before the crash
+        consumer = claim_tasks.StreamingClaimExtractor(v.id, max_wait=0.01).start()
+        consumer.feed(_segments(db, v.id, ["The tower is tall."]))
+        consumer.close()
+        _segments(db, v.id, ["The bridge is long."], start=1)
+
+        retry = claim_tasks.StreamingClaimExtractor(v.id, max_wait=0.01)
+        assert retry.resume() == 1
+        retry.start()
+        retry.feed(_segments(db, v.id, ["Again, the tower is tall."], start=2))
+        assert retry.close()["created"] == 1
+
+        claims = db.query(models.Claim).order_by(models.Claim.id).all()
+        assert [c.claim_text for c in claims] == ["The tower is tall.", "The bridge is long."]
+        assert [o.t_start for o in claims[0].occurrences] == [0.0, 2.0]
+        db.close()
+
+    def test_consumer_error_is_raised_on_close(self, Session, monkeypatch):
+        """Test a failure in the consumer thread surfaces in the producer."""
+        def boom(segs, stats=None):
+            raise RuntimeError("model exploded")
+        monkeypatch.setattr(claim_tasks, "extract_claims_for_segments", boom)
+
+        consumer = claim_tasks.StreamingClaimExtractor(1, max_wait=0.01).start()
+        consumer.feed([SegmentRow(1, 0.0, 1.0, "x")])
+        with pytest.raises(RuntimeError):
+            consumer.close()
+
+    def test_asr_error_wins_over_close_error(self, monkeypatch):
+        """Test an ASR failure is re-raised even if closing the consumer also fails."""
+        from app import tasks
+
+        class BrokenConsumer:
+            def __init__(self, video_id):
+                self.closed = False
+
+            def resume(self):
+                return 0
+
+            def start(self):
+                return self
+
+            def feed(self, segs):
+                pass
+
+            def close(self):
+                self.closed = True
+                raise RuntimeError("consumer failed too")
+
+        consumers = []
+
+        def make(video_id):
+            consumers.append(BrokenConsumer(video_id))
+            return consumers[-1]
+        monkeypatch.setattr(claim_tasks, "StreamingClaimExtractor", make)
+
+        def asr_fails(*args, **kwargs):
+            raise ValueError("decode failed")
+        monkeypatch.setattr(tasks, "transcribe_to_db", asr_fails)
+
+        with pytest.raises(ValueError, match="decode failed"):
+            tasks.transcribe_and_extract_streaming(1, "k")
+        assert consumers[0].closed
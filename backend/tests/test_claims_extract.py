@@ -0,0 +1,169 @@
+"""
+Unit tests for claim extraction module.
+"""
+import pytest
+from collections import Counter
+from app import claims_extract
+from app.cache import TwoTierCache
+from app.claims_extract import (
+    extract_claims_for_segments,
+    prefilter_reject,
+    run_cascade,
+    score_claims,
+)
+
+
+class FakeZeroShot:
+    """Stand-in for the HF zero-shot pipeline; scores sentences containing digits as claims."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, inputs, labels, multi_label=False, batch_size=1):
+        self.calls.append((inputs, batch_size))
+        single = isinstance(inputs, str)
+        outs = []
+        for s in ([inputs] if single else inputs):
+            p = 0.9 if any(ch.isdigit() for ch in s) else 0.1
+            rest = (1.0 - p) / (len(labels) - 1)
+            # reversed so the positive label is not always first
+            outs.append({
+                "sequence": s,
+                "labels": list(reversed(labels)),
+                "scores": [rest] * (len(labels) - 1) + [p],
+            })
+        return outs[0] if single else outs
+
+
+@pytest.fixture
+def fake_zs(monkeypatch):
+    clf = FakeZeroShot()
+    monkeypatch.setattr(claims_extract, "get_zs", lambda: clf)
+    monkeypatch.setattr(claims_extract, "get_score_cache", lambda: None)
+    return clf
+
+
+class TestScoreClaims:
+    """Tests for batched claim scoring."""
+
+    def test_empty_input(self, fake_zs):
+        """Test no model call is made for an empty batch."""
+        assert score_claims([]) == []
+        assert fake_zs.calls == []
+
+    def test_scores_follow_input_order(self, fake_zs):
+        """Test scores are returned in input order regardless of label order."""
+        scores = score_claims(["Hello there.", "It costs 5 dollars."], batch_size=8)
+        assert scores == pytest.approx([0.1, 0.9])
+        assert fake_zs.calls[0][1] == 8
+
+    def test_single_call_for_all_sentences(self, fake_zs):
+        """Test all sentences go to the model in one batched call."""
+        score_claims(["a.", "b.", "c."])
+        assert len(fake_zs.calls) == 1
+        assert len(fake_zs.calls[0][0]) == 3
+
+
+class TestExtractClaimsForSegments:
+    """Tests for video-wide claim extraction."""
+
+    def test_maps_claims_to_segments(self, fake_zs):
+        """Test each claim keeps the id of the segment it came from."""
+        segments = [
+            (10, "Welcome back. The tower is 300 meters tall."),
+            (11, "Thanks for watching."),
+            (12, "It opened in 1889."),
+        ]
+        out = extract_claims_for_segments(segments, min_score=0.5)
+        assert [(seg_id, text) for seg_id, text, _ in out] == [
+            (10, "The tower is 300 meters tall."),
+            (12, "It opened in 1889."),
+        ]
+        assert len(fake_zs.calls) == 1
+
+    def test_empty_segments(self, fake_zs):
+        """Test segments with no text produce no claims."""
+        assert extract_claims_for_segments([(1, ""), (2, None)]) == []
+
+
+class TestPrefilter:
+    """Tests for the rule-based first stage of the claim cascade."""
+
+    def test_rejects_question(self):
+        """Test questions are rejected."""
+        assert prefilter_reject("What do you think about that?") == "question"
+
+    def test_rejects_short(self):
+        """Test very short sentences without numbers are rejected."""
+        assert prefilter_reject("I love it.") == "short"
+
+    def test_rejects_filler(self):
+        """Test greetings and channel boilerplate are rejected."""
+        assert prefilter_reject("Hey guys, welcome back.") == "filler"
+        assert prefilter_reject("Don't forget to subscribe.") == "filler"
+        # nothing claim-like follows the interjection
+        assert prefilter_reject("No, I really mean it.") == "filler"
+        assert prefilter_reject("Okay everyone, let me explain this one.") == "filler"
+
+    def test_keeps_claims_starting_with_interjection_words(self):
+        """Test a claim that merely starts with "No" or "Yes" is not filler."""
+        assert prefilter_reject("No country has more lakes than Canada.") is None
+        assert prefilter_reject("Yes votes won the referendum in Scotland.") is None
+        assert prefilter_reject("No, vaccines do not cause autism.") is None
+        assert prefilter_reject("Yes, Canada has more lakes than any other country.") is None
+
+    def test_keeps_claims(self):
+        """Test claim-like sentences survive the prefilter."""
+        assert prefilter_reject("The Earth is round.") is None
+        assert prefilter_reject("So the GDP rose 3% last year.") is None
+        assert prefilter_reject("Einstein developed relativity in Germany.") is None
+
+
+class TestRunCascade:
+    """Tests for the prefilter -> zero-shot cascade."""
+
+    def test_only_survivors_reach_model(self, fake_zs):
+        """Test prefilter rejects never go to the zero-shot model."""
+        sents = ["Is this real?", "Thanks for watching.", "The bridge was built in 1932."]
+        run_cascade(sents, min_score=0.5)
+        assert fake_zs.calls[0][0] == ["The bridge was built in 1932."]
+
+    def test_stage_counters(self, fake_zs):
+        """Test per-stage rejection counters add up to the input."""
+        stats = Counter()
+        sents = [
+            "Is this real?",
+            "Hello everyone.",
+            "The Earth is round.",
+            "The bridge was built in 1932.",
+        ]
+        accepted = run_cascade(sents, min_score=0.5, stats=stats)
+        assert accepted == [(3, pytest.approx(0.9))]
+        assert stats["total"] == 4
+        assert stats["rejected:question"] == 1
+        assert stats["rejected:short"] + stats["rejected:filler"] == 1
+        assert stats["rejected:model"] == 1
+        assert stats["accepted"] == 1
+
+
+class TestScoreCache:
+    """Tests for the claim-score memo cache."""
+
+    @pytest.fixture
+    def lru_cache(self, monkeypatch, fake_zs):
+        cache = TwoTierCache("test-claimscore", maxsize=100, redis_client=False)
+        monkeypatch.setattr(claims_extract, "get_score_cache", lambda: cache)
+        return cache
+
+    def test_repeated_sentences_scored_once(self, fake_zs, lru_cache):
+        """Test sentences equal after normalization only reach the model once."""
+        scores = score_claims(["It costs 5 dollars.", "it  costs 5 DOLLARS.", "Hi there."])
+        assert scores == pytest.approx([0.9, 0.9, 0.1])
+        assert fake_zs.calls[0][0] == ["It costs 5 dollars.", "Hi there."]
+
+    def test_second_call_served_from_cache(self, fake_zs, lru_cache):
+        """Test a warm cache skips the model entirely."""
+        score_claims(["It costs 5 dollars."])
+        score_claims(["It costs 5 dollars."])
+        assert len(fake_zs.calls) == 1
+        assert lru_cache.stats()["process"]["hits_lru"] == 1
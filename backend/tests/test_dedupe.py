@@ -0,0 +1,107 @@
+"""
+Tests for URL ingest de-duplication.
+"""
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import dedupe, models
+from app.ingest import canonical_source_id
+
+SOURCE = "youtube:dQw4w9WgXcQ"
+
+
+class FakeLock:
+    def __init__(self, locks, name):
+        self.locks, self.name = locks, name
+
+    def acquire(self):
+        self.locks[self.name].acquire()
+        return True
+
+    def release(self):
+        self.locks[self.name].release()
+
+
+class FakeRedis:
+    def __init__(self):
+        self.locks = {}
+        self.names = []
+
+    def lock(self, name, timeout=None, blocking_timeout=None):
+        self.names.append(name)
+        self.locks.setdefault(name, threading.Lock())
+        return FakeLock(self.locks, name)
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(dedupe, "get_redis", lambda: fake)
+    return fake
+
+
+def submit(db, url="https://youtu.be/dQw4w9WgXcQ", force=False):
+    queued = []
+    v = dedupe.submit_url(db, url, canonical_source_id(url), force=force, enqueue=queued.append)
+    return v, queued
+
+
+class TestSubmitUrl:
+    """Tests for reuse, coalescing and force."""
+
+    def test_url_forms_share_one_video(self, db, redis):
+        """Test different links to the same media coalesce onto the first video."""
+        first, queued = submit(db, "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42s")
+        assert queued == [first.id] and first.source_id == SOURCE
+        for url in ("https://youtu.be/dQw4w9WgXcQ?t=10", "https://www.youtube.com/shorts/dQw4w9WgXcQ"):
+            v, queued = submit(db, url)
+            assert v.id == first.id and queued == []
+        assert redis.names == [f"ingest:lock:{SOURCE}"] * 3
+
+    def test_finished_video_is_returned(self, db, redis):
+        """Test a completed video is reused regardless of age."""
+        first, _ = submit(db)
+        first.status = "CLAIMED"
+        first.created_at = datetime.utcnow() - timedelta(days=30)
+        db.commit()
+        v, queued = submit(db)
+        assert v.id == first.id and queued == []
+
+    def test_failed_or_stale_video_starts_over(self, db, redis):
+        """Test failed videos and in-flight ones past the TTL are not reused."""
+        first, _ = submit(db)
+        first.status = "FAILED"
+        db.commit()
+        second, queued = submit(db)
+        assert second.id != first.id and queued == [second.id]
+
+        second.created_at = datetime.utcnow() - timedelta(seconds=dedupe.INGEST_INFLIGHT_TTL_S + 1)
+        db.commit()
+        third, queued = submit(db)
+        assert third.id not in (first.id, second.id) and queued == [third.id]
+
+    def test_force_starts_new_pipeline(self, db, redis):
+        """Test force bypasses an existing finished video."""
+        first, _ = submit(db)
+        first.status = "TRANSCRIBED"
+        db.commit()
+        v, queued = submit(db, force=True)
+        assert v.id != first.id and queued == [v.id]
+
+    def test_unknown_source_is_never_deduplicated(self, db, redis):
+        """Test URLs without a source id always create a video, without locking."""
+        a, _ = submit(db, "https://example.com/a.mp3")
+        b, _ = submit(db, "https://example.com/a.mp3")
+        assert a.id != b.id and a.source_id is None
+        assert redis.names == []
+
+    def test_works_without_redis(self, db, monkeypatch):
+        """Test an unreachable Redis only drops the lock, not the de-duplication."""
+        def down():
+            raise ConnectionError("redis down")
+        monkeypatch.setattr(dedupe, "get_redis", down)
+        first, _ = submit(db)
+        v, queued = submit(db)
+        assert v.id == first.id and queued == []
@@ -0,0 +1,28 @@
+"""
+Unit tests for embedding helpers.
+"""
+import numpy as np
+from app.embeddings import cluster_by_similarity
+
+
+def _unit(*rows):
+    X = np.asarray(rows, dtype=np.float32)
+    return X / np.linalg.norm(X, axis=1, keepdims=True)
+
+
+class TestClusterBySimilarity:
+    """Tests for greedy near-duplicate clustering."""
+
+    def test_groups_near_duplicates_under_first_member(self):
+        """Test repeats map to the first occurrence in their cluster."""
+        X = _unit([1, 0, 0], [0, 1, 0], [0.99, 0.05, 0], [0.02, 1, 0])
+        assert cluster_by_similarity(X, threshold=0.9) == [0, 1, 0, 1]
+
+    def test_distinct_vectors_stay_separate(self):
+        """Test nothing is merged below the threshold."""
+        X = _unit([1, 0, 0], [0.7, 0.7, 0], [0, 0, 1])
+        assert cluster_by_similarity(X, threshold=0.9) == [0, 1, 2]
+
+    def test_empty(self):
+        """Test empty input yields no clusters."""
+        assert cluster_by_similarity(np.zeros((0, 3), dtype=np.float32), 0.9) == []
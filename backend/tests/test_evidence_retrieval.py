@@ -0,0 +1,228 @@
+"""
+Tests for concurrent evidence retrieval against a local stub HTTP server.
+"""
+import json
+import threading
+import time
+import types
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+from app import evidence_cache, evidence_retrieval as er, metrics
+from app.cache import TwoTierCache
+
+
+class StubSources:
+    """Wikipedia API and NewsAPI stand-ins; delays and failures are set per test."""
+
+    def __init__(self):
+        self.titles = ["Alpha", "Beta", "Gamma"]
+        self.delay = {}      # title / "search" / "news" -> seconds
+        self.fail = set()    # same keys -> HTTP 500
+        self.requests = []
+        self.full_text = {}  # title -> whole-page text (requests without exintro)
+
+    def respond(self, path, q):
+        if path == "/news":
+            key = "news"
+            body = {"articles": [{"title": "N1", "url": "http://n/1", "description": "news one"}]}
+        elif q.get("list") == "search":
+            key = "search"
+            body = {"query": {"search": [{"title": t} for t in self.titles]}}
+        else:
+            key = q["titles"]
+            text = f"{key} intro. " * 100
+            if "exintro" not in q:
+                text = self.full_text.get(key, text)
+            body = {"query": {"pages": {"1": {"title": key, "fullurl": f"http://w/{key}",
+                                              "extract": text}}}}
+        self.requests.append(key)
+        time.sleep(self.delay.get(key, 0))
+        return (500, {}) if key in self.fail else (200, body)
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    sources = StubSources()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            u = urlparse(self.path)
+            status, body = sources.respond(u.path, {k: v[0] for k, v in parse_qs(u.query).items()})
+            data = json.dumps(body).encode()
+            try:
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # client gave up after its deadline
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setattr(er, "WIKI_API_URL", f"{base}/w/api.php")
+    monkeypatch.setattr(er, "NEWSAPI_URL", f"{base}/news")
+    monkeypatch.setattr(er, "NEWS_KEY", "test-key")
+    monkeypatch.setattr(evidence_cache, "EVIDENCE_CACHE", False)
+    # timings are asserted; counters must not wait on a Redis connection
+    monkeypatch.setattr(metrics, "redis_if_up", lambda: None)
+    yield sources
+    server.shutdown()
+    server.server_close()
+
+
+class TestGatherEvidence:
+    """Tests for the concurrent fan-out and deadlines."""
+
+    def test_all_sources(self, stub):
+        """Test every page and the news source are returned in source order."""
+        items = er.gather_evidence("claim")
+        assert [(i["source"], i["title"]) for i in items] == [
+            ("wikipedia", "Alpha"), ("wikipedia", "Beta"), ("wikipedia", "Gamma"), ("newsapi", "N1"),
+        ]
+        assert items[0]["url"] == "http://w/Alpha" and len(items[0]["snippet"]) == 600
+
+    def test_pages_are_fetched_concurrently(self, stub):
+        """Test latency is the slowest fetch, not the sum of all fetches."""
+        for key in ("Alpha", "Beta", "Gamma", "news"):
+            stub.delay[key] = 0.3
+        t0 = time.monotonic()
+        items = er.gather_evidence("claim")
+        assert len(items) == 4
+        assert time.monotonic() - t0 < 0.9
+
+    def test_slow_and_failing_sources_are_dropped(self, stub):
+        """Test the budget returns what arrived; a failed page does not sink the rest."""
+        stub.delay["Beta"] = 3
+        stub.fail.add("Gamma")
+        stub.delay["news"] = 3
+        t0 = time.monotonic()
+        items = er.gather_evidence("claim", budget=0.5)
+        assert time.monotonic() - t0 < 1.5
+        assert [i["title"] for i in items] == ["Alpha"]
+
+    def test_per_source_deadline(self, stub, monkeypatch):
+        """Test a source's own deadline cuts it off before the overall budget."""
+        monkeypatch.setattr(er, "NEWS_DEADLINE_S", 0.2)
+        stub.delay["news"] = 1
+        items = er.gather_evidence("claim", budget=3)
+        assert {i["source"] for i in items} == {"wikipedia"}
+
+    def test_failed_search(self, stub):
+        """Test a failing search yields no Wikipedia evidence and fetches no pages."""
+        stub.fail.add("search")
+        assert er.gather_evidence("claim", sources=["wikipedia"]) == []
+        assert stub.requests == ["search"]
+
+
+class TestEvidenceCache:
+    """Tests for cached source responses."""
+
+    @pytest.fixture
+    def cache(self, monkeypatch):
+        caches = {}
+        monkeypatch.setattr(evidence_cache, "EVIDENCE_CACHE", True)
+        monkeypatch.setattr(evidence_cache, "get_cache", lambda kind: caches.setdefault(
+            kind, TwoTierCache(f"test:{kind}", redis_client=False)))
+        # per-process counters only
+        monkeypatch.setattr(metrics, "_local", defaultdict(Counter))
+        return evidence_cache
+
+    def test_repeat_claims_hit_cache(self, stub, cache):
+        """Test the same normalized query and titles are served without requests."""
+        first = er.gather_evidence("The Claim")
+        n = len(stub.requests)
+        assert n == 5  # search, 3 pages, news
+        assert er.gather_evidence("  the   claim ") == first
+        assert len(stub.requests) == n
+
+    def test_stale_served_then_revalidated(self, stub, cache, monkeypatch):
+        """Test an expired entry is returned at once and refreshed in the background."""
+        er.gather_evidence("claim", sources=["newsapi"])
+        monkeypatch.setitem(cache.TTLS, "news", 0)
+        stub.delay["news"] = 0.3
+        t0 = time.monotonic()
+        items = er.gather_evidence("claim", sources=["newsapi"])
+        assert time.monotonic() - t0 < 0.25 and items[0]["title"] == "N1"
+        deadline = time.monotonic() + 3
+        while stub.requests.count("news") < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert stub.requests.count("news") == 2
+
+    def test_expired_entry_is_fetched_again(self, stub, cache, monkeypatch):
+        """Test an LRU entry past TTL + stale window is a miss, not a stale hit."""
+        er.gather_evidence("claim", sources=["newsapi"])
+        later = time.time() + cache.TTLS["news"] + cache.EVIDENCE_CACHE_STALE_S + 1
+        monkeypatch.setattr(cache, "time", types.SimpleNamespace(time=lambda: later))
+        stub.delay["news"] = 0.3
+        t0 = time.monotonic()
+        items = er.gather_evidence("claim", sources=["newsapi"])
+        assert time.monotonic() - t0 >= 0.3 and items[0]["title"] == "N1"
+        assert stub.requests.count("news") == 2
+        assert cache.stats()["news"]["misses"] == 2 and cache.stats()["news"]["stale"] == 0
+
+    def test_errors_are_not_cached(self, stub, cache):
+        """Test a failed search is retried on the next claim."""
+        stub.fail.add("search")
+        assert er.gather_evidence("claim", sources=["wikipedia"]) == []
+        stub.fail.clear()
+        assert len(er.gather_evidence("claim", sources=["wikipedia"])) == 3
+        assert stub.requests.count("search") == 2
+
+    def test_stats_per_kind(self, stub, cache):
+        """Test hit ratio and bytes saved are reported per source kind."""
+        er.gather_evidence("claim", sources=["wikipedia"])
+        er.gather_evidence("claim", sources=["wikipedia"])
+        stats = cache.stats()
+        assert stats["wiki_search"]["hit_ratio"] == 0.5
+        assert stats["wiki_page"]["hits"] == 3 and stats["wiki_page"]["bytes_saved"] > 0
+        assert stats["news"]["hit_ratio"] is None
+
+
+class TestPassageMode:
+    """Tests for top-k passages of whole pages."""
+
+    @pytest.fixture
+    def passages(self, stub, monkeypatch):
+        from tests.helpers import hashed_embed
+        calls = []
+
+        def embed(texts):
+            calls.append(len(texts))
+            return hashed_embed(texts)
+        monkeypatch.setattr(er, "embed_texts", embed)
+        monkeypatch.setattr(er, "WIKI_EVIDENCE_MODE", "passages")
+        filler = " ".join(f"filler{i} words here." for i in range(200))
+        stub.full_text = {
+            "Alpha": filler + " The bridge opened in 1932 and spans the harbour. " + filler,
+            "Beta": filler,
+            "Gamma": filler,
+        }
+        return calls
+
+    def test_relevant_passage_deep_in_page(self, stub, passages, monkeypatch):
+        """Test the best passage is found past the intro, with one embedding call."""
+        monkeypatch.setattr(er, "EVIDENCE_EMBED_BUDGET", 200)
+        items = er.gather_evidence("The harbour bridge opened in 1932", sources=["wikipedia"])
+        assert len(items) == er.WIKI_TOP_PASSAGES
+        assert items[0]["title"] == "Alpha" and "opened in 1932" in items[0]["snippet"]
+        assert items[0]["similarity"] >= items[-1]["similarity"]
+        assert items[0]["embedding"].shape == (384,)
+        assert len(passages) == 1
+
+    def test_embedding_budget(self, stub, passages, monkeypatch):
+        """Test no more than the budget is embedded and every page gets a share."""
+        monkeypatch.setattr(er, "EVIDENCE_EMBED_BUDGET", 6)
+        monkeypatch.setattr(er, "WIKI_TOP_PASSAGES", 6)
+        items = er.gather_evidence("claim", sources=["wikipedia"])
+        assert passages == [1 + 6]
+        assert sorted(i["title"] for i in items) == ["Alpha", "Alpha", "Beta", "Beta", "Gamma", "Gamma"]
@@ -0,0 +1,136 @@
+"""
+Tests for URL ingest.
+"""
+import os
+import stat
+import subprocess
+
+import pytest
+
+from app import ingest
+
+FAKE_YTDLP = r'''#!/usr/bin/env python3
+import json, os, sys
+args = sys.argv[1:]
+with open(os.environ["FAKE_YTDLP_LOG"], "a") as log:
+    log.write(json.dumps(args) + "\n")
+if args[-1] == "bad://url":
+    sys.exit(1)
+info = json.dumps({"title": "Clip", "thumbnail": "http://t/1.jpg", "duration": 12.5})
+out = args[args.index("-o") + 1]
+if out == "-":
+    with open(args[args.index("--print-to-file") + 2], "a") as f:
+        f.write(info + "\n")
+    sys.stdout.buffer.write(b"x" * 3000)
+else:
+    print(info, flush=True)
+    with open(out.replace("%(ext)s", "mp3"), "wb") as f:
+        f.write(b"ID3 fake mp3")
+'''
+
+FAKE_FFMPEG = r'''#!/usr/bin/env python3
+import sys
+sys.stdout.buffer.write(sys.stdin.buffer.read().replace(b"x", b"y"))
+'''
+
+
+@pytest.fixture
+def fake_ytdlp(tmp_path, monkeypatch):
+    bindir = tmp_path / "bin"
+    bindir.mkdir()
+    exe = bindir / "yt-dlp"
+    exe.write_text(FAKE_YTDLP)
+    exe.chmod(exe.stat().st_mode | stat.S_IEXEC)
+    ffmpeg = bindir / "ffmpeg"
+    ffmpeg.write_text(FAKE_FFMPEG)
+    ffmpeg.chmod(ffmpeg.stat().st_mode | stat.S_IEXEC)
+    log = tmp_path / "calls.log"
+    monkeypatch.setenv("PATH", f"{bindir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("FAKE_YTDLP_LOG", str(log))
+    return log
+
+
+class TestYtdlpFetchAudio:
+    """Tests for the single yt-dlp run that yields metadata and audio."""
+
+    def test_one_run_for_metadata_and_audio(self, fake_ytdlp):
+        """Test metadata arrives through the callback and the mp3 exists after one call."""
+        seen = []
+        mp3, meta = ingest.ytdlp_fetch_audio("https://youtu.be/x", on_metadata=seen.append)
+        try:
+            assert meta == {"title": "Clip", "thumbnail_url": "http://t/1.jpg", "duration": 12.5}
+            assert seen == [meta]
+            with open(mp3, "rb") as f:
+                assert f.read() == b"ID3 fake mp3"
+        finally:
+            os.remove(mp3)
+            os.rmdir(os.path.dirname(mp3))
+
+        calls = fake_ytdlp.read_text().splitlines()
+        assert len(calls) == 1
+        assert "--no-simulate" in calls[0] and "ExtractAudio:-ac 1 -ar 16000" in calls[0]
+
+    def test_failure_cleans_up(self, fake_ytdlp):
+        """Test a failed download raises and leaves no temp directory behind."""
+        import tempfile
+        before = set(os.listdir(tempfile.gettempdir()))
+        with pytest.raises(subprocess.CalledProcessError):
+            ingest.ytdlp_fetch_audio("bad://url")
+        leaked = {d for d in set(os.listdir(tempfile.gettempdir())) - before if d.startswith("ingest_")}
+        assert not leaked
+
+
+class TestStreamAudioToS3:
+    """Tests for the yt-dlp -> ffmpeg -> multipart pipeline."""
+
+    def test_streams_without_temp_files(self, fake_ytdlp, monkeypatch):
+        """Test converted audio reaches the upload and metadata arrives from the same run."""
+        uploaded = {}
+        def upload_stream(key, stream, content_type=None):
+            uploaded[key] = stream.read()
+            return {"key": key, "size": len(uploaded[key]), "sha256": "h", "parts": 1}
+        monkeypatch.setattr(ingest, "upload_stream", upload_stream)
+
+        seen = []
+        result = ingest.stream_audio_to_s3("https://youtu.be/x", "media/1.mp3", on_metadata=seen.append)
+        assert result["size"] == 3000
+        assert uploaded["media/1.mp3"] == b"y" * 3000
+        assert seen == [{"title": "Clip", "thumbnail_url": "http://t/1.jpg", "duration": 12.5}]
+        assert len(fake_ytdlp.read_text().splitlines()) == 1
+
+    def test_failed_download_raises(self, fake_ytdlp, monkeypatch):
+        """Test a yt-dlp failure fails the ingest even though the stream ended cleanly."""
+        monkeypatch.setattr(ingest, "upload_stream",
+                            lambda key, stream, content_type=None: {"size": len(stream.read())})
+        with pytest.raises(subprocess.CalledProcessError):
+            ingest.stream_audio_to_s3("bad://url", "media/1.mp3")
+
+
+class TestSaveUploadStream:
+    """Tests for streaming direct uploads to S3."""
+
+    def test_streams_and_hashes(self, monkeypatch):
+        """Test the upload goes to S3 in parts with its content hash."""
+        import hashlib, io
+        from app import storage
+        from tests.helpers import FakeS3
+        fake = FakeS3()
+        monkeypatch.setattr(storage, "s3", fake)
+
+        data = b"a" * (storage.S3_PART_SIZE + 10)
+        key, sha = ingest.save_upload_stream(7, io.BytesIO(data), max_bytes=len(data))
+        assert key == "media/7.mp3"
+        assert sha == hashlib.sha256(data).hexdigest()
+        assert len(fake.completed) == 2
+
+    def test_size_cap_aborts(self, monkeypatch):
+        """Test an oversized upload raises and aborts the multipart upload."""
+        import io
+        from app import storage
+        from tests.helpers import FakeS3
+        fake = FakeS3()
+        monkeypatch.setattr(storage, "s3", fake)
+
+        with pytest.raises(ingest.UploadTooLarge):
+            ingest.save_upload_stream(7, io.BytesIO(b"a" * 1000), max_bytes=999)
+        assert fake.aborted and fake.completed is None
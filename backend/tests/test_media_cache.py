@@ -0,0 +1,102 @@
+"""
+Tests for the worker-local media cache.
+"""
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from app import locks, media_cache, metrics, storage
+
+
+@pytest.fixture
+def s3(tmp_path, monkeypatch):
+    monkeypatch.setattr(media_cache, "MEDIA_CACHE_DIR", str(tmp_path / "media"))
+    objects = {"media/1.mp3": (b"a" * 1000, "etag1"), "media/2.mp3": (b"b" * 1000, "etag1")}
+    log = tmp_path / "downloads.log"
+
+    def download_file(key, local):
+        with open(log, "a") as f:
+            f.write(key + "\n")
+        time.sleep(0.05)
+        with open(local, "wb") as f:
+            f.write(objects[key][0])
+    monkeypatch.setattr(storage, "download_file", download_file)
+    monkeypatch.setattr(storage, "head_etag", lambda key: objects[key][1])
+    return objects, log
+
+
+def downloads(log):
+    return log.read_text().splitlines() if log.exists() else []
+
+
+def _open_in_child(key, out):
+    with media_cache.open_media(key) as path:
+        with open(path, "rb") as f:
+            out.put(len(f.read()))
+
+
+class TestOpenMedia:
+    """Tests for cached reads of S3 objects."""
+
+    def test_downloads_once(self, s3):
+        """Test the second read hits the local copy and both are counted."""
+        objects, log = s3
+        before = metrics.snapshot("media_cache")["process"]
+        for _ in range(2):
+            with media_cache.open_media("media/1.mp3") as path:
+                assert open(path, "rb").read() == b"a" * 1000
+        assert downloads(log) == ["media/1.mp3"]
+        after = metrics.snapshot("media_cache")["process"]
+        assert after.get("hits", 0) - before.get("hits", 0) == 1
+        assert after.get("misses", 0) - before.get("misses", 0) == 1
+
+    def test_new_etag_downloads_again(self, s3):
+        """Test a rewritten object is fetched again."""
+        objects, log = s3
+        with media_cache.open_media("media/1.mp3"):
+            pass
+        objects["media/1.mp3"] = (b"c" * 10, "etag2")
+        with media_cache.open_media("media/1.mp3") as path:
+            assert open(path, "rb").read() == b"c" * 10
+        assert downloads(log) == ["media/1.mp3", "media/1.mp3"]
+
+    def test_concurrent_processes_share_one_download(self, s3):
+        """Test prefork-style children missing at once download the object once."""
+        objects, log = s3
+        ctx = multiprocessing.get_context("fork")
+        out = ctx.Queue()
+        procs = [ctx.Process(target=_open_in_child, args=("media/1.mp3", out)) for _ in range(4)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join(10)
+        assert [out.get(timeout=1) for _ in procs] == [1000] * 4
+        assert downloads(log) == ["media/1.mp3"]
+
+
+class TestEvict:
+    """Tests for size-bounded eviction."""
+
+    def test_lru_and_in_use_entries(self, s3):
+        """Test the oldest idle entry goes first and entries being read are kept."""
+        objects, log = s3
+        with media_cache.open_media("media/1.mp3") as first:
+            pass
+        with media_cache.open_media("media/2.mp3") as second:
+            os.utime(first, (1000, 1000))
+            with locks.file_lock(first + ".lock", shared=True):
+                assert media_cache.evict(max_mb=1500 / (1024 * 1024)) == 0
+            assert media_cache.evict(max_mb=1500 / (1024 * 1024)) == 1
+        assert not os.path.exists(first) and os.path.exists(second)
+
+    def test_recently_opened_entries_are_kept(self, s3):
+        """Test an entry opened moments ago is kept even when no lock is held on it."""
+        with media_cache.open_media("media/1.mp3") as first:
+            pass
+        with media_cache.open_media("media/2.mp3"):
+            pass
+        # `first` is unlocked, as between open_media()'s LOCK_EX and LOCK_SH
+        assert media_cache.evict(max_mb=1500 / (1024 * 1024)) == 0
+        assert os.path.exists(first)
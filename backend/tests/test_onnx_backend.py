@@ -0,0 +1,21 @@
+"""
+Parity tests for the ONNX int8 inference backend.
+
+Downloads and exports both models, so they are marked slow.
+"""
+import pytest
+
+pytest.importorskip("optimum.onnxruntime")
+
+from app.onnx_backend import parity_check, ONNX_CLAIM_TOL, ONNX_SIM_TOL
+
+
+@pytest.mark.slow
+class TestOnnxParity:
+    """Tests that int8 ONNX outputs stay within tolerance of PyTorch."""
+
+    def test_parity_within_tolerance(self):
+        """Test claim probabilities and cosine similarities match PyTorch."""
+        res = parity_check()
+        assert res["claim_max_abs_diff"] <= ONNX_CLAIM_TOL
+        assert res["similarity_max_abs_diff"] <= ONNX_SIM_TOL
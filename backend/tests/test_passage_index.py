@@ -0,0 +1,117 @@
+"""
+Tests for the offline passage index.
+
+Search needs PostgreSQL with pgvector: set TEST_DATABASE_URL
+(postgresql+psycopg://..., migrated) to run it; building runs on SQLite.
+"""
+import json
+import os
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models, passage_index
+from app.db import Base
+from tests.helpers import hashed_embed
+
+CORPUS = [
+    {"id": "1", "title": "Paris", "url": "https://en.wikipedia.org/wiki/Paris",
+     "text": "Paris is the capital and largest city of France. " * 30},
+    {"id": "2", "title": "Berlin", "url": "https://en.wikipedia.org/wiki/Berlin",
+     "text": "Berlin is the capital and largest city of Germany. " * 30},
+    {"id": "3", "title": "Eiffel Tower", "url": "https://en.wikipedia.org/wiki/Eiffel_Tower",
+     "text": "The Eiffel Tower is a wrought-iron lattice tower in Paris, France."},
+    {"id": "4", "title": "Empty", "text": ""},
+]
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    monkeypatch.setattr(passage_index, "embed_texts", hashed_embed)
+    path = tmp_path / "corpus.jsonl"
+    path.write_text("\n".join(json.dumps(d) for d in CORPUS) + "\nnot json\n")
+    return str(path)
+
+
+@pytest.fixture
+def db(tmp_path):
+    # file-backed so every connection sees the same database
+    engine = create_engine(f"sqlite:///{tmp_path / 'index.db'}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    yield db
+    db.close()
+    engine.dispose()
+
+
+class TestSplitPassages:
+    """Tests for overlapping passage windows."""
+
+    def test_windows_overlap_and_cover(self):
+        """Test every word is covered and consecutive passages share `overlap` words."""
+        words = [f"w{i}" for i in range(250)]
+        out = passage_index.split_passages(" ".join(words), words=100, overlap=20)
+        assert [len(p.split()) for p in out] == [100, 100, 90]
+        assert out[1].split()[:20] == out[0].split()[-20:]
+        assert out[-1].split()[-1] == "w249"
+
+    def test_short_and_empty(self):
+        """Test short text is one passage and empty text none."""
+        assert passage_index.split_passages("a b c", words=100, overlap=20) == ["a b c"]
+        assert passage_index.split_passages("   ") == []
+
+
+class TestBuild:
+    """Tests for building the index from a fixture corpus."""
+
+    def test_build_and_resume(self, db, corpus):
+        """Test an interrupted build is completed by running it again."""
+        first = passage_index.build(db, corpus, batch_docs=1, limit=1)
+        assert first == {"docs": 1, "skipped": 0, "passages": first["passages"]}
+        rest = passage_index.build(db, corpus, batch_docs=2)
+        assert rest["docs"] == 2 and rest["skipped"] == 1
+
+        rows = db.query(models.Passage).order_by(models.Passage.doc_id, models.Passage.chunk).all()
+        assert {r.doc_id for r in rows} == {"1", "2", "3"}
+        paris = [r for r in rows if r.doc_id == "1"]
+        assert [r.chunk for r in paris] == list(range(len(paris))) and len(paris) > 1
+        assert paris[0].url == "https://en.wikipedia.org/wiki/Paris"
+
+        again = passage_index.build(db, corpus)
+        assert again == {"docs": 0, "skipped": 3, "passages": 0}
+
+    def test_parallel_matches_serial(self, db, corpus, tmp_path):
+        """Test embedding in worker processes stores the same passages."""
+        passage_index.build(db, corpus, workers=2, batch_docs=1)
+        parallel = [(r.doc_id, r.chunk, r.text) for r in
+                    db.query(models.Passage).order_by(models.Passage.doc_id, models.Passage.chunk)]
+        db.query(models.Passage).delete()
+        db.commit()
+        passage_index.build(db, corpus)
+        serial = [(r.doc_id, r.chunk, r.text) for r in
+                  db.query(models.Passage).order_by(models.Passage.doc_id, models.Passage.chunk)]
+        assert parallel == serial
+
+
+@pytest.mark.skipif(not os.getenv("TEST_DATABASE_URL"), reason="needs TEST_DATABASE_URL (PostgreSQL + pgvector)")
+class TestSearch:
+    """Tests for ANN search against a real PostgreSQL."""
+
+    @pytest.fixture
+    def pg(self):
+        engine = create_engine(os.environ["TEST_DATABASE_URL"])
+        db = sessionmaker(bind=engine)()
+        yield db
+        db.rollback()
+        db.query(models.Passage).filter(models.Passage.doc_id.in_([d["id"] for d in CORPUS])).delete()
+        db.commit()
+        db.close()
+        engine.dispose()
+
+    def test_nearest_passage(self, pg, corpus):
+        """Test a claim is answered by the closest passage of the fixture corpus."""
+        passage_index.build(pg, corpus)
+        hits = passage_index.search(pg, "Is the Eiffel Tower in Paris France?", k=2)
+        assert hits[0]["title"] == "Eiffel Tower"
+        assert hits == sorted(hits, key=lambda h: h["distance"])
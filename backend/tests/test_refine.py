@@ -0,0 +1,68 @@
+"""
+Tests for replacing a preview transcript with the refined one.
+"""
+import pytest
+
+from app import models, refine, embeddings, claim_tasks
+from app.claims_extract import normalize_sentence
+from tests.helpers import fake_embed
+
+
+@pytest.fixture(autouse=True)
+def fake_models(monkeypatch):
+    monkeypatch.setattr(embeddings, "embed_texts", fake_embed)
+    # every sentence is a claim
+    monkeypatch.setattr(
+        "app.claims_extract.extract_claims_for_segments",
+        lambda segs, stats=None: [(sid, text, 0.9) for sid, text in segs],
+    )
+
+
+@pytest.fixture
+def preview(db):
+    """Video with a preview transcript and one claim (with a verdict) per segment."""
+    v = models.Video(source_url="u", status="CLAIMED")
+    db.add(v)
+    db.flush()
+    for i, text in enumerate(["The tower is 300 meters tall.", "The bridge opened in 1932."]):
+        seg = models.Segment(video_id=v.id, t_start=float(i), t_end=float(i + 1), text=text)
+        db.add(seg)
+        db.flush()
+        claim = models.Claim(video_id=v.id, segment_id=seg.id, claim_text=text, canonical_text=text)
+        claim.occurrences.append(models.ClaimOccurrence(segment_id=seg.id, t_start=seg.t_start, t_end=seg.t_end, text=text))
+        claim.verdicts.append(models.Verdict(label="TRUE", confidence=0.9))
+        db.add(claim)
+    db.commit()
+    return v.id
+
+
+class TestReplaceTranscript:
+    """Tests for claim preservation across the refinement pass."""
+
+    def test_keeps_unchanged_claims(self, db, preview):
+        """Test a claim whose sentence survives (modulo punctuation/case) keeps its verdict."""
+        refined = [(0.0, 1.2, "the tower is 300 meters tall"), (1.2, 2.0, "The bridge opened in 1937.")]
+        result = refine.replace_transcript(db, preview, refined)
+        db.commit()
+
+        assert (result["kept_claims"], result["dropped_claims"]) == (1, 1)
+        claims = db.query(models.Claim).filter_by(video_id=preview).all()
+        assert [c.claim_text for c in claims] == ["The tower is 300 meters tall."]
+        kept = claims[0]
+        assert kept.segment_id == result["new_segments"][0].id
+        assert kept.occurrences[0].t_end == 1.2
+        assert [v.label for v in kept.verdicts] == ["TRUE"]
+
+        texts = [s.text for s in db.query(models.Segment).filter_by(video_id=preview).order_by(models.Segment.t_start)]
+        assert texts == [t for _, _, t in refined]
+
+    def test_extracts_only_new_sentences(self, db, preview):
+        """Test only changed sentences go through extraction, deduped against kept claims."""
+        refined = [(0.0, 1.0, "The tower is 300 meters tall."), (1.0, 2.0, "The bridge opened in 1937.")]
+        result = refine.replace_transcript(db, preview, refined)
+        out = refine.extract_new_claims(db, preview, result["new_segments"], result["covered"])
+        db.commit()
+
+        assert out["created"] == 1
+        texts = sorted(normalize_sentence(c.claim_text) for c in db.query(models.Claim).filter_by(video_id=preview))
+        assert texts == ["the bridge opened in 1937.", "the tower is 300 meters tall."]
@@ -0,0 +1,93 @@
+"""
+Tests for cross-encoder reranking of evidence.
+"""
+import pytest
+
+from app import models, rerank
+
+
+class FakeCrossEncoder:
+    """Scores a pair by the share of claim words found in the snippet."""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        self.calls.append(len(pairs))
+        out = []
+        for claim, snippet in pairs:
+            words = set(claim.lower().split())
+            out.append(len(words & set(snippet.lower().split())) / max(len(words), 1))
+        return out
+
+
+@pytest.fixture
+def model(monkeypatch):
+    fake = FakeCrossEncoder()
+    monkeypatch.setattr(rerank, "get_model", lambda: fake)
+    return fake
+
+
+def make_claims(db):
+    v = models.Video(source_url="u", status="CLAIMED")
+    db.add(v)
+    db.flush()
+    claims = []
+    for text, snippets in [
+        ("the bridge opened in 1932", [("unrelated text", 0.9), ("the bridge opened in 1932 to traffic", 0.5),
+                                       ("bridge history", 0.7)]),
+        ("the tower is 300 metres tall", [("the tower is 300 metres tall", 0.8)]),
+    ]:
+        c = models.Claim(video_id=v.id, claim_text=text)
+        db.add(c)
+        db.flush()
+        db.add_all([models.Evidence(claim_id=c.id, snippet=s, similarity=sim) for s, sim in snippets])
+        claims.append(c)
+    db.commit()
+    return v, claims
+
+
+class TestRerank:
+    """Tests for batched scoring and verdict evidence selection."""
+
+    def test_video_scored_in_one_pass(self, db, model):
+        """Test all claims' pairs go to the model together and scores are stored."""
+        v, claims = make_claims(db)
+        assert rerank.rerank_video(db, v.id) == {"claims": 2, "scored": 4}
+        assert model.calls == [4]
+        scores = {e.snippet: e.rerank_score for e in db.query(models.Evidence)}
+        assert scores["the bridge opened in 1932 to traffic"] == 1.0
+        assert scores["unrelated text"] == 0.0
+
+        # already scored rows are skipped unless rescoring
+        assert rerank.rerank_video(db, v.id) == {"claims": 2, "scored": 0}
+        assert rerank.rerank_video(db, v.id, rescore=True)["scored"] == 4
+        assert model.calls == [4, 4]
+
+    def test_verdict_evidence_by_rerank_score(self, db, model, monkeypatch):
+        """Test RERANK sends the top-k by rerank score instead of by similarity."""
+        v, claims = make_claims(db)
+        monkeypatch.setattr(rerank, "RERANK", False)
+        by_sim = rerank.evidence_for_verdict(db, claims[0].id)
+        assert [e.snippet for e in by_sim][0] == "unrelated text"
+        assert model.calls == []
+
+        monkeypatch.setattr(rerank, "RERANK", True)
+        monkeypatch.setattr(rerank, "RERANK_TOPK", 2)
+        best = rerank.evidence_for_verdict(db, claims[0].id)
+        assert [e.snippet for e in best] == ["the bridge opened in 1932 to traffic", "bridge history"]
+        assert model.calls == [3]
+
+    def test_video_workflow_reranks_between_fetch_and_verdicts(self, monkeypatch):
+        """Test the video check runs fetches, then one rerank pass, then verdicts."""
+        from app import evidence_tasks
+
+        monkeypatch.setattr(rerank, "RERANK", True)
+        wf = evidence_tasks.video_check_workflow(7, [1, 2])
+        assert [(t.task, t.args) for t in wf.tasks] == [("evidence.fetch_for_claim", (1,)),
+                                                        ("evidence.fetch_for_claim", (2,))]
+        assert [(t.task, t.args) for t in wf.body.tasks] == [("evidence.rerank_for_video", (7,)),
+                                                             ("verdicts.generate_for_video", (7,))]
+
+        monkeypatch.setattr(rerank, "RERANK", False)
+        assert evidence_tasks.video_check_workflow(7, [1]).body.task == "verdicts.generate_for_video"
@@ -0,0 +1,153 @@
+"""
+Tests for streaming multipart uploads.
+"""
+import hashlib
+import io
+import os
+
+import pytest
+
+from app import storage
+from tests.helpers import FakeS3
+
+
+class TrickleStream(io.RawIOBase):
+    """Returns at most 1000 bytes per read, like a pipe."""
+
+    def __init__(self, data):
+        self.buf = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def read(self, n=-1):
+        return self.buf.read(min(n, 1000) if n and n > 0 else 1000)
+
+
+class TestUploadStream:
+    """Tests for upload_stream."""
+
+    def test_parts_and_hash(self, monkeypatch):
+        """Test short pipe reads are assembled into full parts in order."""
+        fake = FakeS3()
+        monkeypatch.setattr(storage, "s3", fake)
+        data = bytes(range(256)) * 50  # 12800 bytes
+        out = storage.upload_stream("k", TrickleStream(data), part_size=5000)
+
+        assert out["size"] == len(data) and out["parts"] == 3
+        assert out["sha256"] == hashlib.sha256(data).hexdigest()
+        assert [len(fake.parts[i]) for i in (1, 2, 3)] == [5000, 5000, 2800]
+        assert b"".join(fake.parts[i] for i in (1, 2, 3)) == data
+        assert fake.completed == [{"ETag": f"e{i}", "PartNumber": i} for i in (1, 2, 3)]
+
+    def test_exact_multiple_of_part_size(self, monkeypatch):
+        """Test no empty trailing part is sent when the size divides evenly."""
+        fake = FakeS3()
+        monkeypatch.setattr(storage, "s3", fake)
+        out = storage.upload_stream("k", io.BytesIO(b"a" * 10000), part_size=5000)
+        assert out["parts"] == 2 and sorted(fake.parts) == [1, 2]
+
+    def test_aborts_on_failure(self, monkeypatch):
+        """Test a failed part aborts the multipart upload."""
+        fake = FakeS3(fail_on_part=2)
+        monkeypatch.setattr(storage, "s3", fake)
+        with pytest.raises(IOError):
+            storage.upload_stream("k", io.BytesIO(b"a" * 12000), part_size=5000)
+        assert fake.aborted and fake.completed is None
+
+
+class TestEnsureBucket:
+    """Tests for the per-process bucket check."""
+
+    def test_checked_once(self, monkeypatch):
+        """Test repeated uploads check the bucket once and create it when missing."""
+        calls = []
+        class Client:
+            def head_bucket(self, Bucket):
+                calls.append("head")
+                raise storage.ClientError({"Error": {"Code": "404"}}, "HeadBucket")
+            def create_bucket(self, Bucket):
+                calls.append("create")
+            def put_object(self, **kw):
+                calls.append("put")
+        monkeypatch.setattr(storage, "s3", Client())
+        monkeypatch.setattr(storage, "_buckets_ready", set())
+        for _ in range(3):
+            storage.upload_bytes("k", b"x", "text/plain")
+        assert calls == ["head", "create", "put", "put", "put"]
+
+    def test_recreates_vanished_bucket(self, tmp_path, monkeypatch):
+        """Test an upload into a bucket deleted after it was cached recreates it."""
+        import shutil
+        local = storage.LocalS3(str(tmp_path))
+        monkeypatch.setattr(storage, "s3", local)
+        monkeypatch.setattr(storage, "_buckets_ready", set())
+        storage.upload_bytes("a", b"1", "text/plain")
+        shutil.rmtree(tmp_path / storage.S3_BUCKET)
+
+        def put_object(Bucket, **kw):
+            if not (tmp_path / Bucket).is_dir():
+                raise storage.ClientError({"Error": {"Code": "NoSuchBucket"}}, "PutObject")
+            return storage.LocalS3.put_object(local, Bucket=Bucket, **kw)
+        monkeypatch.setattr(local, "put_object", put_object)
+        storage.upload_bytes("b", b"2", "text/plain")
+        assert (tmp_path / storage.S3_BUCKET / "b").read_bytes() == b"2"
+
+
+class TestLocalBackend:
+    """Tests for the filesystem storage backend."""
+
+    @pytest.fixture
+    def local(self, tmp_path, monkeypatch):
+        client = storage.LocalS3(str(tmp_path / "store"))
+        monkeypatch.setattr(storage, "s3", client)
+        monkeypatch.setattr(storage, "_buckets_ready", set())
+        return client
+
+    def test_round_trip(self, local, tmp_path):
+        """Test bytes, files and streams written through the module read back intact."""
+        src = tmp_path / "in.bin"
+        src.write_bytes(b"file" * 1000)
+        storage.upload_bytes("media/a.txt", b"hello", "text/plain")
+        storage.upload_file("media/b.bin", str(src))
+        data = bytes(range(256)) * 50
+        out = storage.upload_stream("media/c.bin", TrickleStream(data), part_size=5000)
+        assert out["parts"] == 3
+
+        for key, expected in [("media/a.txt", b"hello"), ("media/b.bin", b"file" * 1000), ("media/c.bin", data)]:
+            dst = tmp_path / "out"
+            storage.download_file(key, str(dst))
+            assert dst.read_bytes() == expected
+        assert not any((tmp_path / "store" / ".multipart").iterdir())
+
+    def test_etag_changes_on_rewrite(self, local):
+        """Test a rewritten object gets a new ETag (audio cache keys depend on it)."""
+        storage.upload_bytes("k", b"one", "text/plain")
+        first = storage.head_etag("k")
+        storage.upload_bytes("k", b"two!", "text/plain")
+        assert storage.head_etag("k") != first
+
+    def test_missing_and_escaping_keys(self, local, tmp_path):
+        """Test missing objects raise ClientError and keys cannot leave the bucket."""
+        with pytest.raises(storage.ClientError):
+            storage.head_etag("nope")
+        with pytest.raises(ValueError):
+            storage.upload_bytes("../../etc/x", b"", "text/plain")
+
+    def test_aborted_stream_leaves_nothing(self, local):
+        """Test a failed streaming upload leaves no object and no parts."""
+        class Broken(io.RawIOBase):
+            def __init__(self):
+                self.n = 0
+            def readable(self):
+                return True
+            def read(self, n=-1):
+                self.n += 1
+                if self.n > 3:
+                    raise IOError("pipe broke")
+                return b"a" * 5000
+        with pytest.raises(IOError):
+            storage.upload_stream("k", Broken(), part_size=5000)
+        with pytest.raises(storage.ClientError):
+            storage.head_etag("k")
+        assert not any(os.scandir(os.path.join(local.root, ".multipart")))
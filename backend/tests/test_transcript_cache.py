@@ -0,0 +1,132 @@
+"""
+Tests for the content-addressed transcript cache.
+"""
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import metrics, models, transcript_cache
+from app.ingest import canonical_source_id
+
+
+def make_video(db, segments=(), **kw):
+    v = models.Video(source_url="u", status="QUEUED", **kw)
+    db.add(v)
+    db.commit()
+    db.add_all([models.Segment(video_id=v.id, t_start=s, t_end=e, text=t) for s, e, t in segments])
+    db.commit()
+    return v
+
+
+class TestCanonicalSourceId:
+    """Tests for URL -> source id mapping."""
+
+    @pytest.mark.parametrize("url", [
+        "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+        "https://youtube.com/watch?feature=share&v=dQw4w9WgXcQ&t=42",
+        "https://m.youtube.com/watch?v=dQw4w9WgXcQ",
+        "https://youtu.be/dQw4w9WgXcQ?si=abc",
+        "https://www.youtube.com/shorts/dQw4w9WgXcQ",
+        "https://www.youtube.com/embed/dQw4w9WgXcQ",
+    ])
+    def test_youtube_forms(self, url):
+        """Test every YouTube link form maps to the same id."""
+        assert canonical_source_id(url) == "youtube:dQw4w9WgXcQ"
+
+    def test_unknown_source(self):
+        """Test unknown hosts and malformed ids have no source id."""
+        assert canonical_source_id("https://example.com/a.mp3") is None
+        assert canonical_source_id("https://youtube.com/watch?v=short") is None
+
+
+class TestTranscriptCache:
+    """Tests for lookup, copy and eviction."""
+
+    def test_store_then_copy_by_source_id(self, db):
+        """Test a stored transcript is copied to a new video with metadata."""
+        segs = [(0.0, 2.0, "first"), (2.0, 4.0, "second")]
+        src = make_video(db, segs, title="T", duration=4.0)
+        transcript_cache.store(db, src.id, source_id="youtube:x", audio_sha="abc")
+
+        dst = make_video(db)
+        entry = transcript_cache.lookup(db, source_id="youtube:x")
+        assert entry is not None
+        assert transcript_cache.copy_to_video(db, entry, dst.id) == 2
+
+        db.refresh(dst)
+        assert dst.status == "TRANSCRIBED"
+        assert dst.title == "T"
+        assert dst.progress == 1.0
+        got = [(s.t_start, s.t_end, s.text) for s in
+               db.query(models.Segment).filter_by(video_id=dst.id).order_by(models.Segment.t_start)]
+        assert got == segs
+        assert entry.hits == 1
+
+    def test_lookup_by_audio_hash_and_config(self, db, monkeypatch):
+        """Test the audio hash finds the entry, and an ASR config change does not."""
+        src = make_video(db, [(0.0, 1.0, "x")])
+        transcript_cache.store(db, src.id, audio_sha="abc")
+        assert transcript_cache.lookup(db, source_id="youtube:other", audio_sha="abc") is not None
+
+        monkeypatch.setattr("app.asr.WHISPER_MODEL", "large-v3")
+        assert transcript_cache.lookup(db, audio_sha="abc") is None
+
+    def test_chunk_length_is_part_of_config(self, db, monkeypatch):
+        """Test changing ASR_CHUNK_SECONDS stops matching old entries."""
+        src = make_video(db, [(0.0, 1.0, "x")])
+        transcript_cache.store(db, src.id, audio_sha="abc")
+        monkeypatch.setattr("app.asr.ASR_CHUNK_SECONDS", 17)
+        assert transcript_cache.lookup(db, audio_sha="abc") is None
+
+    def test_audio_hash_hit_records_source_id(self, db):
+        """Test a hit by audio hash makes the requesting source a hit before download."""
+        src = make_video(db, [(0.0, 1.0, "x")])
+        transcript_cache.store(db, src.id, audio_sha="abc")
+        assert transcript_cache.lookup(db, source_id="youtube:new") is None
+
+        entry = transcript_cache.lookup(db, source_id="youtube:new", audio_sha="abc")
+        transcript_cache.copy_to_video(db, entry, make_video(db).id, source_id="youtube:new")
+        assert transcript_cache.lookup(db, source_id="youtube:new").id == entry.id
+
+    def test_lookup_chain_counts_one_miss(self, db, monkeypatch):
+        """Test a source-id miss followed by an audio-hash miss is one miss."""
+        monkeypatch.setattr(metrics, "_local", defaultdict(Counter))
+        monkeypatch.setattr(metrics, "redis_if_up", lambda: None)
+        assert transcript_cache.lookup(db, source_id="youtube:none", count_miss=False) is None
+        assert transcript_cache.lookup(db, source_id="youtube:none", audio_sha="none") is None
+        assert metrics._local["transcript_cache"]["misses"] == 1
+
+    def test_cached_no_speech(self, db):
+        """Test a cached no-speech transcript marks the new video NO_SPEECH."""
+        from app.asr import NO_SPEECH
+        src = make_video(db, [(0.0, 1.0, NO_SPEECH)])
+        entry = transcript_cache.store(db, src.id, source_id="youtube:quiet")
+        dst = make_video(db)
+        assert transcript_cache.copy_to_video(db, entry, dst.id) == 0
+        db.refresh(dst)
+        assert dst.status == "NO_SPEECH"
+
+    def test_evicts_least_recently_used(self, db):
+        """Test eviction keeps the most recently used entries within the bound."""
+        ids = []
+        for i in range(3):
+            v = make_video(db, [(0.0, 1.0, f"t{i}")])
+            e = transcript_cache.store(db, v.id, source_id=f"youtube:{i}")
+            e.last_used_at = datetime.utcnow() - timedelta(hours=3 - i)
+            ids.append(e.id)
+        # touching the oldest entry makes it the most recently used
+        db.get(models.TranscriptCache, ids[0]).last_used_at = datetime.utcnow()
+        db.commit()
+
+        assert transcript_cache.evict(db, max_entries=2) == 1
+        left = {e.id for e in db.query(models.TranscriptCache)}
+        assert left == {ids[0], ids[2]}
+
+    def test_evicts_by_size(self, db):
+        """Test the size bound alone triggers eviction."""
+        for i in range(2):
+            v = make_video(db, [(0.0, 1.0, "x" * 1000)])
+            transcript_cache.store(db, v.id, source_id=f"youtube:{i}")
+        assert transcript_cache.evict(db, max_entries=100, max_mb=1500 / (1024 * 1024)) == 1
+        assert db.query(models.TranscriptCache).count() == 1
@@ -187,6 +187,8 @@ function VideoResults({ videoId }: { videoId: number }) {
     switch (video?.status) {
       case "TRANSCRIBED":
         return "bg-green-100 text-green-700";
+      case "PREVIEW_TRANSCRIBED":
+        return "bg-teal-100 text-teal-700";
       case "PROCESSING":
         return "bg-yellow-100 text-yellow-700";
       case "QUEUED":
@@ -231,7 +233,7 @@ function VideoResults({ videoId }: { videoId: number }) {
           </div>
         </div>
 
-        {video?.status === "TRANSCRIBED" && claims.length === 0 && (
+        {(video?.status === "TRANSCRIBED" || video?.status === "PREVIEW_TRANSCRIBED") && claims.length === 0 && (
           <button
             onClick={extractClaims}
             disabled={loading}